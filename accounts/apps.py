@@ -1,7 +1,11 @@
 from django.apps import AppConfig
+from django.core import checks
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
 
     def ready(self):
         import accounts.signals
+        from accounts.lockout import check_lockout_cache
+
+        checks.register(check_lockout_cache, checks.Tags.caches)
@@ -0,0 +1,29 @@
+"""
+Authentication backend for Triple G BuildHub.
+
+Role checks (get_user_role, the role middleware, can_login()) read the
+user's profiles on almost every request. With the stock ModelBackend each
+profile is a separate lazy query on first access. ProfileBackend loads the
+session user with all three profiles in one query, so those checks run on
+objects already in memory.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+# Reverse one-to-ones of User read by the role checks
+PROFILE_RELATIONS = ('adminprofile', 'sitemanagerprofile', 'profile')
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend that loads the session user together with their profiles"""
+
+    def _users(self):
+        return get_user_model()._default_manager.select_related(*PROFILE_RELATIONS)
+
+    def get_user(self, user_id):
+        user = self._users().filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await self._users().filter(pk=user_id).afirst()
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -2,13 +2,80 @@
 Context processors for role-based access control in Triple G BuildHub
 Provides role information to all templates automatically.
 """
-from .utils import get_user_role, get_user_dashboard_url, get_navigation_context
+from functools import cached_property, partial
+
+from .utils import get_user_dashboard_url, get_navigation_context
+
+# Every variable role_context exposes to templates
+ROLE_CONTEXT_KEYS = (
+    'user_role',
+    'is_admin',
+    'is_site_manager',
+    'is_public_user',
+    'is_superadmin',
+    'dashboard_url',
+    'interface_template',
+    'user_dashboard_url',
+    'can_access_admin',
+    'can_access_site_manager',
+    'can_access_client',
+    'show_admin_nav',
+    'show_site_manager_nav',
+    'show_public_nav',
+)
+
+
+class RoleNavigation:
+    """
+    Role/navigation values for one request, computed on first access.
+
+    A single instance is stored on the request, so every template rendered
+    while handling it (includes, inclusion tags, partials) shares the result.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def values(self):
+        user = self.request.user
+
+        # Get comprehensive navigation context
+        context = get_navigation_context(user)
+
+        # Add additional template-specific context
+        context.update({
+            'user_dashboard_url': get_user_dashboard_url(user),
+            'can_access_admin': context['is_admin'] or context['is_superadmin'],
+            'can_access_site_manager': context['is_site_manager'] or context['is_superadmin'],
+            'can_access_client': context['is_public_user'] or context['is_superadmin'],
+            'show_admin_nav': context['is_admin'],
+            'show_site_manager_nav': context['is_site_manager'],
+            'show_public_nav': context['is_public_user'] or not user.is_authenticated,
+        })
+        return context
+
+    def get(self, key):
+        return self.values[key]
+
+
+def get_role_navigation(request):
+    """Return the memoized RoleNavigation for a request"""
+    navigation = getattr(request, '_role_navigation', None)
+    if navigation is None:
+        navigation = request._role_navigation = RoleNavigation(request)
+    return navigation
+
 
 def role_context(request):
     """
     Context processor to add user role information to all templates.
     This makes role-based template logic easier to implement.
-    
+
+    Values are callables: the template engine calls them when a variable is
+    read, so pages that never look at the role (e.g. anonymous public pages)
+    never touch request.user or the profile tables.
+
     Usage in templates:
         {% if user_role == 'admin' %}
             <!-- Admin-specific content -->
@@ -20,19 +87,6 @@ def role_context(request):
     """
     if not hasattr(request, 'user'):
         return {}
-    
-    # Get comprehensive navigation context
-    context = get_navigation_context(request.user)
-    
-    # Add additional template-specific context
-    context.update({
-        'user_dashboard_url': get_user_dashboard_url(request.user),
-        'can_access_admin': context['is_admin'] or context['is_superadmin'],
-        'can_access_site_manager': context['is_site_manager'] or context['is_superadmin'],
-        'can_access_client': context['is_public_user'] or context['is_superadmin'],
-        'show_admin_nav': context['is_admin'],
-        'show_site_manager_nav': context['is_site_manager'],
-        'show_public_nav': context['is_public_user'] or not request.user.is_authenticated,
-    })
-    
-    return context
+
+    navigation = get_role_navigation(request)
+    return {key: partial(navigation.get, key) for key in ROLE_CONTEXT_KEYS}
@@ -1,8 +1,11 @@
+import logging
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 from .models import Profile
 
+logger = logging.getLogger(__name__)
+
 class ClientRegisterForm(UserCreationForm):
     email = forms.EmailField(required=True)
     first_name = forms.CharField(max_length=30, required=True)
@@ -83,7 +86,7 @@ class ProfileUpdateForm(forms.ModelForm):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         
-        print(f"[DEBUG] FORM - Initializing form for user: {user.username if user else 'None'}")
+        logger.debug("Initializing profile form", extra={'user_id': user.id if user else None})
         
         if user:
             # Override initial values with current user data
@@ -96,11 +99,11 @@ class ProfileUpdateForm(forms.ModelForm):
             self.fields['last_name'].widget.attrs['value'] = user.last_name or ''
             self.fields['email'].widget.attrs['value'] = user.email or ''
             
-            print(f"[DEBUG] FORM - Set user data: {user.first_name} {user.last_name} ({user.email})")
+            logger.debug("Profile form populated from user", extra={'user_id': user.id})
         
         # Debug profile instance data
         if hasattr(self, 'instance') and self.instance and self.instance.pk:
-            print(f"[DEBUG] FORM - Profile instance: phone={self.instance.phone}, architect={self.instance.assigned_architect}, project={self.instance.project_name}")
+            logger.debug("Profile form bound to profile", extra={'profile_id': self.instance.pk})
             
             # Override initial values with profile data
             self.initial['phone'] = self.instance.phone or ''
@@ -113,7 +116,7 @@ class ProfileUpdateForm(forms.ModelForm):
             self.fields['assigned_architect'].widget.attrs['value'] = self.instance.assigned_architect or ''
             self.fields['project_name'].widget.attrs['value'] = self.instance.project_name or ''
         else:
-            print(f"[DEBUG] FORM - No profile instance or new profile")
+            logger.debug("Profile form has no saved profile")
     
     def save(self, user=None, commit=True):
         profile = super().save(commit=False)
@@ -133,11 +136,11 @@ class ProfileUpdateForm(forms.ModelForm):
             profile.user = user
             if commit:
                 profile.save()
-                print(f"[DEBUG] Profile saved for user: {user.username} (ID: {user.id})")
+                logger.info("Profile saved", extra={'user_id': user.id, 'profile_id': profile.pk})
                 if profile.profile_pic:
-                    print(f"[DEBUG] Profile picture saved: {profile.profile_pic.url}")
+                    logger.debug("Profile picture saved", extra={'user_id': user.id})
                 else:
-                    print(f"[DEBUG] No profile picture uploaded")
+                    logger.debug("No profile picture uploaded", extra={'user_id': user.id})
         return profile
 
 
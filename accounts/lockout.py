@@ -0,0 +1,223 @@
+"""
+Login lockout shared by every login form (client, admin, site manager and
+the Django admin).
+
+django-axes runs it. LockoutBackend refuses to authenticate a locked-out
+client, and Django's login signals feed the handler below.
+Axes' database handler writes a row on every failed attempt. This handler
+counts failures in the cache instead, over a sliding window, per username +
+IP (AXES_LOCKOUT_PARAMETERS). The database is written only when a client
+actually gets locked out: one AccessAttempt row, which shows up in the axes
+admin and can be cleared with `axes_reset`.
+
+The sliding window is approximated with two fixed buckets. The count is
+this bucket plus the previous one weighted by how much of it still overlaps
+the window. That is two cache reads and one increment per attempt, and no
+burst at a bucket boundary gets a fresh allowance.
+
+Counts and locks live in the cache, so every worker should share it: with
+a per-process cache each worker allows its own AXES_FAILURE_LIMIT before
+the first lockout, and axes_reset only clears the worker it runs in.
+check_lockout_cache() reports that through the system checks (`manage.py
+check --deploy`). The AccessAttempt row backs the lock up: a client with no
+lock in the cache is still refused while its row is within the cool-off,
+so another worker, a restart or an evicted key does not lift a lock.
+"""
+import logging
+import time
+from typing import Optional
+
+from django.core import checks
+from django.utils import timezone
+
+from axes.backends import AxesStandaloneBackend
+from axes.conf import settings
+from axes.exceptions import AxesBackendPermissionDenied
+from axes.handlers.base import AbstractAxesHandler, AxesBaseHandler
+from axes.helpers import (
+    get_cache,
+    get_cache_timeout,
+    get_client_cache_keys,
+    get_cool_off,
+    get_client_str,
+    get_client_username,
+    get_credentials,
+    get_failure_limit,
+)
+from axes.models import AccessAttempt
+from axes.signals import user_locked_out
+
+from core.cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def check_lockout_cache(app_configs=None, **kwargs):
+    """System check: failures are counted in a cache every worker should share"""
+    if settings.DEBUG or settings.AXES_HANDLER != f'{__name__}.SlidingWindowLockoutHandler':
+        return []
+    alias = getattr(settings, 'AXES_CACHE', 'default')
+    if is_shared_cache(alias):
+        return []
+    return [checks.Warning(
+        f'The login lockout counts failures in a per-process cache (AXES_CACHE {alias!r}).',
+        hint=(
+            'Each worker allows its own AXES_FAILURE_LIMIT before the first lockout. Set REDIS_URL, '
+            'or CACHE_BACKEND and CACHE_LOCATION, to a cache every worker shares.'
+        ),
+        id='accounts.W001',
+    )]
+
+
+class LockoutBackend(AxesStandaloneBackend):
+    """
+    Axes' lockout check, for logins made from a request.
+
+    authenticate() without a request (the test client, management commands)
+    is a server-side call: there is no client to lock out, so it is passed on
+    to the next backend instead of raising.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if request is None:
+            return None
+        try:
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        except AxesBackendPermissionDenied:
+            # Tell the handler the failure is the lock itself, not a new attempt
+            request.axes_locked_out = True
+            raise
+
+
+class SlidingWindowLockoutHandler(AbstractAxesHandler, AxesBaseHandler):
+    """Axes handler (AXES_HANDLER) with cache-only failure counting"""
+
+    def __init__(self):
+        self.cache = get_cache()
+
+    @property
+    def window(self):
+        return settings.LOGIN_FAILURE_WINDOW_SECONDS
+
+    def _bucket_keys(self, key, now):
+        bucket = int(now // self.window)
+        return f'{key}:{bucket}', f'{key}:{bucket - 1}'
+
+    def _count(self, key, now):
+        current, previous = self._bucket_keys(key, now)
+        counts = self.cache.get_many([current, previous])
+        overlap = 1 - (now % self.window) / self.window
+        return counts.get(current, 0) + counts.get(previous, 0) * overlap
+
+    def _is_locked(self, request, credentials, keys):
+        if self.cache.get_many([f'{key}:locked' for key in keys]):
+            return True
+        # Not in the cache: the lockout row is the record that survives
+        # restarts and evictions (one indexed read, on the login path only)
+        cool_off = get_cool_off(request)
+        attempts = AccessAttempt.objects.filter(
+            username=get_client_username(request, credentials), ip_address=request.axes_ip_address,
+            failures_since_start__gte=get_failure_limit(request, credentials),
+        )
+        if cool_off is not None:
+            attempts = attempts.filter(attempt_time__gt=timezone.now() - cool_off)
+        locked_at = attempts.order_by('-attempt_time').values_list('attempt_time', flat=True).first()
+        if locked_at is None:
+            return False
+        remaining = None if cool_off is None else (locked_at + cool_off - timezone.now()).total_seconds()
+        if remaining is None or remaining > 0:
+            self.cache.set_many({f'{key}:locked': 1 for key in keys},
+                                timeout=None if remaining is None else int(remaining) + 1)
+        return True
+
+    def get_failures(self, request, credentials: Optional[dict] = None) -> int:
+        keys = get_client_cache_keys(request, credentials)
+        if self._is_locked(request, credentials, keys):
+            return get_failure_limit(request, credentials)
+        now = time.time()
+        return int(max(self._count(key, now) for key in keys))
+
+    def user_login_failed(self, sender, credentials: dict, request=None, **kwargs):
+        if request is None:
+            return  # server-side authenticate(), see LockoutBackend
+
+        username = get_client_username(request, credentials)
+        if getattr(request, 'axes_locked_out', False):
+            # Refused by the backend: already locked, so don't extend the lock
+            request.axes_credentials = credentials
+            user_locked_out.send('axes', request=request, username=username, ip_address=request.axes_ip_address)
+            return
+        if self.is_whitelisted(request, credentials):
+            return
+
+        now = time.time()
+        keys = get_client_cache_keys(request, credentials)
+        failures = 0
+        for key in keys:
+            current, _ = self._bucket_keys(key, now)
+            # Outlive the bucket so it can still count as the previous one
+            if not self.cache.add(current, 1, timeout=2 * self.window):
+                try:
+                    self.cache.incr(current)
+                except ValueError:  # expired between add() and incr()
+                    self.cache.set(current, 1, timeout=2 * self.window)
+            failures = max(failures, self._count(key, now))
+        failures = int(failures)
+        request.axes_failures_since_start = failures
+
+        limit = get_failure_limit(request, credentials)
+        if not settings.AXES_LOCK_OUT_AT_FAILURE or failures < limit:
+            return
+
+        client_str = get_client_str(
+            username, request.axes_ip_address, request.axes_user_agent, request.axes_path_info, request,
+        )
+        logger.warning("Locking out client after repeated login failures", extra={
+            'client': client_str, 'failures': failures,
+        })
+        self.cache.set_many({f'{key}:locked': 1 for key in keys}, timeout=get_cache_timeout(request))
+        AccessAttempt.objects.update_or_create(
+            username=username, ip_address=request.axes_ip_address, user_agent=request.axes_user_agent[:255],
+            defaults={
+                'http_accept': request.axes_http_accept[:1025], 'path_info': request.axes_path_info[:255],
+                'get_data': '', 'post_data': '', 'failures_since_start': failures,
+                # The cool-off runs from the latest lockout (see _is_locked)
+                'attempt_time': timezone.now(),
+            },
+        )
+        request.axes_locked_out = True
+        request.axes_credentials = credentials
+        user_locked_out.send('axes', request=request, username=username, ip_address=request.axes_ip_address)
+
+    def _delete_keys(self, keys):
+        now = time.time()
+        names = [name for key in keys for name in (*self._bucket_keys(key, now), f'{key}:locked')]
+        self.cache.delete_many(names)
+
+    def user_logged_in(self, sender, request, user, **kwargs):
+        if settings.AXES_RESET_ON_SUCCESS:
+            self._delete_keys(get_client_cache_keys(request, get_credentials(user.get_username())))
+
+    def user_logged_out(self, sender, request, user, **kwargs):
+        pass
+
+    def post_save_access_attempt(self, instance, **kwargs):
+        pass
+
+    def post_delete_access_attempt(self, instance, **kwargs):
+        # Deleting the row (axes_reset, the axes admin) lifts the lock
+        self._delete_keys(get_client_cache_keys(instance))
+
+    def reset_attempts(self, *, ip_address: Optional[str] = None, username: Optional[str] = None,
+                       ip_or_username: bool = False) -> int:
+        """Lift locks and forget recent failures; see post_delete_access_attempt"""
+        attempts = AccessAttempt.objects.all()
+        if ip_address and username and not ip_or_username:
+            attempts = attempts.filter(ip_address=ip_address, username=username)
+        elif ip_address and username:
+            attempts = attempts.filter(ip_address=ip_address) | attempts.filter(username=username)
+        elif ip_address:
+            attempts = attempts.filter(ip_address=ip_address)
+        elif username:
+            attempts = attempts.filter(username=username)
+        return attempts.delete()[0]
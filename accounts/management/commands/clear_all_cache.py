@@ -34,11 +34,19 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'❌ Error clearing Django cache: {str(e)}'))
 
     def clear_sessions(self):
-        """Clear all session data"""
+        """
+        Clear all session data.
+
+        Rows are deleted, and with cached_db so are their copies in the
+        session cache. This command runs in its own process, so it cannot
+        reach a per-process (local memory) cache inside the running workers;
+        that is why cached_db requires a shared cache.
+        """
         try:
-            from django.contrib.sessions.models import Session
-            Session.objects.all().delete()
-            self.stdout.write(self.style.SUCCESS('✅ Session data cleared'))
+            from core.sessions import delete_sessions
+            # In batches: one DELETE of the whole table would block logins
+            deleted = delete_sessions(expired_only=False)
+            self.stdout.write(self.style.SUCCESS(f'✅ Session data cleared ({deleted} sessions)'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'❌ Error clearing sessions: {str(e)}'))
 
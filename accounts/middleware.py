@@ -3,22 +3,50 @@ Role-Based Access Control Middleware for Triple G BuildHub
 Handles routing users to appropriate interfaces based on their roles.
 """
 import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import reverse
-from django.utils.deprecation import MiddlewareMixin
+
+from .models import AdminProfile
 
 logger = logging.getLogger('security')
 
-class RoleBasedAccessMiddleware(MiddlewareMixin):
+class RoleBasedAccessMiddleware:
     """
     Middleware to enforce role-based access control across the application.
     Routes users to appropriate interfaces and blocks unauthorized access.
+
+    Sync and async capable: under ASGI the user and their AdminProfile are
+    loaded with the async ORM and the rules are applied on the event loop,
+    so the request is not handed to a thread here.
     """
     
+    sync_capable = True
+    async_capable = True
+    
     def __init__(self, get_response):
         self.get_response = get_response
-        super().__init__(get_response)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_request(request) or self.get_response(request)
+    
+    async def __acall__(self, request):
+        if self._should_skip_middleware(request):
+            return await self.get_response(request)
+        
+        user = await request.auser()
+        # Later sync code reads request.user; don't load the user twice
+        request.user = user
+        user_role = await self._aget_user_role(user)
+        request.user_role = user_role
+        
+        response = self._enforce_access_control(request, user_role, request.path)
+        return response or await self.get_response(request)
     
     def process_request(self, request):
         """Process each request to enforce access control"""
@@ -31,6 +59,9 @@ class RoleBasedAccessMiddleware(MiddlewareMixin):
         user_role = self._get_user_role(request.user)
         current_path = request.path
         
+        # Expose the role to later code (e.g. request instrumentation)
+        request.user_role = user_role
+        
         # Apply access control rules
         return self._enforce_access_control(request, user_role, current_path)
     
@@ -55,9 +86,30 @@ class RoleBasedAccessMiddleware(MiddlewareMixin):
         if user.is_superuser:
             return 'superadmin'
         
+        return self._get_profile_role(getattr(user, 'adminprofile', None))
+    
+    async def _aget_user_role(self, user):
+        """_get_user_role for the async path"""
+        if not user.is_authenticated:
+            return 'anonymous'
+        
+        if user.is_superuser:
+            return 'superadmin'
+        
+        if type(user).adminprofile.is_cached(user):
+            # Loaded with the user (accounts.backends.ProfileBackend)
+            return self._get_profile_role(getattr(user, 'adminprofile', None))
+        admin_profile = await AdminProfile.objects.filter(user=user).afirst()
+        if admin_profile is not None:
+            # can_login() reads user.is_active; reuse the loaded user
+            admin_profile.user = user
+        return self._get_profile_role(admin_profile)
+    
+    def _get_profile_role(self, admin_profile):
+        """Role of an authenticated, non-superuser given their AdminProfile (or None)"""
         # Check for AdminProfile
-        if hasattr(user, 'adminprofile') and user.adminprofile.can_login():
-            admin_role = user.adminprofile.admin_role
+        if admin_profile is not None and admin_profile.can_login():
+            admin_role = admin_profile.admin_role
             
             # Site Manager (site_manager role)
             if admin_role == 'site_manager':
@@ -1,3 +1,184 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from axes.models import AccessAttempt
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from accounts.backends import ProfileBackend
+from accounts.context_processors import role_context
+from accounts.lockout import check_lockout_cache
+from accounts.models import AdminProfile, SiteManagerProfile
+from accounts.utils import get_navigation_context, get_user_role
+
+
+class RoleContextProcessorTest(TestCase):
+    """Test that role_context is lazy and memoized per request"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _request(self, user):
+        self.user_loads = 0
+
+        def load_user():
+            self.user_loads += 1
+            return user
+
+        request = self.factory.get('/')
+        request.user = SimpleLazyObject(load_user)
+        return request
+
+    def test_unread_context_does_no_role_work(self):
+        request = self._request(AnonymousUser())
+        with patch('accounts.context_processors.get_navigation_context') as navigation:
+            context = role_context(request)
+            Template('<h1>Triple G</h1>').render(Context(context))
+        navigation.assert_not_called()
+        self.assertEqual(self.user_loads, 0)
+
+    def test_values_resolve_in_templates(self):
+        request = self._request(AnonymousUser())
+        template = Template("{{ user_role }}|{% if show_public_nav %}public{% endif %}|{{ user_dashboard_url }}")
+        self.assertEqual(
+            template.render(Context(role_context(request))),
+            'anonymous|public|accounts:client_login',
+        )
+
+    def test_navigation_computed_once_per_request(self):
+        user = User.objects.create_superuser('root@test.com', 'root@test.com', 'testpass123')
+        request = self._request(user)
+        template = Template("{% if can_access_admin %}{{ dashboard_url }}{% endif %}")
+        with patch('accounts.context_processors.get_navigation_context',
+                   wraps=get_navigation_context) as navigation:
+            # Each render of a partial calls the context processor again
+            first = template.render(Context(role_context(request)))
+            second = template.render(Context(role_context(request)))
+        self.assertEqual(first, '/admin/')
+        self.assertEqual(second, '/admin/')
+        navigation.assert_called_once()
+
+
+class ProfileBackendTest(TestCase):
+    """Test loading the session user with their profiles"""
+
+    def setUp(self):
+        self.manager = User.objects.create_user('site_mgr', 'site@test.com', 'testpass123')
+        SiteManagerProfile.objects.create(user=self.manager, approval_status='approved')
+        self.admin = User.objects.create_user('boss', 'boss@test.com', 'testpass123')
+        AdminProfile.objects.create(user=self.admin, approval_status='approved', admin_role='admin')
+        self.client_user = User.objects.create_user('client', 'client@test.com', 'testpass123')
+
+    def test_role_checks_use_the_loaded_profiles(self):
+        backend = ProfileBackend()
+        for user, role in ((self.manager, 'site_manager'), (self.admin, 'admin'), (self.client_user, 'public')):
+            with self.assertNumQueries(1):
+                loaded = backend.get_user(user.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_user_role(loaded), role)
+
+    def test_inactive_and_missing_users(self):
+        User.objects.filter(pk=self.admin.pk).update(is_active=False)
+        self.assertIsNone(ProfileBackend().get_user(self.admin.pk))
+        self.assertIsNone(ProfileBackend().get_user(0))
+
+    async def test_async_loading(self):
+        user = await ProfileBackend().aget_user(self.admin.pk)
+        self.assertEqual(user.adminprofile.admin_role, 'admin')
+
+    def test_session_user_is_loaded_by_the_backend(self):
+        self.client.force_login(self.manager)
+        response = self.client.get('/')
+        user = response.wsgi_request.user
+        self.assertEqual(user.pk, self.manager.pk)
+        # request.user is lazy; the loaded user already holds the profile
+        self.assertTrue(User.sitemanagerprofile.is_cached(user._wrapped))
+
+
+class LoginLockoutTest(TestCase):
+    """Test the cache-backed lockout shared by the login views"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('boss@test.com', 'boss@test.com', 'testpass123', is_staff=True)
+        AdminProfile.objects.create(user=self.admin, approval_status='approved')
+        self.manager = User.objects.create_user('site_mgr', 'site@test.com', 'testpass123')
+        SiteManagerProfile.objects.create(user=self.manager, approval_status='approved')
+
+    def _admin_login(self, password, ip='198.51.100.7'):
+        return self.client.post('/accounts/admin-auth/login/', {'email': 'boss@test.com', 'password': password},
+                                REMOTE_ADDR=ip)
+
+    def test_failures_are_counted_without_database_writes(self):
+        for attempt in range(4):
+            with CaptureQueriesContext(connection) as queries:
+                response = self._admin_login('wrong')
+            writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+            self.assertEqual(writes, [])
+            errors = [str(m) for m in get_messages(response.wsgi_request)]
+            self.assertIn(f'{4 - attempt} attempts remaining', errors[-1])
+        profile = self.admin.adminprofile
+        profile.refresh_from_db()
+        self.assertIsNone(profile.account_locked_until)
+
+        # The fifth failure locks this username + IP and records it once
+        self.assertEqual(self._admin_login('wrong').status_code, 429)
+        attempt = AccessAttempt.objects.get()
+        self.assertEqual((attempt.username, attempt.failures_since_start), ('boss@test.com', 5))
+
+        # Even the right password is refused while locked, without another row
+        self.assertEqual(self._admin_login('testpass123').status_code, 429)
+        self.assertEqual(AccessAttempt.objects.count(), 1)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+        # Another IP is counted separately
+        self.assertEqual(self._admin_login('testpass123', ip='203.0.113.5').status_code, 302)
+
+    def test_unknown_users_count_and_success_resets(self):
+        url = '/accounts/sitemanager/login/'
+        for _ in range(4):
+            self.client.post(url, {'email': 'nobody@test.com', 'password': 'x'})
+        self.assertEqual(self.client.post(url, {'email': 'nobody@test.com', 'password': 'x'}).status_code, 429)
+
+        for _ in range(4):
+            self.client.post(url, {'email': 'site@test.com', 'password': 'wrong'})
+        self.assertEqual(self.client.post(url, {'email': 'site@test.com', 'password': 'testpass123'}).status_code,
+                         302)
+        self.client.logout()
+        # The successful login cleared the earlier failures
+        response = self.client.post(url, {'email': 'site@test.com', 'password': 'wrong'})
+        self.assertContains(response, '4 attempts remaining')
+
+    def test_axes_reset_lifts_the_lock(self):
+        from axes.utils import reset
+        for _ in range(5):
+            self._admin_login('wrong')
+        self.assertEqual(self._admin_login('testpass123').status_code, 429)
+        self.assertEqual(reset(username='boss@test.com'), 1)
+        self.assertEqual(self._admin_login('testpass123').status_code, 302)
+
+    def test_lock_outlives_the_cache(self):
+        for _ in range(5):
+            self._admin_login('wrong')
+        # Another worker, a restart or an eviction: the lockout row still counts
+        cache.clear()
+        self.assertEqual(self._admin_login('testpass123').status_code, 429)
+        self.assertEqual(AccessAttempt.objects.count(), 1)
+        # ...only within the cool-off
+        AccessAttempt.objects.update(attempt_time=timezone.now() - timedelta(hours=2))
+        cache.clear()
+        self.assertEqual(self._admin_login('testpass123').status_code, 302)
+
+    @override_settings(DEBUG=False)
+    def test_warns_about_a_local_cache(self):
+        self.assertEqual([warning.id for warning in check_lockout_cache()], ['accounts.W001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'c'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_lockout_cache(), [])
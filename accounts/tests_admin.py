@@ -2,6 +2,7 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core import mail
+from django.core.cache import cache
 from datetime import date, timedelta
 from django.utils import timezone
 from .models import AdminProfile, OneTimePassword
@@ -12,6 +13,8 @@ class AdminAuthenticationTest(TestCase):
     def setUp(self):
         """Set up test data"""
         self.client = Client()
+        # Login failures are counted in the cache (accounts.lockout)
+        cache.clear()
         
         # Create a test admin user
         self.admin_user = User.objects.create_user(
@@ -124,9 +127,8 @@ class AdminAuthenticationTest(TestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, 200)  # Should stay on form
         
-        # Check failed login attempts incremented
-        self.admin_profile.refresh_from_db()
-        self.assertEqual(self.admin_profile.failed_login_attempts, 1)
+        # Check failed login attempts counted
+        self.assertEqual(response.wsgi_request.axes_failures_since_start, 1)
 
     def test_admin_login_pending_approval(self):
         """Test admin login with pending approval"""
@@ -155,16 +157,20 @@ class AdminAuthenticationTest(TestCase):
             'remember': False
         }
         
-        # Make 5 failed attempts
-        for i in range(5):
+        # Make 4 failed attempts
+        for i in range(4):
             response = self.client.post(url, data)
             self.assertEqual(response.status_code, 200)
         
-        # Check account is locked
+        # The 5th locks this email + IP out, even with the right password
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(url, {**data, 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 429)
+        
+        # Failures are no longer written to the profile
         self.admin_profile.refresh_from_db()
-        self.assertEqual(self.admin_profile.failed_login_attempts, 5)
-        self.assertIsNotNone(self.admin_profile.account_locked_until)
-        self.assertTrue(self.admin_profile.is_account_locked())
+        self.assertEqual(self.admin_profile.failed_login_attempts, 0)
 
     def test_admin_otp_verification(self):
         """Test admin OTP verification"""
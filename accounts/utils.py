@@ -2,13 +2,43 @@
 Utility functions for role-based access control in Triple G BuildHub
 """
 import logging
+import time
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
+from core.metrics import ACCESS_VIOLATIONS, OTP_EMAILS, OTP_EMAIL_DURATION
 
 logger = logging.getLogger('security')
+mail_logger = logging.getLogger(__name__)
+
+def send_otp_email(subject, message, from_email, recipient_list, fail_silently=False):
+    """
+    Send an OTP verification email, recording the outcome and latency in
+    core.metrics. Takes the same arguments as django.core.mail.send_mail.
+    """
+    started = time.perf_counter()
+    try:
+        result = send_mail(subject, message, from_email, recipient_list, fail_silently=fail_silently)
+    except Exception:
+        OTP_EMAILS.inc(status='failed')
+        raise
+    finally:
+        OTP_EMAIL_DURATION.observe(time.perf_counter() - started)
+    OTP_EMAILS.inc(status='sent' if result else 'failed')
+    return result
+
+async def asend_otp_email(subject, message, from_email, recipient_list, fail_silently=False):
+    """
+    send_otp_email for async views. SMTP is blocking, so the send runs in a
+    worker thread of its own (not the request's) and the event loop keeps
+    serving other requests in the meantime.
+    """
+    return await sync_to_async(send_otp_email, thread_sensitive=False)(
+        subject, message, from_email, recipient_list, fail_silently=fail_silently,
+    )
 
 def send_admin_approval_email(profile, approved_by_user):
     """
@@ -73,7 +103,7 @@ Triple G BuildHub Team
         return True
         
     except Exception as e:
-        print(f"Failed to send approval email to {user.email}: {str(e)}")
+        mail_logger.exception("Failed to send approval email", extra={'user_id': user.id})
         return False
 
 def send_admin_denial_email(profile):
@@ -121,7 +151,7 @@ Triple G BuildHub Team
         return True
         
     except Exception as e:
-        print(f"Failed to send denial email to {user.email}: {str(e)}")
+        mail_logger.exception("Failed to send denial email", extra={'user_id': user.id})
         return False
 
 def send_admin_suspension_email(profile):
@@ -172,7 +202,7 @@ Triple G BuildHub Team
         return True
         
     except Exception as e:
-        print(f"Failed to send suspension email to {user.email}: {str(e)}")
+        mail_logger.exception("Failed to send suspension email", extra={'user_id': user.id})
         return False
 
 def get_user_role(user):
@@ -345,6 +375,7 @@ def log_access_violation(user, attempted_path, client_ip, violation_type='unauth
         violation_type (str): Type of violation
     """
     role = get_user_role(user)
+    ACCESS_VIOLATIONS.inc(violation_type=violation_type)
     
     if user.is_authenticated:
         logger.warning(
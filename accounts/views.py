@@ -1,6 +1,6 @@
+import logging
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
@@ -13,7 +13,22 @@ from django.utils import timezone
 from datetime import timedelta
 from .forms import ClientRegisterForm, OTPForm, AdminRegisterForm, AdminLoginForm, AdminOTPForm
 from .models import OneTimePassword, AdminProfile, SiteManagerProfile, Profile
-from .utils import get_user_role, get_user_dashboard_url, get_appropriate_redirect
+from .utils import get_user_role, get_user_dashboard_url, get_appropriate_redirect, send_otp_email, asend_otp_email
+
+logger = logging.getLogger(__name__)
+
+
+def login_failure_message(request, message="Invalid credentials."):
+    """The error for a failed login, with the attempts left before lockout"""
+    failures = getattr(request, 'axes_failures_since_start', None)
+    if getattr(request, 'axes_locked_out', False):
+        return "Too many failed attempts. Please try again later."
+    if failures:
+        remaining = max(settings.AXES_FAILURE_LIMIT - failures, 0)
+        return f"{message} {remaining} attempts remaining."
+    return message
+
+
 @csrf_protect
 @never_cache
 @transaction.atomic
@@ -33,15 +48,15 @@ def client_register_view(request):
                     )
                     
                     # Send OTP via email
-                    print(f"[DEBUG] Sending OTP to: {user.email} from: {settings.DEFAULT_FROM_EMAIL} code: {code}")
-                    result = send_mail(
+                    logger.info("Sending registration OTP", extra={'user_id': user.id})
+                    result = send_otp_email(
                         "Verify your Triple G account",
                         f"Your OTP code is {code}. It will expire in 10 minutes.",
                         settings.DEFAULT_FROM_EMAIL,
                         [user.email],
                         fail_silently=False,
                     )
-                    print(f"[DEBUG] send_mail result: {result}")
+                    logger.debug("Registration OTP handed to mail server", extra={'user_id': user.id, 'sent': result})
                     
                     messages.info(request, "Account created! Please verify with the OTP sent to your email.")
                     request.session['pending_user_id'] = user.id
@@ -93,22 +108,22 @@ def client_verify_otp(request):
     
     return render(request, "client/verify_otp.html", {"form": form, "email": user.email})
 
-# Client Resend OTP
-def client_resend_otp(request):
-    user_id = request.session.get('pending_user_id')
+# Client Resend OTP (async: the SMTP round trip doesn't hold a worker)
+async def client_resend_otp(request):
+    user_id = await request.session.aget('pending_user_id')
     if not user_id:
         return redirect("accounts:client_register")
     
     try:
-        user = User.objects.get(id=user_id)
+        user = await User.objects.aget(id=user_id)
     except User.DoesNotExist:
         return redirect("accounts:client_register")
     
     code = OneTimePassword.generate_code()
-    OneTimePassword.objects.update_or_create(user=user, defaults={"code": code})
+    await OneTimePassword.objects.aupdate_or_create(user=user, defaults={"code": code})
     
     try:
-        send_mail(
+        await asend_otp_email(
             "Resend OTP - Triple G account",
             f"Your new OTP code is {code}. It will expire in 10 minutes.",
             settings.DEFAULT_FROM_EMAIL,
@@ -129,9 +144,8 @@ def client_login_view(request):
     if request.method == "POST":
         # Check if this is a registration attempt
         if 'register' in request.POST:
-            print("[DEBUG] Registration attempt detected")
+            logger.debug("Registration attempt from login page")
             from django.contrib.auth.models import User
-            from django.core.mail import send_mail
             from .models import OneTimePassword, Profile
             from django.db import IntegrityError
 
@@ -141,10 +155,8 @@ def client_login_view(request):
             password = request.POST.get('reg_password')
             username = email
 
-            print(f"[DEBUG] Registration data - Name: {first_name} {last_name}, Email: {email}")
-
             if not all([first_name, last_name, email, password]):
-                print("[DEBUG] Missing required fields")
+                logger.debug("Registration rejected: missing required fields")
                 reg_messages.append({'tags': 'error', 'message': 'Please fill out all fields to register.'})
             # Remove this duplicate check since we handle it below
             # elif User.objects.filter(username=username).exists() or User.objects.filter(email=email).exists():
@@ -152,12 +164,14 @@ def client_login_view(request):
             #     reg_messages.append({'tags': 'error', 'message': 'This email is already registered. Please try logging in.'})
             else:
                 try:
-                    print("[DEBUG] Creating new user...")
                     with transaction.atomic():
                         # Check if user already exists (including inactive users)
                         existing_user = User.objects.filter(username=username).first()
                         if existing_user:
-                            print(f"[DEBUG] User already exists: {existing_user.username} (Active: {existing_user.is_active})")
+                            logger.debug(
+                                "Registration for existing user",
+                                extra={'user_id': existing_user.id, 'active': existing_user.is_active},
+                            )
                             if not existing_user.is_active:
                                 # Reactivate existing inactive user and resend OTP
                                 user = existing_user
@@ -165,51 +179,45 @@ def client_login_view(request):
                                 user.last_name = last_name
                                 user.set_password(password)
                                 user.save()
-                                print(f"[DEBUG] Reactivated existing user: {user.username}")
+                                logger.info("Re-registered inactive user", extra={'user_id': user.id})
                             else:
                                 reg_messages.append({'tags': 'error', 'message': 'This email is already registered and active. Please try logging in.'})
                                 return render(request, 'client/login.html', {'reg_messages': reg_messages})
                         else:
                             # Create new user
                             user = User.objects.create_user(username=username, email=email, password=password, first_name=first_name, last_name=last_name, is_active=False)
-                            print(f"[DEBUG] User created: {user.username} (ID: {user.id})")
+                            logger.info("User created", extra={'user_id': user.id})
                         
                         # Create profile manually (signal is disabled)
-                        print(f"[DEBUG] Checking for existing profiles...")
                         existing_profiles = Profile.objects.filter(user=user)
-                        print(f"[DEBUG] Found {existing_profiles.count()} existing profiles for user {user.id}")
                         
                         if existing_profiles.exists():
                             profile = existing_profiles.first()
-                            print(f"[DEBUG] Using existing profile: {profile.id}")
+                            logger.debug("Using existing profile", extra={'user_id': user.id, 'profile_id': profile.id})
                         else:
-                            print(f"[DEBUG] Creating new profile for user: {user.username}")
                             profile = Profile.objects.create(user=user, role='customer')
-                            print(f"[DEBUG] Profile created successfully: {profile.id}")
+                            logger.info("Profile created", extra={'user_id': user.id, 'profile_id': profile.id})
                         
                         code = OneTimePassword.generate_code()
                         OneTimePassword.objects.update_or_create(user=user, defaults={"code": code})
-                        print(f"[DEBUG] OTP generated: {code}")
                         
-                        send_mail(
+                        send_otp_email(
                             "Verify your Triple G account",
                             f"Your OTP code is {code}. It will expire in 10 minutes.",
                             settings.DEFAULT_FROM_EMAIL,
                             [user.email],
                             fail_silently=False,
                         )
-                        print(f"[DEBUG] OTP email sent to: {user.email}")
+                        logger.info("Registration OTP sent", extra={'user_id': user.id})
                         
                         request.session['pending_user_id'] = user.id
-                        print(f"[DEBUG] Session set with user ID: {user.id}")
                         messages.info(request, "Account created! Please verify with the OTP sent to your email.")
-                        print("[DEBUG] Redirecting to OTP verification...")
                         return redirect("accounts:client_verify_otp")
                 except IntegrityError as e:
-                    print(f"[DEBUG] IntegrityError: {e}")
+                    logger.warning("Registration failed on integrity error", exc_info=True)
                     reg_messages.append({'tags': 'error', 'message': 'Something went wrong on our end. Please try again.'})
                 except Exception as e:
-                    print(f"[DEBUG] Exception during registration: {e}")
+                    logger.exception("Registration failed")
                     reg_messages.append({'tags': 'error', 'message': 'An unexpected error occurred. Please try again shortly.'})
         
         # Handle login attempt
@@ -269,7 +277,7 @@ def admin_register_view(request):
                     )
                     
                     # Send verification email
-                    send_mail(
+                    send_otp_email(
                         "Verify your Triple G Admin Account",
                         f"Your admin account verification code is {code}. It will expire in 10 minutes. "
                         f"After verification, your account will be reviewed for approval.",
@@ -288,7 +296,7 @@ def admin_register_view(request):
                     
             except Exception as e:
                 messages.error(request, "Error creating admin account. Please try again.")
-                print(f"[ERROR] Admin registration failed: {e}")
+                logger.exception("Admin registration failed")
     else:
         form = AdminRegisterForm()
     
@@ -299,9 +307,7 @@ def admin_register_view(request):
 @never_cache
 def admin_login_view(request):
     """Admin login with enhanced security checks"""
-    print(f"[DEBUG] admin_login_view called! Method: {request.method}")
-    print(f"[DEBUG] Request path: {request.path}")
-    print(f"[DEBUG] Request META: {request.META.get('HTTP_HOST', 'No host')}")
+    logger.debug("Admin login view", extra={'method': request.method, 'host': request.get_host()})
     
     if request.method == "POST":
         form = AdminLoginForm(request.POST)
@@ -326,21 +332,20 @@ def admin_login_view(request):
                 
                 admin_profile = user.adminprofile
                 
-                # Check if account is locked
+                # Locked by an administrator (repeated failures are axes' job)
                 if admin_profile.is_account_locked():
                     messages.error(request, "Account is temporarily locked. Please try again later.")
                     return render(request, 'admin/custom_admin_login.html', {'form': form})
                 
-                # Authenticate user
+                # Authenticate user; axes refuses locked-out clients here
                 auth_user = authenticate(request, username=email, password=password)
                 
                 if auth_user is not None:
                     # Check if admin can login (approved, active, not suspended)
                     if admin_profile.can_login():
-                        # Reset failed login attempts
-                        admin_profile.failed_login_attempts = 0
-                        admin_profile.last_login_ip = client_ip
-                        admin_profile.save()
+                        if admin_profile.last_login_ip != client_ip:
+                            admin_profile.last_login_ip = client_ip
+                            admin_profile.save(update_fields=['last_login_ip', 'updated_at'])
                         
                         # Set session expiry based on remember me
                         if not remember:
@@ -376,35 +381,23 @@ def admin_login_view(request):
                                 "Your admin account is not active. "
                                 "Please contact the system administrator for assistance.")
                 else:
-                    # Invalid password - increment failed attempts
-                    admin_profile.failed_login_attempts += 1
-                    
-                    # Lock account after 5 failed attempts for 30 minutes
-                    if admin_profile.failed_login_attempts >= 5:
-                        admin_profile.account_locked_until = timezone.now() + timedelta(minutes=30)
-                        messages.error(request, "Too many failed attempts. Account locked for 30 minutes.")
-                    else:
-                        remaining = 5 - admin_profile.failed_login_attempts
-                        messages.error(request, f"Invalid credentials. {remaining} attempts remaining.")
-                    
-                    admin_profile.save()
+                    messages.error(request, login_failure_message(request))
                     
             except User.DoesNotExist:
+                # Still counts towards the lockout, like a wrong password
+                authenticate(request, username=email, password=password)
                 messages.error(request, "Invalid admin credentials.")
                 
     else:
         form = AdminLoginForm()
     
-    print(f"[DEBUG] Rendering custom_admin_login.html template")
-    print(f"[DEBUG] Template dirs: {settings.TEMPLATES[0]['DIRS']}")
-    
     # Try to render with explicit template path to avoid conflicts
     from django.template.loader import get_template
     try:
         template = get_template('admin/custom_admin_login.html')
-        print(f"[DEBUG] Found template: {template.origin.name}")
+        logger.debug("Admin login template resolved", extra={'template': template.origin.name})
     except Exception as e:
-        print(f"[DEBUG] Template error: {e}")
+        logger.exception("Admin login template could not be loaded")
     
     return render(request, 'admin/custom_admin_login.html', {'form': form})
 
@@ -460,22 +453,22 @@ def admin_verify_otp(request):
     return render(request, "admin/adminverify_otp.html", {"form": form, "email": user.email})
 
 
-def admin_resend_otp(request):
-    """Resend OTP for admin verification"""
-    user_id = request.session.get('pending_admin_id')
+async def admin_resend_otp(request):
+    """Resend OTP for admin verification (async, like client_resend_otp)"""
+    user_id = await request.session.aget('pending_admin_id')
     if not user_id:
         return redirect("accounts:admin_register")
     
     try:
-        user = User.objects.get(id=user_id, is_staff=True)
+        user = await User.objects.aget(id=user_id, is_staff=True)
     except User.DoesNotExist:
         return redirect("accounts:admin_register")
     
     code = OneTimePassword.generate_code()
-    OneTimePassword.objects.update_or_create(user=user, defaults={"code": code})
+    await OneTimePassword.objects.aupdate_or_create(user=user, defaults={"code": code})
     
     try:
-        send_mail(
+        await asend_otp_email(
             "Resend Admin OTP - Triple G BuildHub",
             f"Your new admin verification code is {code}. It will expire in 10 minutes.",
             settings.DEFAULT_FROM_EMAIL,
@@ -501,74 +494,75 @@ def admin_logout_view(request):
 @never_cache
 def sitemanager_login_view(request):
     """Site Manager login view with authentication logic"""
-    print(f"[DEBUG] sitemanager_login_view called - Method: {request.method}")
+    logger.debug("Site manager login view", extra={'method': request.method})
     
     if request.method == 'POST':
         email = request.POST.get('email')
         password = request.POST.get('password')
         
-        print(f"[DEBUG] Login attempt - Email: {email}, Password length: {len(password) if password else 0}")
-        
         if not email or not password:
-            print("[DEBUG] Missing email or password")
+            logger.debug("Site manager login rejected: missing credentials")
             messages.error(request, 'Please enter both email and password.')
             return render(request, 'sitemanager/login.html')
         
         try:
             # Find user by email
             user = User.objects.get(email=email)
-            print(f"[DEBUG] Found user: {user.username}, Active: {user.is_active}")
             
             # Authenticate user
             auth_user = authenticate(request, username=user.username, password=password)
-            print(f"[DEBUG] Authentication result: {auth_user}")
             
             if auth_user is not None:
-                print(f"[DEBUG] Authentication successful for: {auth_user.username}")
+                logger.debug("Site manager authenticated", extra={'user_id': auth_user.id})
                 
                 # Check if user has site manager profile
                 if hasattr(auth_user, 'sitemanagerprofile'):
                     sitemanager_profile = auth_user.sitemanagerprofile
-                    print(f"[DEBUG] Site manager profile found - Status: {sitemanager_profile.approval_status}")
+                    logger.debug(
+                        "Site manager profile status",
+                        extra={'user_id': user.id, 'approval_status': sitemanager_profile.approval_status},
+                    )
                     
                     # Check if site manager is approved
                     if sitemanager_profile.approval_status == 'approved':
                         # Login successful
                         login(request, auth_user)
                         messages.success(request, f'Welcome back, {auth_user.get_full_name()}!')
-                        print(f"[DEBUG] Login successful, redirecting to dashboard")
                         
                         # Redirect to site manager dashboard
                         from .utils import get_user_role
                         user_role = get_user_role(auth_user)
-                        print(f"[DEBUG] User role detected: {user_role}")
                         dashboard_url = get_user_dashboard_url(auth_user)
-                        print(f"[DEBUG] Dashboard URL: {dashboard_url}")
                         next_url = request.GET.get('next', dashboard_url)
-                        print(f"[DEBUG] Final redirect URL: {next_url}")
+                        logger.info(
+                            "Site manager logged in",
+                            extra={'user_id': user.id, 'role': user_role, 'redirect': next_url},
+                        )
                         return redirect(next_url)
                     elif sitemanager_profile.approval_status == 'pending':
-                        print(f"[DEBUG] Account pending approval")
+                        logger.info("Site manager login blocked: pending approval", extra={'user_id': user.id})
                         messages.warning(request, 'Your account is still pending approval. Please wait for admin approval.')
                         return redirect('accounts:sitemanager_pending_approval')
                     elif sitemanager_profile.approval_status == 'denied':
-                        print(f"[DEBUG] Account denied")
+                        logger.info("Site manager login blocked: denied", extra={'user_id': user.id})
                         messages.error(request, 'Your account has been denied access.')
                     else:
-                        print(f"[DEBUG] Account suspended")
+                        logger.info("Site manager login blocked: suspended", extra={'user_id': user.id})
                         messages.error(request, 'Your account is suspended.')
                 else:
-                    print(f"[DEBUG] No site manager profile found")
+                    logger.info("Site manager login blocked: no profile", extra={'user_id': user.id})
                     messages.error(request, 'Invalid credentials for site manager access.')
             else:
-                print(f"[DEBUG] Authentication failed for user: {user.username}")
-                messages.error(request, 'The email or password you entered is incorrect.')
+                logger.info("Site manager authentication failed", extra={'user_id': user.id})
+                messages.error(request, login_failure_message(request, 'The email or password you entered is incorrect.'))
                 
         except User.DoesNotExist:
-            print(f"[DEBUG] User not found with email: {email}")
+            logger.info("Site manager login for unknown email")
+            # Still counts towards the lockout, like a wrong password
+            authenticate(request, username=email, password=password)
             messages.error(request, 'The email or password you entered is incorrect.')
         except Exception as e:
-            print(f"[ERROR] Site manager login error: {e}")
+            logger.exception("Site manager login error")
             messages.error(request, 'An error occurred during login. Please try again.')
     
     return render(request, 'sitemanager/login.html')
@@ -642,7 +636,7 @@ def sitemanager_register_view(request):
             Triple G BuildHub Team
             '''
             
-            send_mail(
+            send_otp_email(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
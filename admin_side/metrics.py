@@ -0,0 +1,55 @@
+"""
+Admin dashboard counters.
+
+Every counter comes from one conditional-aggregation query over User joined
+to its AdminProfile and SiteManagerProfile. Both are one-to-one, so the
+joins never multiply rows. The result is cached for
+ADMIN_METRICS_CACHE_SECONDS and dropped when a profile's approval status
+changes or a user is added or removed (see signals.py). Polling widgets
+therefore mostly read the cache. The delete only reaches every worker
+through a shared cache; with the local one, the counters are kept for at
+most LOCAL_CACHE_MAX_SECONDS instead (core.cache.cache_timeout).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.cache import cache_timeout
+
+METRICS_CACHE_KEY = 'admin_side:metrics'
+NEW_USER_DAYS = 7
+
+
+def _count_status(relation, status):
+    return Count(relation, filter=Q(**{f'{relation}__approval_status': status}))
+
+
+def compute_metrics():
+    """All dashboard counters, in a single query"""
+    since = timezone.now() - timedelta(days=NEW_USER_DAYS)
+    return User.objects.aggregate(
+        total_users=Count('pk'),
+        new_users=Count('pk', filter=Q(date_joined__gte=since)),
+        total_admins=_count_status('adminprofile', 'approved'),
+        pending_approvals=_count_status('adminprofile', 'pending'),
+        suspended_admins=_count_status('adminprofile', 'suspended'),
+        total_site_managers=_count_status('sitemanagerprofile', 'approved'),
+        pending_site_managers=_count_status('sitemanagerprofile', 'pending'),
+    )
+
+
+def get_metrics():
+    """The dashboard counters, from the cache when fresh"""
+    metrics = cache.get(METRICS_CACHE_KEY)
+    if metrics is None:
+        metrics = {**compute_metrics(), 'generated_at': timezone.now().isoformat()}
+        cache.set(METRICS_CACHE_KEY, metrics, cache_timeout(settings.ADMIN_METRICS_CACHE_SECONDS))
+    return metrics
+
+
+def invalidate_metrics():
+    cache.delete(METRICS_CACHE_KEY)
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from accounts.models import AdminProfile, SiteManagerProfile
+
+from .metrics import invalidate_metrics
+
+
+def profile_saved(sender, instance, created, **kwargs):
+    """Drop the dashboard counters when a profile is added or its approval status changes"""
+    # _old_approval_status is recorded by the pre_save handlers in accounts.models
+    if created or getattr(instance, '_old_approval_status', None) != instance.approval_status:
+        transaction.on_commit(invalidate_metrics)
+
+
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(invalidate_metrics)
+
+
+def row_deleted(sender, **kwargs):
+    transaction.on_commit(invalidate_metrics)
+
+
+for model in (AdminProfile, SiteManagerProfile):
+    post_save.connect(profile_saved, sender=model, dispatch_uid=f'admin_metrics_save_{model.__name__}')
+    post_delete.connect(row_deleted, sender=model, dispatch_uid=f'admin_metrics_delete_{model.__name__}')
+post_save.connect(user_saved, sender=User, dispatch_uid='admin_metrics_save_User')
+post_delete.connect(row_deleted, sender=User, dispatch_uid='admin_metrics_delete_User')
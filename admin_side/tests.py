@@ -1,3 +1,89 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import AdminProfile, SiteManagerProfile
+from core.cache import InstrumentedLocMemCache
+
+from .metrics import compute_metrics, get_metrics
+
+
+class AdminMetricsTest(TestCase):
+    """Test the batched, cached dashboard counters"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('boss', 'boss@test.com', 'testpass123')
+        AdminProfile.objects.create(user=self.admin, approval_status='approved', admin_role='admin')
+        pending = User.objects.create_user('hopeful', 'hopeful@test.com', 'testpass123')
+        self.pending_profile = AdminProfile.objects.create(user=pending, approval_status='pending')
+        manager = User.objects.create_user('site_mgr', 'site@test.com', 'testpass123')
+        SiteManagerProfile.objects.create(user=manager, approval_status='pending')
+        User.objects.create_user('client', 'client@test.com', 'testpass123')
+
+    def test_counters_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            metrics = compute_metrics()
+        self.assertEqual(metrics, {
+            'total_users': 4,
+            'new_users': 4,
+            'total_admins': 1,
+            'pending_approvals': 1,
+            'suspended_admins': 0,
+            'total_site_managers': 0,
+            'pending_site_managers': 1,
+        })
+
+    def test_cached_until_approval_changes(self):
+        get_metrics()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_metrics()['total_admins'], 1)
+
+        # Saves that leave the approval status alone keep the cache
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pending_profile.department = 'Estimating'
+            self.pending_profile.save()
+        with self.assertNumQueries(0):
+            get_metrics()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pending_profile.approval_status = 'approved'
+            self.pending_profile.save()
+        metrics = get_metrics()
+        self.assertEqual((metrics['total_admins'], metrics['pending_approvals']), (2, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('another', 'another@test.com', 'testpass123')
+        self.assertEqual(get_metrics()['total_users'], 5)
+
+    def test_local_cache_bounds_how_long_another_worker_is_stale(self):
+        get_metrics()
+        other_worker = InstrumentedLocMemCache('metrics-other-worker', {})
+        # The approval lands on another worker, which drops only its own copy
+        with mock.patch('admin_side.metrics.cache', other_worker), self.captureOnCommitCallbacks(execute=True):
+            self.pending_profile.approval_status = 'approved'
+            self.pending_profile.save()
+        self.assertEqual(get_metrics()['pending_approvals'], 1)
+        later = time.time() + settings.LOCAL_CACHE_MAX_SECONDS + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(get_metrics()['pending_approvals'], 0)
+
+    def test_dashboard_and_json_endpoint(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_side:admin_home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pending_approvals'], 1)
+
+        response = self.client.get(reverse('admin_side:admin_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['metrics']['total_users'], 4)
 
-# Create your tests here.
+    def test_json_endpoint_requires_an_approved_admin(self):
+        self.client.force_login(User.objects.get(username='client'))
+        response = self.client.get(reverse('admin_side:admin_metrics'))
+        self.assertEqual(response.status_code, 403)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
@@ -10,6 +11,8 @@ from django.contrib.auth.models import User
 from django.db.models import Count
 import json
 
+from .metrics import get_metrics
+
 @login_required
 def admin_home(request):
     """Admin dashboard home page"""
@@ -23,17 +26,29 @@ def admin_home(request):
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('accounts:client_login')
     
-    # Get dashboard statistics
+    # Get dashboard statistics (one cached query, see metrics.py)
     context = {
-        'total_users': User.objects.count(),
-        'total_admins': AdminProfile.objects.filter(approval_status='approved').count(),
-        'pending_approvals': AdminProfile.objects.filter(approval_status='pending').count(),
+        **get_metrics(),
+        'metrics_refresh_seconds': settings.ADMIN_METRICS_CACHE_SECONDS,
         'admin_profile': admin_profile,
         'user': request.user,
     }
     
     return render(request, 'adminhome.html', context)
 
+@login_required
+@require_http_methods(["GET"])
+def admin_metrics(request):
+    """Dashboard counters as JSON, for live-refreshing widgets"""
+    try:
+        admin_profile = AdminProfile.objects.get(user=request.user)
+        if admin_profile.approval_status != 'approved':
+            return JsonResponse({'success': False, 'message': 'Access denied.'}, status=403)
+    except AdminProfile.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Access denied.'}, status=403)
+    
+    return JsonResponse({'success': True, 'metrics': get_metrics()})
+
 @login_required
 def admin_settings(request):
     """Admin settings page"""
@@ -1,3 +1,25 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Post, PostDraft, Tag
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug']
+    search_fields = ['name']
+
+
+@admin.register(Post)
+class PostAdmin(admin.ModelAdmin):
+    list_display = ['title', 'category', 'author', 'status', 'featured', 'reading_time', 'published_at']
+    list_filter = ['status', 'category', 'featured']
+    search_fields = ['title']
+    list_select_related = ['author']
+    filter_horizontal = ['tags']
+    readonly_fields = ['slug', 'excerpt', 'word_count', 'reading_time', 'published_at', 'created_at', 'updated_at']
+
+
+@admin.register(PostDraft)
+class PostDraftAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'author', 'post', 'updated_at']
+    list_select_related = ['author', 'post']
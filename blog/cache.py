@@ -0,0 +1,96 @@
+"""
+Caching for the public blog.
+
+Everything cached is keyed under a content version. Any change to a post or
+tag bumps the version (see signals.py), which orphans every listing, page
+and feed at once instead of tracking which keys a change affects. Orphaned
+entries age out after BLOG_CACHE_SECONDS.
+
+The version only reaches every worker through a shared cache. With the
+local one, each worker bumps its own, so entries are kept for at most
+LOCAL_CACHE_MAX_SECONDS and other workers catch up within that.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core.cache import cache_timeout
+
+VERSION_KEY = 'blog:version'
+
+
+def content_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version key can't revive old entries
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        content_version()
+
+
+def versioned_key(*parts):
+    return ':'.join(['blog', str(content_version())] + [str(part) for part in parts])
+
+
+def cached(key_parts, build):
+    """`build()`'s result, cached under the current content version"""
+    key = versioned_key(*key_parts)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, cache_timeout(settings.BLOG_CACHE_SECONDS))
+    return value
+
+
+def is_cacheable_request(request):
+    """
+    Anonymous GETs with no session or messages cookie: their pages can't
+    depend on who is asking, so one cached copy serves everyone.
+    """
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+
+def cache_public_page(view_func):
+    """
+    Serve anonymous hits of a view from the cache. Responses that set
+    cookies or embed a new CSRF token are never stored.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = versioned_key('page', hashlib.md5(request.get_full_path().encode()).hexdigest())
+        hit = cache.get(key)
+        if hit is not None:
+            content, content_type = hit
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        if (
+            response.status_code == 200 and not response.streaming and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        ):
+            cache.set(key, (response.content, response['Content-Type']), cache_timeout(settings.BLOG_CACHE_SECONDS))
+            response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
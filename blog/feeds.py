@@ -0,0 +1,48 @@
+"""RSS and Atom feeds of approved posts, served from the blog cache"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .models import Post
+
+
+class LatestPostsFeed(Feed):
+    title = 'Triple G BuildHub - Industry Insights'
+    description = 'Latest articles on construction, design and sustainability.'
+
+    def link(self):
+        return reverse('blog:bloglist')
+
+    def items(self):
+        return (
+            Post.objects.filter(status='approved')
+            .select_related('author')
+            .only('id', 'title', 'body_html', 'published_at', 'updated_at', 'category', 'author__first_name',
+                  'author__last_name', 'author__username')
+            .order_by('-published_at')[:settings.BLOG_FEED_ITEMS]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        # Stored at save time; nothing is rendered per request
+        return item.body_html
+
+    def item_pubdate(self, item):
+        return item.published_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return (item.author.get_full_name() or item.author.username) if item.author else None
+
+    def item_categories(self, item):
+        return [item.get_category_display()]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
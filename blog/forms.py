@@ -0,0 +1,53 @@
+from django import forms
+
+from .models import CATEGORY_CHOICES, Post, PostDraft, Tag
+
+MAX_HERO_IMAGE_BYTES = 2 * 1024 * 1024
+
+
+def parse_tags(value):
+    """Comma-separated tag names, de-duplicated case-insensitively"""
+    names = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())[:50]
+        if name:
+            names.setdefault(name.lower(), name)
+    return list(names.values())
+
+
+class BlogSubmissionForm(forms.Form):
+    """The create-blog page's form; field names match its markup"""
+    blogTitle = forms.CharField(max_length=200)
+    blogCategory = forms.ChoiceField(choices=CATEGORY_CHOICES)
+    blogTags = forms.CharField(max_length=255, required=False)
+    blogContent = forms.CharField()
+    featuredImage = forms.ImageField(required=False)
+
+    def clean_featuredImage(self):
+        image = self.cleaned_data.get('featuredImage')
+        if image and image.size > MAX_HERO_IMAGE_BYTES:
+            raise forms.ValidationError('Images are limited to 2MB.')
+        return image
+
+    def save_post(self, author):
+        """Create the post, pending admin approval"""
+        data = self.cleaned_data
+        post = Post(
+            title=data['blogTitle'], category=data['blogCategory'], body=data['blogContent'],
+            author=author, status='pending', hero_image=data.get('featuredImage') or None,
+        )
+        post.save()
+        tags = [Tag.objects.get_or_create(name=name)[0] for name in parse_tags(data['blogTags'])]
+        post.tags.set(tags)
+        return post
+
+    def save_draft(self, author, draft=None):
+        """Store whatever was entered, valid or not"""
+        draft = draft or PostDraft(author=author)
+        draft.title = self.data.get('blogTitle', '')[:200]
+        category = self.data.get('blogCategory', '')
+        draft.category = category if category in dict(CATEGORY_CHOICES) else ''
+        draft.tags = ', '.join(parse_tags(self.data.get('blogTags', '')))[:255]
+        draft.body = self.data.get('blogContent', '')
+        draft.save()
+        return draft
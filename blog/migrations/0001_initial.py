@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField(blank=True, max_length=60, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Post',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('slug', models.SlugField(blank=True, max_length=220, unique=True)),
+                ('category', models.CharField(choices=[('industry-insights', 'Industry Insights'), ('expert-advice', 'Expert Advice'), ('case-study', 'Case Study'), ('design-trends', 'Design Trends'), ('sustainable-building', 'Sustainable Building'), ('technology', 'Construction Technology'), ('regulations', 'Regulations & Standards')], max_length=30)),
+                ('hero_image', models.ImageField(blank=True, null=True, upload_to='blog/hero/')),
+                ('body', models.TextField(help_text='Markdown; inline HTML is sanitized')),
+                ('body_html', models.TextField(blank=True, editable=False)),
+                ('toc_html', models.TextField(blank=True, editable=False)),
+                ('excerpt', models.TextField(blank=True, editable=False)),
+                ('word_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('reading_time', models.PositiveSmallIntegerField(default=1, editable=False, help_text='Minutes')),
+                ('status', models.CharField(choices=[('pending', 'Pending approval'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=10)),
+                ('featured', models.BooleanField(default=False)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='blog_posts', to=settings.AUTH_USER_MODEL)),
+                ('tags', models.ManyToManyField(blank=True, related_name='posts', to='blog.tag')),
+            ],
+            options={
+                'ordering': ['-published_at', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('category', models.CharField(blank=True, choices=[('industry-insights', 'Industry Insights'), ('expert-advice', 'Expert Advice'), ('case-study', 'Case Study'), ('design-trends', 'Design Trends'), ('sustainable-building', 'Sustainable Building'), ('technology', 'Construction Technology'), ('regulations', 'Regulations & Standards')], max_length=30)),
+                ('tags', models.CharField(blank=True, help_text='Comma-separated', max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blog_drafts', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='drafts', to='blog.post')),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['author', '-updated_at'], name='blog_postdr_author__fef0fb_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-published_at'], name='blog_post_status_615533_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', 'status', '-published_at'], name='blog_post_categor_f3f79b_idx'),
+        ),
+    ]
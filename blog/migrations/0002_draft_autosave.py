@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postdraft',
+            name='checkpoint_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,3 +1,140 @@
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
 
-# Create your models here.
+from .rendering import make_excerpt, reading_stats, render_markdown
+
+
+CATEGORY_CHOICES = [
+    ('industry-insights', 'Industry Insights'),
+    ('expert-advice', 'Expert Advice'),
+    ('case-study', 'Case Study'),
+    ('design-trends', 'Design Trends'),
+    ('sustainable-building', 'Sustainable Building'),
+    ('technology', 'Construction Technology'),
+    ('regulations', 'Regulations & Standards'),
+]
+
+
+def unique_slug(model, value, instance_pk=None, max_length=220):
+    base = slugify(value)[:max_length - 10] or 'post'
+    slug = base
+    number = 2
+    while model.objects.filter(slug=slug).exclude(pk=instance_pk).exists():
+        slug = f"{base}-{number}"
+        number += 1
+    return slug
+
+
+class Tag(models.Model):
+    """Free-form topic label for blog posts"""
+    name = models.CharField(max_length=50, unique=True)
+    slug = models.SlugField(max_length=60, unique=True, blank=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(Tag, self.name, self.pk, max_length=60)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class Post(models.Model):
+    """
+    A blog article. The Markdown body is rendered to sanitized HTML, a table
+    of contents, an excerpt and reading statistics on save; pages only read
+    the stored results.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending approval'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    ]
+    # Fields recomputed from `body` on save
+    RENDERED_FIELDS = ['body_html', 'toc_html', 'excerpt', 'word_count', 'reading_time']
+
+    title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=220, unique=True, blank=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='blog_posts'
+    )
+    category = models.CharField(max_length=30, choices=CATEGORY_CHOICES)
+    tags = models.ManyToManyField(Tag, blank=True, related_name='posts')
+    hero_image = models.ImageField(upload_to='blog/hero/', blank=True, null=True)
+    body = models.TextField(help_text="Markdown; inline HTML is sanitized")
+
+    body_html = models.TextField(blank=True, editable=False)
+    toc_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Minutes")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    featured = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-published_at', '-created_at']
+        indexes = [
+            models.Index(fields=['status', '-published_at']),
+            models.Index(fields=['category', 'status', '-published_at']),
+        ]
+
+    def render(self):
+        self.body_html, self.toc_html = render_markdown(self.body)
+        self.excerpt = make_excerpt(self.body_html)
+        self.word_count, self.reading_time = reading_stats(self.body_html)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'body' in update_fields:
+            self.render()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.RENDERED_FIELDS)
+        if not self.slug:
+            self.slug = unique_slug(Post, self.title, self.pk)
+        if self.status == 'approved' and not self.published_at:
+            self.published_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'published_at'}
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse('blog:blog_individual', kwargs={'blog_id': self.id})
+
+    def __str__(self):
+        return self.title
+
+
+class PostDraft(models.Model):
+    """
+    Work in progress by a site manager: a new post, or changes to `post`.
+    Submitting it creates or updates the Post for admin approval.
+    """
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='blog_drafts')
+    post = models.ForeignKey(Post, on_delete=models.SET_NULL, null=True, blank=True, related_name='drafts')
+    title = models.CharField(max_length=200, blank=True)
+    category = models.CharField(max_length=30, choices=CATEGORY_CHOICES, blank=True)
+    tags = models.CharField(max_length=255, blank=True, help_text="Comma-separated")
+    body = models.TextField(blank=True)
+    # Autosaves after this one are still DraftPatch rows (site_diary.autosave)
+    checkpoint_seq = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['author', '-updated_at']),
+        ]
+
+    def __str__(self):
+        return self.title or f"Untitled draft {self.pk}"
@@ -0,0 +1,62 @@
+"""
+Derived fields of a blog post, computed once when it is saved (see
+Post.save) so that views only ever read stored HTML.
+
+Bodies are Markdown; inline HTML is allowed (the editor produces some) and
+everything is sanitized with nh3 after rendering.
+"""
+import html
+import math
+
+import markdown
+import nh3
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+WORDS_PER_MINUTE = 200
+EXCERPT_WORDS = 40
+
+ALLOWED_TAGS = nh3.ALLOWED_TAGS | {'figure', 'figcaption'}
+ALLOWED_ATTRIBUTES = {
+    **nh3.ALLOWED_ATTRIBUTES,
+    # Anchors for the table of contents
+    'h2': {'id'},
+    'h3': {'id'},
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+}
+
+
+def sanitize(value):
+    return nh3.clean(value, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, link_rel='noopener noreferrer nofollow')
+
+
+def render_markdown(text):
+    """
+    Returns:
+        tuple: (body HTML, table of contents HTML or '' without headings)
+    """
+    md = markdown.Markdown(
+        extensions=['extra', 'sane_lists', 'toc'],
+        extension_configs={'toc': {'toc_depth': '2-3'}},
+    )
+    body = sanitize(md.convert(text or ''))
+    toc = sanitize(md.toc) if md.toc_tokens else ''
+    return body, toc
+
+
+def plain_text(body_html):
+    return html.unescape(strip_tags(body_html))
+
+
+def reading_stats(body_html):
+    """
+    Returns:
+        tuple: (word count, reading time in whole minutes, at least 1)
+    """
+    words = len(plain_text(body_html).split())
+    return words, max(1, math.ceil(words / WORDS_PER_MINUTE))
+
+
+def make_excerpt(body_html, words=EXCERPT_WORDS):
+    return Truncator(' '.join(plain_text(body_html).split())).words(words)
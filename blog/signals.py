@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .cache import bump_version
+from .models import Post, Tag
+
+
+def invalidate_blog_cache(sender, **kwargs):
+    """Retire every cached blog listing, page and feed once the change commits"""
+    transaction.on_commit(bump_version)
+
+
+for model in (Post, Tag):
+    post_save.connect(invalidate_blog_cache, sender=model, dispatch_uid=f'blog_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_blog_cache, sender=model, dispatch_uid=f'blog_cache_delete_{model.__name__}')
+m2m_changed.connect(invalidate_blog_cache, sender=Post.tags.through, dispatch_uid='blog_cache_post_tags')
@@ -1,3 +1,155 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from accounts.models import SiteManagerProfile
+from core.cache import InstrumentedLocMemCache
+
+from .models import Post, PostDraft, Tag
+from .rendering import render_markdown
+
+
+class RenderingTest(TestCase):
+    """Test save-time rendering of post bodies"""
+
+    def test_markdown_is_rendered_and_sanitized(self):
+        body, toc = render_markdown(
+            '## Site safety\n\nWear **hard hats**.<script>alert(1)</script>\n\n'
+            '<a href="javascript:alert(1)" onclick="x()">link</a>'
+        )
+        self.assertIn('<h2 id="site-safety">Site safety</h2>', body)
+        self.assertIn('<strong>hard hats</strong>', body)
+        self.assertNotIn('<script', body)
+        self.assertNotIn('javascript:', body)
+        self.assertNotIn('onclick', body)
+        self.assertIn('href="#site-safety"', toc)
+        self.assertEqual(render_markdown('No headings here.')[1], '')
+
+    def test_derived_fields_are_stored_on_save(self):
+        post = Post.objects.create(title='Formwork 101', category='expert-advice', body='word ' * 450)
+        self.assertEqual(post.word_count, 450)
+        self.assertEqual(post.reading_time, 3)
+        self.assertEqual(post.excerpt, ('word ' * 40).strip() + '…')
+        self.assertEqual(post.slug, 'formwork-101')
+        self.assertIsNone(post.published_at)
+
+        post.status = 'approved'
+        post.save(update_fields=['status'])
+        post.refresh_from_db()
+        self.assertIsNotNone(post.published_at)
+        self.assertEqual(Post.objects.create(title='Formwork 101', category='expert-advice', body='x').slug,
+                         'formwork-101-2')
+
+
+class BlogPagesTest(TestCase):
+    """Test public pages, their caching and the submission workflow"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='writer', password='testpass123', first_name='Ana',
+                                               last_name='Reyes')
+        self.tag = Tag.objects.create(name='Concrete')
+        self.post = Post.objects.create(
+            title='Curing concrete in hot weather', category='expert-advice', author=self.author,
+            body='## Why it matters\n\nKeep slabs **wet** for seven days.', status='approved', featured=True,
+        )
+        self.post.tags.add(self.tag)
+
+    def test_anonymous_hits_are_served_from_cache(self):
+        response = self.client.get('/blog/')
+        self.assertContains(response, 'Curing concrete in hot weather')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/blog/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        response = self.client.get(f'/blog/{self.post.id}/')
+        self.assertContains(response, '<strong>wet</strong>')
+        with self.assertNumQueries(0):
+            self.client.get(f'/blog/{self.post.id}/')
+        self.assertEqual(self.client.get('/blog/999999/').status_code, 404)
+
+    def test_changes_invalidate_cached_pages(self):
+        self.client.get('/blog/')
+        self.client.get('/blog/feed/rss/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Rebar spacing basics', category='expert-advice', author=self.author, body='Spacing.',
+                status='approved',
+            )
+        self.assertContains(self.client.get('/blog/'), 'Rebar spacing basics')
+        self.assertContains(self.client.get('/blog/feed/rss/'), 'Rebar spacing basics')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.remove(self.tag)
+        self.assertContains(self.client.get(f'/blog/?tag={self.tag.slug}'), 'No articles yet')
+
+    def _post_from_another_worker(self, other_cache, title):
+        # The signals bump the version in whatever cache that worker has
+        with mock.patch('blog.cache.cache', other_cache), self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title=title, category='expert-advice', author=self.author, body='.', status='approved')
+
+    def test_shared_cache_takes_the_version_from_another_worker(self):
+        shared = {'BACKEND': 'core.cache.InstrumentedDatabaseCache', 'LOCATION': 'blog_test_cache'}
+        with override_settings(CACHES={'default': shared, 'other': shared}):
+            call_command('createcachetable', verbosity=0)
+            self.client.get('/blog/')
+            self.assertEqual(self.client.get('/blog/')['X-Cache'], 'HIT')
+            self._post_from_another_worker(caches['other'], 'Rebar spacing basics')
+            response = self.client.get('/blog/')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertContains(response, 'Rebar spacing basics')
+
+    def test_local_cache_bounds_how_long_another_worker_is_stale(self):
+        other_worker = InstrumentedLocMemCache('blog-other-worker', {})
+        other_worker.clear()
+        self.client.get('/blog/')
+        self._post_from_another_worker(other_worker, 'Rebar spacing basics')
+        # This worker never saw the bump, but its copy expires soon
+        self.assertNotContains(self.client.get('/blog/'), 'Rebar spacing basics')
+        later = time.time() + settings.LOCAL_CACHE_MAX_SECONDS + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertContains(self.client.get('/blog/'), 'Rebar spacing basics')
+
+    def test_feeds(self):
+        response = self.client.get('/blog/feed/rss/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('application/rss+xml', response['Content-Type'])
+        self.assertContains(response, 'Curing concrete in hot weather')
+        response = self.client.get('/blog/feed/atom/')
+        self.assertIn('application/atom+xml', response['Content-Type'])
+        self.assertContains(response, 'Ana Reyes')
+
+    def test_submission_and_approval_workflow(self):
+        manager = User.objects.create_user(username='site_writer', password='testpass123')
+        SiteManagerProfile.objects.create(user=manager, approval_status='approved')
+        self.client.force_login(manager)
+
+        response = self.client.post('/diary/createblog/', {'action': 'draft', 'blogTitle': 'Half done'})
+        draft = PostDraft.objects.get(author=manager)
+        self.assertRedirects(response, f'/diary/createblog/?draft={draft.id}', fetch_redirect_response=False)
+        self.assertContains(self.client.get('/diary/drafts/'), 'Half done')
+
+        response = self.client.post('/diary/createblog/', {
+            'draft_id': draft.id, 'blogTitle': 'Scaffold checks', 'blogCategory': 'expert-advice',
+            'blogTags': 'Safety, safety, Scaffolding', 'blogContent': 'Inspect **daily**.',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(PostDraft.objects.filter(pk=draft.id).exists())
+        post = Post.objects.get(title='Scaffold checks')
+        self.assertEqual(post.status, 'pending')
+        self.assertEqual(sorted(post.tags.values_list('name', flat=True)), ['Safety', 'Scaffolding'])
+        self.assertEqual(self.client.get(f'/blog/{post.id}/').status_code, 404)
+
+        admin = User.objects.create_superuser(username='blog_admin', password='testpass123')
+        self.client.force_login(admin)
+        self.assertContains(self.client.get('/blog/blogmanagement/'), 'Scaffold checks')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/blog/blogmanagement/{post.id}/moderate/', {'action': 'approve'})
+        self.client.logout()
+        self.assertContains(self.client.get(f'/blog/{post.id}/'), '<strong>daily</strong>')
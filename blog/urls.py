@@ -1,8 +1,13 @@
 from django.urls import path
 from . import views
+from .cache import cache_public_page
+from .feeds import LatestPostsAtomFeed, LatestPostsFeed
 
 urlpatterns = [
-    path('blogmanagement/', views.blog_list, name='blogmanagement'),  # points to blog_list for now
+    path('blogmanagement/', views.blog_management, name='blogmanagement'),
+    path('blogmanagement/<int:blog_id>/moderate/', views.blog_moderate, name='blog_moderate'),
+    path('feed/rss/', cache_public_page(LatestPostsFeed()), name='rss_feed'),
+    path('feed/atom/', cache_public_page(LatestPostsAtomFeed()), name='atom_feed'),
     path('', views.blog_list, name='bloglist'),
     path('<int:blog_id>/', views.blog_individual, name='blog_individual'),
-]
\ No newline at end of file
+]
@@ -1,17 +1,193 @@
-from django.shortcuts import render
+"""
+Public blog pages and the admin blog management page.
+
+Post bodies are rendered when saved (see models.Post), listings and pages
+are assembled from cached data keyed under the blog content version, and
+anonymous hits are served whole from the page cache (see cache.py).
+"""
+from django.conf import settings
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
 from accounts.decorators import require_admin_role, allow_public_access
 
-# Create your views here.
+from .cache import cache_public_page, cached
+from .models import CATEGORY_CHOICES, Post, Tag
+
+CATEGORY_NAMES = dict(CATEGORY_CHOICES)
+CARD_FIELDS = [
+    'id', 'title', 'slug', 'category', 'excerpt', 'reading_time', 'hero_image', 'featured', 'published_at',
+    'author__first_name', 'author__last_name', 'author__username',
+]
+
+
+def published_posts():
+    return Post.objects.filter(status='approved')
+
+
+def author_name(user):
+    if user is None:
+        return 'Triple G BuildHub'
+    return user.get_full_name() or user.username
+
+
+def post_card(post):
+    """What listings show of a post, as plain data for the cache"""
+    return {
+        'id': post.id,
+        'title': post.title,
+        'url': post.get_absolute_url(),
+        'category': post.category,
+        'category_name': CATEGORY_NAMES.get(post.category, post.category),
+        'excerpt': post.excerpt,
+        'reading_time': post.reading_time,
+        'image': post.hero_image.url if post.hero_image else None,
+        'author': author_name(post.author),
+        'published_at': post.published_at,
+        'tags': [{'name': tag.name, 'slug': tag.slug} for tag in post.tags.all()],
+    }
+
+
+def card_queryset():
+    return published_posts().select_related('author').prefetch_related('tags').only(*CARD_FIELDS)
+
+
+def listing(page_number, tag='', category=''):
+    def build():
+        posts = card_queryset().order_by('-published_at', '-id')
+        if tag:
+            posts = posts.filter(tags__slug=tag)
+        if category:
+            posts = posts.filter(category=category)
+        paginator = Paginator(posts, settings.BLOG_PAGE_SIZE)
+        page = paginator.get_page(page_number)
+        return {
+            'posts': [post_card(post) for post in page.object_list],
+            'number': page.number,
+            'num_pages': paginator.num_pages,
+            'page_range': [
+                number if isinstance(number, int) else str(number)
+                for number in paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+            ],
+            'has_previous': page.has_previous(),
+            'has_next': page.has_next(),
+            'count': paginator.count,
+        }
+    return cached(('list', page_number, tag, category), build)
+
+
+def sidebar():
+    """Featured post, recent posts, tag and category counts shared by every blog page"""
+    def build():
+        featured = card_queryset().filter(featured=True).order_by('-published_at').first()
+        recent = card_queryset().order_by('-published_at', '-id')[:3]
+        tags = (
+            Tag.objects.annotate(post_count=Count('posts', filter=Q(posts__status='approved')))
+            .filter(post_count__gt=0).order_by('-post_count', 'name')[:12]
+        )
+        categories = published_posts().values('category').annotate(post_count=Count('id')).order_by('category')
+        return {
+            'featured': post_card(featured) if featured else None,
+            'recent': [post_card(post) for post in recent],
+            'tags': [{'name': tag.name, 'slug': tag.slug, 'count': tag.post_count} for tag in tags],
+            'categories': [
+                {'slug': row['category'], 'name': CATEGORY_NAMES.get(row['category'], row['category']),
+                 'count': row['post_count']}
+                for row in categories
+            ],
+        }
+    return cached(('sidebar',), build)
+
+
+def post_page(post_id):
+    """A published post with its related posts, or None"""
+    def build():
+        post = card_queryset().only(*CARD_FIELDS, 'body_html', 'toc_html', 'word_count').filter(pk=post_id).first()
+        if post is None:
+            return False  # cached too: unknown ids don't reach the database again
+        related = card_queryset().filter(category=post.category).exclude(pk=post.pk).order_by('-published_at')[:3]
+        return dict(
+            post_card(post), body_html=post.body_html, toc_html=post.toc_html,
+            related=[post_card(other) for other in related],
+        )
+    return cached(('post', post_id), build) or None
+
+
+def page_param(request):
+    try:
+        return max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return 1
+
 
 @require_admin_role
 def blog_management(request):
-    return render(request, 'admin/blogmanagement.html')
+    status = request.GET.get('status', '')
+    posts = Post.objects.select_related('author').prefetch_related('tags').defer('body', 'body_html', 'toc_html')
+    if status in dict(Post.STATUS_CHOICES):
+        posts = posts.filter(status=status)
+    counts = Post.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+    )
+    paginator = Paginator(posts.order_by('-created_at'), 25)
+    return render(request, 'admin/blogmanagement.html', {
+        'page_obj': paginator.get_page(page_param(request)),
+        'counts': counts,
+        'status': status,
+    })
+
+
+@require_admin_role
+@require_POST
+def blog_moderate(request, blog_id):
+    """Approve, reject, feature or unfeature a post from blog management"""
+    post = get_object_or_404(Post, pk=blog_id)
+    action = request.POST.get('action')
+    if action == 'approve':
+        post.status = 'approved'
+    elif action == 'reject':
+        post.status = 'rejected'
+    elif action in ('feature', 'unfeature'):
+        post.featured = action == 'feature'
+    else:
+        messages.error(request, 'Unknown action.')
+        return redirect('blog:blogmanagement')
+    post.save(update_fields=['status', 'featured', 'updated_at'])
+    messages.success(request, f'"{post.title}" updated.')
+    return redirect('blog:blogmanagement')
+
 
 @allow_public_access
+@cache_public_page
 def blog_list(request):
-    return render(request, 'bloguser/bloglist.html')
+    tag = request.GET.get('tag', '')[:60]
+    category = request.GET.get('category', '')
+    if category not in CATEGORY_NAMES:
+        category = ''
+    return render(request, 'bloguser/bloglist.html', {
+        'listing': listing(page_param(request), tag, category),
+        'sidebar': sidebar(),
+        'categories': CATEGORY_CHOICES,
+        'tag': tag,
+        'category': category,
+    })
+
 
 @allow_public_access
+@cache_public_page
 def blog_individual(request, blog_id=None):
-    # blog_id is optional for now; you can make it required if you want
-    return render(request, 'bloguser/blogindividualpage.html', {'blog_id': blog_id})
+    post = post_page(blog_id) if blog_id else None
+    if post is None:
+        raise Http404('No such blog post')
+    return render(request, 'bloguser/blogindividualpage.html', {
+        'blog_id': blog_id,
+        'post': post,
+        'sidebar': sidebar(),
+    })
@@ -0,0 +1,189 @@
+"""
+Question answering for the site chatbot.
+
+answer_question() narrows the question to the projects and dates it
+mentions ("what delayed Riverside Tower last month?"), retrieves the top-k
+passages with chatbot.search and answers extractively, quoting the best
+sentence of each passage. Everything runs locally against the database.
+"""
+import calendar
+import logging
+import re
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .search import TOKEN_RE, best_snippet, search, tokenize
+
+logger = logging.getLogger(__name__)
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+RELATIVE_RE = re.compile(r'\b(?:last|past)\s+(\d+)\s+(day|week|month)s?\b')
+MONTH_RE = re.compile(r'\b(' + '|'.join(MONTHS) + r')(?:\s+(\d{4}))?\b')
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def parse_date_range(question, today=None):
+    """
+    Date range a question refers to, if any.
+
+    Understands today, yesterday, this/last week, this/last month, this/last
+    year, "last N days/weeks/months" and month names ("in March",
+    "March 2025"); a month without a year means the latest one not in the
+    future.
+
+    Returns:
+        tuple: (start, end) dates, or (None, None)
+    """
+    today = today or timezone.localdate()
+    text = question.lower()
+
+    match = RELATIVE_RE.search(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        days = {'day': 1, 'week': 7, 'month': 30}[unit] * count
+        return today - timedelta(days=days), today
+    if 'yesterday' in text:
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if 'today' in text:
+        return today, today
+    if 'last week' in text:
+        start = today - timedelta(days=today.weekday() + 7)
+        return start, start + timedelta(days=6)
+    if 'this week' in text:
+        return today - timedelta(days=today.weekday()), today
+    if 'last month' in text:
+        last_month = today.replace(day=1) - timedelta(days=1)
+        return month_bounds(last_month.year, last_month.month)
+    if 'this month' in text:
+        return today.replace(day=1), today
+    if 'last year' in text:
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    if 'this year' in text:
+        return date(today.year, 1, 1), today
+
+    match = MONTH_RE.search(text)
+    if match:
+        month = MONTHS[match.group(1)]
+        year = int(match.group(2)) if match.group(2) else (today.year if month <= today.month else today.year - 1)
+        return month_bounds(year, month)
+    return None, None
+
+
+def match_projects(user, question):
+    """
+    Accessible site diary projects named in the question, as (id, name)
+    pairs. Names must appear as whole words; names shorter than three
+    characters are ignored.
+    """
+    from site_diary.utils import get_user_projects
+
+    text = ' ' + ' '.join(TOKEN_RE.findall(question.lower())) + ' '
+    matches = []
+    for pk, name in get_user_projects(user).values_list('pk', 'name'):
+        words = ' '.join(TOKEN_RE.findall((name or '').lower()))
+        if len(words) >= 3 and f' {words} ' in text:
+            matches.append((pk, name))
+    return matches
+
+
+def describe_source(document):
+    source = {
+        'source': document.source,
+        'id': document.object_id,
+        'title': document.title,
+        'date': document.entry_date.isoformat() if document.entry_date else None,
+        'project_id': document.project_id,
+    }
+    if document.source == 'portfolio_project':
+        source['url'] = reverse('portfolio:project_detail', args=[document.object_id])
+    return source
+
+
+def prepare_answer(user, question, k=None, context=None):
+    """
+    Retrieve the passages answering `question` and compose the answer in
+    parts, so callers can send it whole (answer_question) or line by line
+    (the streaming chat endpoint).
+
+    `context` is the filters dict of the previous answer in a conversation:
+    a follow-up that names no project ("and last week?") keeps the projects
+    of the question before it.
+
+    Returns:
+        dict: intro, lines (one per source), empty (reply when nothing was
+        found), sources and filters
+    """
+    k = k or settings.CHATBOT_TOP_K
+
+    start, end = parse_date_range(question)
+    projects = match_projects(user, question)
+    project_terms = {term for _, name in projects for term in tokenize(name)}
+    terms = [term for term in tokenize(question) if term not in project_terms]
+    if not terms and projects:
+        # "Tell me about Riverside Tower": the project name is the whole query
+        terms = sorted(project_terms)
+    if not projects and context and context.get('projects'):
+        projects = [(project['id'], project['name']) for project in context['projects']]
+        if not terms:
+            terms = [term for _, name in projects for term in tokenize(name)]
+
+    # search() scopes to get_user_projects, so inherited ids can't widen access
+    results = search(user, terms, k=k, start=start, end=end, projects=[pk for pk, _ in projects])
+
+    scope = ''
+    if projects:
+        scope += ' for ' + ', '.join(name for _, name in projects)
+    if start:
+        scope += f' between {start:%d %b %Y} and {end:%d %b %Y}' if start != end else f' on {start:%d %b %Y}'
+
+    sources = []
+    lines = []
+    for document, score in results:
+        snippet = best_snippet(document.text, terms)
+        sources.append(dict(describe_source(document), score=round(score, 3), snippet=snippet))
+        lines.append(f'- {document.title}: {snippet}')
+
+    return {
+        'intro': f'Here is what I found{scope}:',
+        'lines': lines,
+        'empty': f"I couldn't find anything about that{scope} in the records you have access to.",
+        'sources': sources,
+        'filters': {
+            'projects': [{'id': pk, 'name': name} for pk, name in projects],
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+        },
+    }
+
+
+def answer_question(user, question, k=None, context=None):
+    """
+    Answer `question` from the passages `user` may see.
+
+    Returns:
+        dict: answer (text), sources (the passages quoted, best first),
+        filters (projects and dates understood from the question) and took_ms
+    """
+    started = time.perf_counter()
+    parts = prepare_answer(user, question, k=k, context=context)
+    if parts['lines']:
+        answer = '\n'.join([parts['intro']] + parts['lines'])
+    else:
+        answer = parts['empty']
+
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.debug('Chatbot answered', extra={'user_id': user.id, 'results': len(parts['sources']), 'took_ms': took_ms})
+    return {
+        'answer': answer,
+        'sources': parts['sources'],
+        'filters': parts['filters'],
+        'took_ms': took_ms,
+    }
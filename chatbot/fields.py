@@ -0,0 +1,62 @@
+"""
+CompressedTextField: text stored as zlib-compressed bytes once it is long
+enough for compression to pay off.
+
+Values are str in Python. In the database each value is a one-byte marker
+followed by the payload: b't' + UTF-8 text, or b'z' + zlib-compressed
+UTF-8 text for values of at least CHATBOT_COMPRESS_MIN_BYTES.
+"""
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+PLAIN = b't'
+COMPRESSED = b'z'
+
+
+def compress_text(value):
+    data = value.encode()
+    if len(data) >= settings.CHATBOT_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return COMPRESSED + packed
+    return PLAIN + data
+
+
+def decompress_text(data):
+    data = bytes(data)
+    marker, payload = data[:1], data[1:]
+    if marker == COMPRESSED:
+        return zlib.decompress(payload).decode()
+    if marker == PLAIN:
+        return payload.decode()
+    raise ValueError(f'Unknown compressed text marker {marker!r}')
+
+
+class CompressedTextField(models.BinaryField):
+    """Text field stored compressed; cannot be filtered on by content"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def _check_str_default_value(self):
+        # Values are str here, so a str default is what's wanted
+        return []
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else decompress_text(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return compress_text(str(value))
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,202 @@
+"""
+Conversation history for the chat endpoints and the admin message center.
+
+Each conversation keeps only its latest CHATBOT_HISTORY_LIMIT messages:
+older turns are pruned after every exchange, so a long-running chat costs
+the same to load and store as a short one. Threads idle for
+CHATBOT_COMPACT_AFTER_DAYS are folded into a one-paragraph summary and
+threads idle for CHATBOT_RETENTION_DAYS are deleted (compact_history, run
+by the compact_chat_history command).
+
+The message center pages with a keyset cursor on (created_at, id) rather
+than OFFSET, so page 10,000 costs the same as page 1.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .models import ChatMessage, Conversation
+
+SUMMARY_QUESTIONS = 10
+
+
+class CursorError(ValueError):
+    """The message center cursor is malformed"""
+
+
+def get_or_start_conversation(user, conversation_id, question):
+    """
+    The user's conversation `conversation_id`, or a new one titled after
+    `question` when no id is given.
+
+    Returns:
+        Conversation, or None if `conversation_id` isn't one of the user's
+    """
+    if conversation_id:
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            return None
+        return Conversation.objects.filter(pk=conversation_id, user=user).first()
+    return Conversation.objects.create(user=user, title=Truncator(question).chars(80))
+
+
+def last_filters(conversation):
+    """Filters understood from the conversation's latest answer, for follow-ups"""
+    message = conversation.messages.filter(role='assistant').order_by('-id').only('filters').first()
+    return message.filters if message else None
+
+
+def prune_history(conversation, limit=None):
+    """Delete all but the newest `limit` messages of the conversation"""
+    limit = limit or settings.CHATBOT_HISTORY_LIMIT
+    cutoff = conversation.messages.order_by('-id').values_list('id', flat=True)[limit:limit + 1].first()
+    if cutoff is not None:
+        ChatMessage.objects.filter(conversation=conversation, id__lte=cutoff).delete()
+
+
+def record_answer(conversation, content, sources, filters):
+    """Store the assistant's answer, bump the conversation and prune it"""
+    message = ChatMessage.objects.create(
+        conversation=conversation, user_id=conversation.user_id, role='assistant', content=content,
+        sources=sources, filters=filters,
+    )
+    conversation.save(update_fields=['updated_at'])
+    prune_history(conversation)
+    return message
+
+
+def serialize_message(message):
+    return {
+        'id': message.id,
+        'role': message.role,
+        'content': message.content,
+        'sources': message.sources,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+# Admin message center
+
+def encode_cursor(message):
+    payload = [message.created_at.isoformat(), message.id]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+
+
+def message_page(cursor=None, user_id=None, role=None, limit=None):
+    """
+    One page of chat messages, newest first.
+
+    Args:
+        cursor (str): next_cursor of the previous page
+        user_id (int): Only this user's messages
+        role (str): Only 'user' or 'assistant' messages
+
+    Returns:
+        tuple: (list of message dicts, next_cursor or None on the last page)
+    """
+    limit = limit or settings.CHATBOT_MESSAGE_PAGE_SIZE
+    messages = ChatMessage.objects.select_related('conversation', 'user').only(
+        'id', 'role', 'content', 'sources', 'created_at', 'conversation__title', 'user__username',
+    )
+    if user_id:
+        messages = messages.filter(user_id=user_id)
+    if role:
+        messages = messages.filter(role=role)
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        # The plain created_at bound lets the planner range-scan the index;
+        # the OR breaks ties between messages stored in the same instant
+        messages = messages.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(id__lt=message_id)
+        )
+    page = list(messages.order_by('-created_at', '-id')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return [
+        dict(
+            serialize_message(message), conversation_id=message.conversation_id,
+            conversation_title=message.conversation.title, user=message.user.username,
+        )
+        for message in page[:limit]
+    ], next_cursor
+
+
+# Compaction and retention
+
+def summarize(conversation, questions):
+    """One-paragraph stand-in for a compacted thread"""
+    summary = f"{len(questions)} question(s) between {conversation.created_at:%d %b %Y} and {conversation.updated_at:%d %b %Y}"
+    if questions:
+        shown = '; '.join(Truncator(question).chars(120) for question in questions[-SUMMARY_QUESTIONS:])
+        summary += f". Asked: {shown}"
+    return summary
+
+
+def compact_batch(conversations):
+    """Fold the messages of `conversations` into their summaries"""
+    ids = [conversation.id for conversation in conversations]
+    questions = {conversation_id: [] for conversation_id in ids}
+    for conversation_id, content in ChatMessage.objects.filter(
+        conversation_id__in=ids, role='user'
+    ).order_by('id').values_list('conversation_id', 'content'):
+        questions[conversation_id].append(content)
+
+    now = timezone.now()
+    for conversation in conversations:
+        conversation.summary = summarize(conversation, questions[conversation.id])
+        conversation.compacted_at = now
+    with transaction.atomic():
+        # bulk_update leaves updated_at alone, so retention still counts from the last message
+        Conversation.objects.bulk_update(conversations, ['summary', 'compacted_at'])
+        ChatMessage.objects.filter(conversation_id__in=ids).delete()
+
+
+def compact_history(compact_after_days=None, retention_days=None, batch_size=500):
+    """
+    Delete threads idle past the retention period, then compact the ones
+    idle past the compaction age, `batch_size` threads per transaction.
+
+    Returns:
+        dict: deleted and compacted conversation counts
+    """
+    compact_after_days = settings.CHATBOT_COMPACT_AFTER_DAYS if compact_after_days is None else compact_after_days
+    retention_days = settings.CHATBOT_RETENTION_DAYS if retention_days is None else retention_days
+    now = timezone.now()
+    counts = {'deleted': 0, 'compacted': 0}
+
+    expired = Conversation.objects.filter(updated_at__lt=now - timedelta(days=retention_days))
+    while True:
+        ids = list(expired.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            ChatMessage.objects.filter(conversation_id__in=ids).delete()
+            Conversation.objects.filter(pk__in=ids).delete()
+        counts['deleted'] += len(ids)
+
+    idle = Conversation.objects.filter(
+        updated_at__lt=now - timedelta(days=compact_after_days), compacted_at__isnull=True,
+    ).only('id', 'created_at', 'updated_at').order_by('pk')
+    last_id = 0
+    while True:
+        batch = list(idle.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        compact_batch(batch)
+        counts['compacted'] += len(batch)
+        last_id = batch[-1].id
+    return counts
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chatbot.history import compact_history
+
+
+class Command(BaseCommand):
+    help = 'Fold idle chat threads into summaries and delete threads past the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--compact-after-days', type=int, default=settings.CHATBOT_COMPACT_AFTER_DAYS,
+            help=f'Compact threads idle this long (default: CHATBOT_COMPACT_AFTER_DAYS={settings.CHATBOT_COMPACT_AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.CHATBOT_RETENTION_DAYS,
+            help=f'Delete threads idle this long (default: CHATBOT_RETENTION_DAYS={settings.CHATBOT_RETENTION_DAYS})',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Threads per transaction (default: 500)')
+
+    def handle(self, *args, **options):
+        counts = compact_history(
+            options['compact_after_days'], options['retention_days'], batch_size=max(options['batch_size'], 1),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {counts['deleted']:,} expired conversations, compacted {counts['compacted']:,}"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from chatbot.search import catch_up, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Bring the chatbot search index up to date with the site diary change log, '
+        'or rebuild it from scratch with --rebuild'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Reindex every diary record and portfolio project')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Records per indexing batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write('Rebuilding the chatbot index...')
+            totals = rebuild_index(batch_size=max(options['batch_size'], 1), stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(f'Indexed {sum(totals.values()):,} documents'))
+            return
+
+        processed = 0
+        while True:
+            batch = catch_up(limit=max(options['batch_size'], 1))
+            if not batch:
+                break
+            processed += batch
+        self.stdout.write(self.style.SUCCESS(f'Applied {processed:,} changes'))
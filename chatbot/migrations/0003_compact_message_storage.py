@@ -0,0 +1,84 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import chatbot.fields
+
+
+def copy_messages(apps, schema_editor):
+    """Fill in the user and the compressed body of existing messages"""
+    ChatMessage = apps.get_model('chatbot', 'ChatMessage')
+    batch = []
+    for message in ChatMessage.objects.select_related('conversation').only(
+        'id', 'content', 'conversation__user_id'
+    ).iterator(chunk_size=1000):
+        message.body = message.content
+        message.user_id = message.conversation.user_id
+        batch.append(message)
+        if len(batch) == 1000:
+            ChatMessage.objects.bulk_update(batch, ['body', 'user'])
+            batch = []
+    if batch:
+        ChatMessage.objects.bulk_update(batch, ['body', 'user'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_conversations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='compacted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='body',
+            field=chatbot.fields.CompressedTextField(default=''),
+        ),
+        migrations.RunPython(copy_messages, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='chatmessage',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='chatmessage',
+            old_name='body',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', 'created_at'], name='chatbot_con_user_id_6aaf26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['updated_at'], name='chatbot_con_updated_598a82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['created_at', 'id'], name='chatbot_cha_created_4f1362_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='chatbot_cha_user_id_1fa4bc_idx'),
+        ),
+    ]
@@ -1,3 +1,126 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from .fields import CompressedTextField
+
+
+class SearchDocument(models.Model):
+    """
+    One passage the chatbot can retrieve: a diary entry, a delay, a material
+    delivery or a portfolio project, flattened to text (see chatbot.search).
+    """
+    SOURCES = [
+        ('diary_entry', 'Diary entry'),
+        ('delay_entry', 'Delay'),
+        ('material_entry', 'Material delivery'),
+        ('portfolio_project', 'Portfolio project'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCES)
+    object_id = models.BigIntegerField()
+    # Site diary project the passage belongs to; null for portfolio projects,
+    # which are public
+    project = models.ForeignKey(
+        'site_diary.Project', on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    entry_date = models.DateField(null=True, blank=True)
+    title = models.CharField(max_length=255)
+    text = models.TextField()
+    length = models.PositiveIntegerField(default=0, help_text="Number of indexed terms")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'object_id'], name='chatbot_document_source_object'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'entry_date']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class SearchPosting(models.Model):
+    """Inverted index: how often `term` occurs in `document`"""
+    term = models.CharField(max_length=40)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'document']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} x{self.frequency} in {self.document_id}"
+
+
+class SearchIndexState(models.Model):
+    """
+    Single row recording how far the index has read site_diary's SyncChange
+    log, so each catch-up only processes what changed since.
+    """
+    last_change_id = models.BigIntegerField(default=0)
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Search index at change #{self.last_change_id}"
+
+
+class Conversation(models.Model):
+    """A user's chat with the assistant"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_conversations')
+    title = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Set by compact_chat_history when the thread's messages are folded into it
+    summary = models.TextField(blank=True)
+    compacted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return self.title or f"Conversation {self.pk}"
+
+
+class ChatMessage(models.Model):
+    """
+    One turn of a conversation. Only the latest CHATBOT_HISTORY_LIMIT
+    messages of each conversation are kept (see chatbot.history).
+    """
+    ROLES = [
+        ('user', 'User'),
+        ('assistant', 'Assistant'),
+    ]
+
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
+    # Copied from the conversation so the message center can page one user's
+    # messages straight off the (user, created_at) index
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    role = models.CharField(max_length=10, choices=ROLES)
+    # Compressed from CHATBOT_COMPRESS_MIN_BYTES up; not searchable in SQL
+    content = CompressedTextField()
+    # Assistant turns: the passages quoted and the filters understood, so a
+    # follow-up question can reuse them
+    sources = models.JSONField(default=list, blank=True)
+    filters = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['conversation', 'id']),
+            # Keyset pagination in the admin message center (chatbot.history.message_page)
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
@@ -0,0 +1,375 @@
+"""
+Local BM25 retrieval over site diary and portfolio text.
+
+Diary entries, delays, material deliveries and portfolio projects are
+flattened to one SearchDocument each, with an inverted index of stemmed
+terms in SearchPosting. Scoring runs in the database, as one aggregate over
+the postings of the query terms, so nothing is held in worker memory and
+every worker sees the same index.
+
+The index is kept current incrementally. Diary changes are read from
+site_diary's SyncChange log, which already records every save, delete and
+bulk import (catch_up()). The writer runs catch_up() once its transaction
+commits, and `manage.py update_chat_index` from cron applies anything a
+busy catch-up left behind. Answering a question only reads the index.
+Portfolio projects are reindexed by signals (chatbot.signals).
+`manage.py update_chat_index --rebuild` rebuilds it all, e.g. after loading
+synthetic data, which bypasses both.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import SearchDocument, SearchIndexState, SearchPosting
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+STATS_CACHE_KEY = 'chatbot:search:stats'
+STATS_CACHE_SECONDS = 300
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers him his how i if in into is it its itself just me more most my no nor not of
+off on once only or other our out over own same she should so some such than that the their them
+then there these they this those through to too under until up very was we were what when where
+which while who whom why will with would you your
+anything something happened happen tell show give find know please any ago
+today yesterday week weeks month months year years last past recent recently days day
+""".split())
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# SyncChange model key -> SearchDocument source
+CHANGE_SOURCES = {
+    'diary_entries': 'diary_entry',
+    'delay_entries': 'delay_entry',
+    'material_entries': 'material_entry',
+}
+
+
+# Text processing
+
+def stem(word):
+    """Strip the common English inflections so "delays" and "delayed" match "delay"."""
+    if len(word) <= 4 or word.isdigit():
+        return word
+    if word.endswith(('ies', 'ied')):
+        return word[:-3] + 'y'
+    for suffix in ('ing', 'ed'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, stemmed terms of `text` without stopwords"""
+    return [
+        stem(token) for token in TOKEN_RE.findall((text or '').lower())
+        if token not in STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+def best_snippet(text, terms, max_length=240):
+    """
+    The sentence of a passage's body with the most query terms (the first
+    one if none match). The first line of a passage is a generic header
+    repeating its title, so it is only used when there is nothing else.
+    """
+    terms = set(terms)
+    header, _, body = (text or '').partition('\n')
+    best, best_hits = header.strip(), -1
+    for sentence in SENTENCE_RE.split(body):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        hits = len(terms.intersection(tokenize(sentence)))
+        if hits > best_hits:
+            best, best_hits = sentence, hits
+    if len(best) > max_length:
+        best = best[:max_length - 1].rsplit(' ', 1)[0] + '…'
+    return best
+
+
+# Documents
+
+def join_text(*parts):
+    return '\n'.join(str(part) for part in parts if part)
+
+
+def diary_documents(ids):
+    from site_diary.models import DiaryEntry
+
+    for entry in DiaryEntry.objects.filter(pk__in=ids).select_related('project'):
+        yield entry.pk, entry.project_id, entry.entry_date, f"{entry.project.name}: diary {entry.entry_date}", join_text(
+            f"{entry.project.name} diary for {entry.entry_date}.",
+            f"Weather: {entry.get_weather_condition_display()}." if entry.weather_condition else '',
+            entry.work_description,
+            f"Quality issues: {entry.quality_issues}" if entry.quality_issues else '',
+            f"Safety incidents: {entry.safety_incidents}" if entry.safety_incidents else '',
+            entry.general_notes,
+        )
+
+
+def delay_documents(ids):
+    from site_diary.models import DelayEntry
+
+    for delay in DelayEntry.objects.filter(pk__in=ids).select_related('diary_entry__project'):
+        entry = delay.diary_entry
+        title = (
+            f"{entry.project.name}: {delay.get_category_display()} delay on {entry.entry_date} "
+            f"({delay.duration_hours:g} h, {delay.get_impact_level_display()})"
+        )
+        yield delay.pk, entry.project_id, entry.entry_date, title, join_text(
+            f"{entry.project.name} was delayed on {entry.entry_date} for {delay.duration_hours} hours "
+            f"({delay.get_category_display()}, {delay.get_impact_level_display()}).",
+            delay.description,
+            f"Affected: {delay.affected_activities}" if delay.affected_activities else '',
+            f"Mitigation: {delay.mitigation_actions}" if delay.mitigation_actions else '',
+            f"Responsible: {delay.responsible_party}." if delay.responsible_party else '',
+        )
+
+
+def material_documents(ids):
+    from site_diary.models import MaterialEntry
+
+    for material in MaterialEntry.objects.filter(pk__in=ids).select_related('diary_entry__project'):
+        entry = material.diary_entry
+        title = f"{entry.project.name}: {material.material_name} on {entry.entry_date}"
+        yield material.pk, entry.project_id, entry.entry_date, title, join_text(
+            f"{entry.project.name} received {material.quantity_delivered} {material.unit} of "
+            f"{material.material_name} on {entry.entry_date} and used {material.quantity_used}.",
+            f"Supplier: {material.supplier}." if material.supplier else '',
+            f"Stored at {material.storage_location}." if material.storage_location else '',
+            '' if material.quality_check else 'Failed quality check.',
+            material.notes,
+        )
+
+
+def portfolio_documents(ids):
+    from portfolio.models import Project
+
+    for project in Project.objects.filter(pk__in=ids).select_related('category'):
+        yield project.pk, None, None, project.title, join_text(
+            f"{project.title} ({project.category.name}, {project.location}, {project.year}).",
+            project.description,
+            f"Lead architect: {project.lead_architect}. Status: {project.get_status_display()}. "
+            f"Size {project.size}, duration {project.duration}.",
+        )
+
+
+DOCUMENT_BUILDERS = {
+    'diary_entry': diary_documents,
+    'delay_entry': delay_documents,
+    'material_entry': material_documents,
+    'portfolio_project': portfolio_documents,
+}
+
+
+# Indexing
+
+def index_objects(source, ids):
+    """
+    (Re)index the given objects of one source. Ids that no longer exist
+    are removed from the index.
+
+    Returns:
+        int: Documents written
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    with transaction.atomic():
+        SearchDocument.objects.filter(source=source, object_id__in=ids).delete()
+        documents = []
+        terms = []
+        for object_id, project_id, entry_date, title, text in DOCUMENT_BUILDERS[source](ids):
+            counts = Counter(tokenize(text))
+            documents.append(SearchDocument(
+                source=source, object_id=object_id, project_id=project_id, entry_date=entry_date,
+                title=title[:255], text=text, length=sum(counts.values()),
+            ))
+            terms.append(counts)
+        SearchDocument.objects.bulk_create(documents)
+        if any(document.pk is None for document in documents):
+            # Backends that cannot return ids from bulk_create
+            pks = dict(SearchDocument.objects.filter(source=source, object_id__in=ids).values_list('object_id', 'pk'))
+            for document in documents:
+                document.pk = pks[document.object_id]
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term[:40], document_id=document.pk, frequency=frequency)
+            for document, counts in zip(documents, terms)
+            for term, frequency in counts.items()
+        ], batch_size=5000)
+    cache.delete(STATS_CACHE_KEY)
+    return len(documents)
+
+
+def remove_objects(source, ids):
+    SearchDocument.objects.filter(source=source, object_id__in=list(ids)).delete()
+    cache.delete(STATS_CACHE_KEY)
+
+
+def catch_up(limit=None):
+    """
+    Apply diary changes logged since the last catch-up.
+
+    Only one worker catches up at a time; the others return at once rather
+    than wait, and their changes are applied by the next catch-up. Change
+    log ids follow commit order (site_diary.sync.append_changes), so every
+    committed change can be applied as soon as it is seen.
+
+    Returns:
+        int: Changes processed
+    """
+    from site_diary.models import DelayEntry, MaterialEntry, SyncChange
+
+    limit = limit or settings.CHATBOT_INDEX_CATCH_UP_BATCH
+    with transaction.atomic():
+        state = SearchIndexState.objects.select_for_update(skip_locked=True).filter(pk=1).first()
+        if state is None:
+            if SearchIndexState.objects.filter(pk=1).exists():
+                return 0
+            state = SearchIndexState.objects.create(pk=1)
+
+        fetched = list(SyncChange.objects.filter(
+            pk__gt=state.last_change_id, model__in=CHANGE_SOURCES,
+        ).order_by('pk').values_list('pk', 'model', 'object_id')[:limit])
+        if not fetched:
+            return 0
+        changed = {source: set() for source in CHANGE_SOURCES.values()}
+        for pk, model_key, object_id in fetched:
+            changed[CHANGE_SOURCES[model_key]].add(object_id)
+        state.last_change_id = fetched[-1][0]
+
+        # Delay and material passages quote their entry's project and date
+        entries = changed['diary_entry']
+        if entries:
+            changed['delay_entry'].update(DelayEntry.objects.filter(diary_entry_id__in=entries).values_list('pk', flat=True))
+            changed['material_entry'].update(
+                MaterialEntry.objects.filter(diary_entry_id__in=entries).values_list('pk', flat=True)
+            )
+        for source, ids in changed.items():
+            index_objects(source, ids)
+        state.save(update_fields=['last_change_id'])
+    return len(fetched)
+
+
+def rebuild_index(batch_size=1000, stdout=None):
+    """
+    Reindex everything from scratch.
+
+    Returns:
+        dict: Documents indexed per source
+    """
+    from portfolio.models import Project as PortfolioProject
+    from site_diary.models import DelayEntry, DiaryEntry, MaterialEntry, SyncChange
+
+    models = {
+        'diary_entry': DiaryEntry,
+        'delay_entry': DelayEntry,
+        'material_entry': MaterialEntry,
+        'portfolio_project': PortfolioProject,
+    }
+    # Changes logged from here on are picked up by the next catch-up
+    last_change_id = SyncChange.objects.aggregate(last=Max('pk'))['last'] or 0
+    SearchDocument.objects.all().delete()
+    totals = {}
+    for source, model in models.items():
+        totals[source] = 0
+        last_pk = 0
+        while True:
+            ids = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            totals[source] += index_objects(source, ids)
+            last_pk = ids[-1]
+        if stdout is not None:
+            stdout.write(f"  {source}: {totals[source]:,}")
+    SearchIndexState.objects.update_or_create(
+        pk=1, defaults={'last_change_id': last_change_id, 'rebuilt_at': timezone.now()},
+    )
+    return totals
+
+
+# Retrieval
+
+def corpus_stats():
+    """(document count, average document length), cached briefly"""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        aggregate = SearchDocument.objects.aggregate(count=Count('pk'), avg_length=Avg('length'))
+        stats = (aggregate['count'], float(aggregate['avg_length'] or 0))
+        cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_SECONDS)
+    return stats
+
+
+def search(user, terms, k=5, start=None, end=None, projects=None):
+    """
+    BM25 top-k over the passages `user` may see: diary passages of
+    get_user_projects(user), plus portfolio projects.
+
+    Args:
+        terms (list): Query terms, already tokenized
+        start, end (date): Only diary passages dated in this range
+        projects (list): Only diary passages of these site diary project ids
+
+    Returns:
+        list: (SearchDocument, score) pairs, best first
+    """
+    from site_diary.utils import get_user_projects
+
+    terms = list(dict.fromkeys(terms))
+    document_count, avg_length = corpus_stats()
+    if not terms or not document_count:
+        return []
+
+    frequencies = dict(
+        SearchPosting.objects.filter(term__in=terms).values('term')
+        .annotate(documents=Count('pk')).values_list('term', 'documents')
+    )
+    idf = {
+        term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+        for term, frequency in frequencies.items()
+    }
+    if not idf:
+        return []
+
+    postings = SearchPosting.objects.filter(term__in=idf)
+    if start or end or projects:
+        if start:
+            postings = postings.filter(document__entry_date__gte=start)
+        if end:
+            postings = postings.filter(document__entry_date__lte=end)
+        if projects:
+            postings = postings.filter(document__project_id__in=projects)
+        postings = postings.filter(document__project__in=get_user_projects(user))
+    else:
+        postings = postings.filter(
+            Q(document__project__isnull=True) | Q(document__project__in=get_user_projects(user))
+        )
+
+    weight = Case(*[When(term=term, then=Value(value)) for term, value in idf.items()], output_field=FloatField())
+    frequency = Cast('frequency', FloatField())
+    length = Cast(F('document__length'), FloatField())
+    norm = Value(K1 * (1 - B)) + Value(K1 * B / max(avg_length, 1.0)) * length
+    rows = list(
+        postings.values('document_id')
+        .annotate(score=Sum(weight * frequency * Value(K1 + 1) / (frequency + norm)))
+        .order_by('-score', 'document_id')
+        .values_list('document_id', 'score')[:k]
+    )
+    documents = SearchDocument.objects.in_bulk([document_id for document_id, _ in rows])
+    return [(documents[document_id], score) for document_id, score in rows if document_id in documents]
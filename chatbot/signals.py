@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from portfolio.models import Project
+from site_diary.models import SyncChange
+from site_diary.sync import changes_appended
+
+from .search import catch_up, index_objects, remove_objects
+
+
+@receiver(changes_appended, sender=SyncChange, dispatch_uid='chatbot_catch_up')
+def catch_up_after_commit(sender, **kwargs):
+    """Apply logged diary changes to the index once the writer commits"""
+    # robust: an indexing error is logged rather than failing a committed write
+    transaction.on_commit(catch_up, robust=True)
+
+
+@receiver(post_save, sender=Project)
+def index_portfolio_project(sender, instance, raw=False, **kwargs):
+    """Reindex a portfolio project once the save commits"""
+    if not raw:
+        transaction.on_commit(lambda: index_objects('portfolio_project', [instance.pk]))
+
+
+@receiver(post_delete, sender=Project)
+def unindex_portfolio_project(sender, instance, **kwargs):
+    remove_objects('portfolio_project', [instance.pk])
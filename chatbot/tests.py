@@ -1,3 +1,274 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from portfolio.models import Category, Project as PortfolioProject
+from site_diary.models import DelayEntry, DiaryEntry, MaterialEntry, Project
+
+from .engine import answer_question, parse_date_range
+from .fields import COMPRESSED
+from .history import compact_history, prune_history
+from .models import ChatMessage, Conversation, SearchDocument
+from .search import stem, tokenize
+
+
+class TextProcessingTest(TestCase):
+    """Test tokenizing and question parsing"""
+
+    def test_tokenize_drops_stopwords_and_stems(self):
+        self.assertEqual(tokenize('What delayed the concrete deliveries?'), ['delay', 'concrete', 'delivery'])
+        self.assertEqual(stem('delays'), 'delay')
+        self.assertEqual(stem('supplies'), stem('supply'))
+
+    def test_parse_date_range(self):
+        today = date(2025, 3, 12)
+        self.assertEqual(parse_date_range('what delayed it last month?', today), (date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertEqual(parse_date_range('rain yesterday', today), (date(2025, 3, 11), date(2025, 3, 11)))
+        self.assertEqual(parse_date_range('deliveries in the last 10 days', today), (date(2025, 3, 2), today))
+        self.assertEqual(parse_date_range('delays in november', today), (date(2024, 11, 1), date(2024, 11, 30)))
+        self.assertEqual(parse_date_range('all delays', today), (None, None))
+
+
+class ChatbotRetrievalTest(TestCase):
+    """Test retrieval, access scoping and incremental indexing"""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='pm_chat', password='testpass123')
+        self.outsider = User.objects.create_user(username='outsider_chat', password='testpass123')
+        self.project = self._project('Riverside Tower', self.manager)
+        self._project('Hilltop Villas', self.outsider)
+
+        self.last_month = timezone.localdate().replace(day=1) - timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = DiaryEntry.objects.create(
+                project=self.project, entry_date=self.last_month, created_by=self.manager,
+                work_description='Formwork for level 3 slab.',
+            )
+            self.delay = DelayEntry.objects.create(
+                diary_entry=entry, category='weather', description='Heavy rain stopped the slab pour.',
+                duration_hours=Decimal('6'), impact_level='high', affected_activities='Concrete pour',
+            )
+            MaterialEntry.objects.create(
+                diary_entry=entry, material_name='Ready-mix concrete', quantity_delivered=Decimal('40'),
+                unit='m3', supplier='Metro Concrete',
+            )
+
+    def _project(self, name, manager):
+        return Project.objects.create(
+            name=name, client_name='Client', project_manager=manager, location='Site',
+            start_date=date(2024, 1, 1), expected_end_date=date(2026, 12, 31),
+            budget=Decimal('1000.00'), status='active'
+        )
+
+    def test_answers_from_accessible_projects_only(self):
+        result = answer_question(self.manager, 'What delayed Riverside Tower last month?')
+        self.assertEqual(result['sources'][0]['source'], 'delay_entry')
+        self.assertEqual(result['sources'][0]['id'], self.delay.id)
+        self.assertIn('Heavy rain stopped the slab pour', result['answer'])
+        self.assertEqual(result['filters']['projects'], [{'id': self.project.id, 'name': 'Riverside Tower'}])
+
+        result = answer_question(self.outsider, 'What delayed Riverside Tower last month?')
+        self.assertEqual(result['sources'], [])
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.delay.description = 'Crane breakdown stopped the slab pour.'
+            self.delay.save()
+        result = answer_question(self.manager, 'crane breakdown')
+        self.assertEqual([source['id'] for source in result['sources']], [self.delay.id])
+        self.assertEqual(answer_question(self.manager, 'heavy rain')['sources'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.delay.delete()
+        self.assertEqual(answer_question(self.manager, 'crane breakdown')['sources'], [])
+
+        category = Category.objects.create(name='Residential', slug='residential')
+        with self.captureOnCommitCallbacks(execute=True):
+            PortfolioProject.objects.create(
+                title='Lakeside Pavilion', description='Timber pavilion with a green roof.', category=category,
+                year=2024, location='Lakeside', size='300 m2', duration='8 Months',
+                completion_date=date(2024, 6, 30), lead_architect='A. Architect', status='completed',
+            )
+        result = answer_question(self.outsider, 'green roof pavilion')
+        self.assertEqual(result['sources'][0]['source'], 'portfolio_project')
+
+    def test_answering_only_reads_the_index(self):
+        # Until the writer commits, the change is only in the log
+        self.delay.description = 'Crane breakdown stopped the slab pour.'
+        self.delay.save()
+        self.assertEqual(answer_question(self.manager, 'crane breakdown')['sources'], [])
+        self.assertEqual(answer_question(self.manager, 'heavy rain')['sources'][0]['id'], self.delay.id)
+
+        # The cron catch-up applies whatever the writers left behind
+        out = StringIO()
+        call_command('update_chat_index', stdout=out)
+        self.assertIn('Applied 1 changes', out.getvalue())
+        self.assertEqual(answer_question(self.manager, 'crane breakdown')['sources'][0]['id'], self.delay.id)
+
+    def test_rebuild_command_and_ask_endpoint(self):
+        SearchDocument.objects.all().delete()
+        call_command('update_chat_index', '--rebuild', stdout=StringIO())
+        self.assertEqual(SearchDocument.objects.filter(project=self.project).count(), 3)
+
+        self.assertEqual(self.client.post('/chat/ask/', {'question': 'rain'}).status_code, 302)
+        self.client.force_login(self.manager)
+        response = self.client.post(
+            '/chat/ask/', json.dumps({'question': 'concrete supplier'}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sources'][0]['source'], 'material_entry')
+        self.assertEqual(self.client.post('/chat/ask/', {'question': ' '}).status_code, 400)
+
+
+class ChatStreamTest(TestCase):
+    """Test the server-sent events chat endpoint and conversation history"""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='pm_stream', password='testpass123')
+        self.project = Project.objects.create(
+            name='Riverside Tower', client_name='Client', project_manager=self.manager, location='Site',
+            start_date=date(2024, 1, 1), expected_end_date=date(2026, 12, 31),
+            budget=Decimal('1000.00'), status='active'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = DiaryEntry.objects.create(
+                project=self.project, entry_date=timezone.localdate() - timedelta(days=2), created_by=self.manager,
+                work_description='Formwork for level 3 slab.',
+            )
+            self.delay = DelayEntry.objects.create(
+                diary_entry=entry, category='weather', description='Heavy rain stopped the slab pour.',
+                duration_hours=Decimal('6'), impact_level='high', affected_activities='Concrete pour',
+            )
+
+    async def _stream(self, data):
+        response = await self.async_client.post('/chat/stream/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        events = []
+        for block in body.strip().split('\n\n'):
+            event, data_line = block.split('\n')
+            events.append((event.removeprefix('event: '), json.loads(data_line.removeprefix('data: '))))
+        return events
+
+    async def test_streams_answer_and_keeps_context(self):
+        await self.async_client.aforce_login(self.manager)
+        events = await self._stream({'question': 'What delayed Riverside Tower?'})
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], 'conversation')
+        self.assertEqual(names[-1], 'done')
+        self.assertIn('source', names)
+        text = ''.join(data['text'] for name, data in events if name == 'delta')
+        self.assertIn('Heavy rain stopped the slab pour', text)
+
+        # The follow-up names no project, so it keeps Riverside Tower
+        conversation_id = events[0][1]['id']
+        events = await self._stream({'question': 'and this week?', 'conversation': conversation_id})
+        filters = dict(events)['filters']
+        self.assertEqual(filters['projects'], [{'id': self.project.id, 'name': 'Riverside Tower'}])
+
+        response = await self.async_client.get(f'/chat/conversations/{conversation_id}/')
+        self.assertEqual([message['role'] for message in response.json()['messages']],
+                         ['user', 'assistant', 'user', 'assistant'])
+
+    async def test_rejects_other_users_conversations(self):
+        other = await User.objects.acreate_user(username='other_stream', password='testpass123')
+        conversation = await Conversation.objects.acreate(user=other, title='Theirs')
+        await self.async_client.aforce_login(self.manager)
+        response = await self.async_client.post('/chat/stream/', {'question': 'rain', 'conversation': conversation.id})
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(f'/chat/conversations/{conversation.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_history_is_bounded(self):
+        conversation = Conversation.objects.create(user=self.manager)
+        for number in range(7):
+            ChatMessage.objects.create(
+                conversation=conversation, user=self.manager, role='user', content=f'question {number}',
+            )
+        prune_history(conversation, limit=4)
+        self.assertEqual(
+            list(conversation.messages.values_list('content', flat=True)),
+            ['question 3', 'question 4', 'question 5', 'question 6'],
+        )
+
+
+class MessageStoreTest(TestCase):
+    """Test compressed message storage, message center paging and compaction"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='chat_user', password='testpass123')
+        self.other = User.objects.create_user(username='chat_other', password='testpass123')
+        self.conversation = Conversation.objects.create(user=self.user, title='Deliveries')
+
+    def _message(self, content, user=None, conversation=None, role='user'):
+        return ChatMessage.objects.create(
+            conversation=conversation or self.conversation, user=user or self.user, role=role, content=content,
+        )
+
+    def test_long_messages_are_stored_compressed(self):
+        long_text = 'Ready-mix concrete delivery was late again. ' * 100
+        long_message = self._message(long_text)
+        short_message = self._message('rain?')
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM chatbot_chatmessage WHERE id = %s', [long_message.id])
+            stored = bytes(cursor.fetchone()[0])
+        self.assertTrue(stored.startswith(COMPRESSED))
+        self.assertLess(len(stored), len(long_text) // 10)
+        self.assertEqual(ChatMessage.objects.get(pk=long_message.pk).content, long_text)
+        self.assertEqual(ChatMessage.objects.get(pk=short_message.pk).content, 'rain?')
+
+    def test_message_center_pages_with_keyset_cursor(self):
+        other_conversation = Conversation.objects.create(user=self.other)
+        created = [self._message(f'question {number}') for number in range(5)]
+        self._message('not mine', user=self.other, conversation=other_conversation)
+        # Same timestamp for all: the id breaks the tie
+        ChatMessage.objects.update(created_at=timezone.now())
+
+        admin = User.objects.create_superuser(username='chat_admin', password='testpass123')
+        self.client.force_login(admin)
+        seen = []
+        cursor = ''
+        with override_settings(CHATBOT_MESSAGE_PAGE_SIZE=2):
+            for _ in range(5):
+                data = self.client.get(
+                    '/chat/adminmessagecenter/api/messages/', {'user': self.user.id, 'cursor': cursor},
+                ).json()
+                self.assertLessEqual(len(data['messages']), 2)
+                seen += [message['id'] for message in data['messages']]
+                cursor = data['next_cursor']
+                if not cursor:
+                    break
+        self.assertEqual(seen, [message.id for message in reversed(created)])
+        response = self.client.get('/chat/adminmessagecenter/api/messages/', {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_login(self.user)
+        response = self.client.get('/chat/adminmessagecenter/api/messages/')
+        self.assertNotEqual(response.status_code, 200)
+
+    def test_compaction_and_retention(self):
+        self._message('what delayed the slab pour?')
+        self._message('Heavy rain.', role='assistant')
+        expired = Conversation.objects.create(user=self.user, title='Old')
+        self._message('ancient question', conversation=expired)
+        now = timezone.now()
+        Conversation.objects.filter(pk=self.conversation.pk).update(updated_at=now - timedelta(days=100))
+        Conversation.objects.filter(pk=expired.pk).update(updated_at=now - timedelta(days=400))
+
+        out = StringIO()
+        call_command('compact_chat_history', '--batch-size', '1', stdout=out)
+        self.assertIn('Deleted 1 expired conversations, compacted 1', out.getvalue())
+        self.assertFalse(Conversation.objects.filter(pk=expired.pk).exists())
+        self.conversation.refresh_from_db()
+        self.assertIn('what delayed the slab pour?', self.conversation.summary)
+        self.assertIsNotNone(self.conversation.compacted_at)
+        self.assertFalse(self.conversation.messages.exists())
+        self.assertEqual(compact_history(), {'deleted': 0, 'compacted': 0})
@@ -3,5 +3,9 @@ from . import views
 
 urlpatterns = [
     path('adminmessagecenter/', views.adminmessagecenter, name='adminmessagecenter'),
+    path('adminmessagecenter/api/messages/', views.message_center_api, name='message_center_api'),
+    path('ask/', views.ask, name='ask'),
+    path('stream/', views.stream, name='stream'),
+    path('conversations/<int:pk>/', views.conversation_history, name='conversation_history'),
     path('', views.chatbot, name='chatbot'),
-]
\ No newline at end of file
+]
@@ -1,8 +1,176 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from accounts.decorators import require_admin_role
+
+from .engine import answer_question, prepare_answer
+from .history import (
+    CursorError, get_or_start_conversation, last_filters, message_page, record_answer, serialize_message,
+)
+from .models import ChatMessage, Conversation
+
+MAX_QUESTION_LENGTH = 500
+
 
 def chatbot(request):
     return render(request, 'chatbot/chatbot.html')
 
+@require_admin_role
 def adminmessagecenter(request):
-    return render(request, 'admin/adminmessagecenter.html')
+    chat_messages, next_cursor = message_page()
+    return render(request, 'admin/adminmessagecenter.html', {
+        'chat_messages': chat_messages,
+        'next_cursor': next_cursor,
+    })
+
+
+@require_admin_role
+@require_GET
+def message_center_api(request):
+    """
+    Chat messages for the admin message center, newest first.
+
+    Query parameters: cursor (next_cursor of the previous page), user (id)
+    and role ('user' or 'assistant').
+    """
+    try:
+        user_id = int(request.GET['user']) if request.GET.get('user') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid user'}, status=400)
+    role = request.GET.get('role') or None
+    if role and role not in dict(ChatMessage.ROLES):
+        return JsonResponse({'error': 'Invalid role'}, status=400)
+    try:
+        chat_messages, next_cursor = message_page(request.GET.get('cursor'), user_id=user_id, role=role)
+    except CursorError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({'messages': chat_messages, 'next_cursor': next_cursor})
+
+
+def read_question(request):
+    """
+    The POSTed question and request body, from form fields or a JSON body.
+
+    Returns:
+        tuple: (question, data, error JsonResponse or None)
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+            question = data.get('question', '')
+        except (ValueError, AttributeError):
+            return '', {}, JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    else:
+        data = request.POST
+        question = data.get('question', '')
+    if not isinstance(question, str) or not question.strip():
+        return '', data, JsonResponse({'error': 'Ask a question'}, status=400)
+    if len(question) > MAX_QUESTION_LENGTH:
+        return '', data, JsonResponse(
+            {'error': f'Questions are limited to {MAX_QUESTION_LENGTH} characters'}, status=400
+        )
+    return question.strip(), data, None
+
+
+@login_required
+@require_POST
+def ask(request):
+    """
+    Answer a question from the diary and portfolio records the user can see.
+
+    Takes `question` as a form field or in a JSON body; returns the answer
+    text and the passages it was drawn from.
+    """
+    question, _, error = read_question(request)
+    if error:
+        return error
+    return JsonResponse(answer_question(request.user, question))
+
+
+def sse(event, data):
+    """One server-sent event"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def start_exchange(user, conversation_id, question):
+    """
+    Open (or continue) the conversation and store the user's turn.
+
+    Returns:
+        tuple: (Conversation or None, filters of the previous answer)
+    """
+    conversation = get_or_start_conversation(user, conversation_id, question)
+    if conversation is None:
+        return None, None
+    context = last_filters(conversation)
+    ChatMessage.objects.create(conversation=conversation, user=user, role='user', content=question)
+    return conversation, context
+
+
+async def stream_answer(user, conversation, question, context):
+    """
+    Event stream for one answer: `conversation` goes out before any
+    retrieval so the client can render immediately, then `filters`, one
+    `delta` per line of the answer with its `source`, and `done`.
+    """
+    started = time.perf_counter()
+    yield sse('conversation', {'id': conversation.id, 'title': conversation.title})
+
+    parts = await sync_to_async(prepare_answer)(user, question, context=context)
+    yield sse('filters', parts['filters'])
+    if parts['lines']:
+        yield sse('delta', {'text': parts['intro'] + '\n'})
+        for line, source in zip(parts['lines'], parts['sources']):
+            yield sse('source', source)
+            yield sse('delta', {'text': line + '\n'})
+        content = '\n'.join([parts['intro']] + parts['lines'])
+    else:
+        yield sse('delta', {'text': parts['empty']})
+        content = parts['empty']
+
+    message = await sync_to_async(record_answer)(conversation, content, parts['sources'], parts['filters'])
+    yield sse('done', {'message_id': message.id, 'took_ms': round((time.perf_counter() - started) * 1000, 2)})
+
+
+@login_required
+@require_POST
+async def stream(request):
+    """
+    Answer a chat message as a stream of server-sent events.
+
+    Takes `question` and optionally `conversation` (an id from an earlier
+    `conversation` event) as form fields or JSON. The view is async: under
+    ASGI the open stream holds no worker thread while the client reads it.
+    """
+    question, data, error = read_question(request)
+    if error:
+        return error
+    user = await request.auser()
+    conversation, context = await sync_to_async(start_exchange)(user, data.get('conversation'), question)
+    if conversation is None:
+        return JsonResponse({'error': 'Conversation not found'}, status=404)
+
+    response = StreamingHttpResponse(
+        stream_answer(user, conversation, question, context), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Tell nginx not to buffer the stream
+    return response
+
 
+@login_required
+@require_GET
+async def conversation_history(request, pk):
+    """The stored (bounded) history of one of the user's conversations"""
+    user = await request.auser()
+    conversation = await Conversation.objects.filter(pk=pk, user=user).afirst()
+    if conversation is None:
+        return JsonResponse({'error': 'Conversation not found'}, status=404)
+    messages = [serialize_message(message) async for message in conversation.messages.order_by('id')]
+    return JsonResponse({'id': conversation.id, 'title': conversation.title, 'messages': messages})
@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn workers under gunicorn (gunicorn.conf.py applies to
+both entry points):
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +17,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Under ASGI each request's sync code runs on its own thread, so persistent
+# per-thread connections would pile up; use the psycopg pool instead unless
+# DB_CONNECTION_MODE says otherwise (e.g. 'pgbouncer')
+os.environ.setdefault('DB_CONNECTION_MODE', 'pool')
 
 application = get_asgi_application()
@@ -56,6 +56,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.WhiteNoiseMiddleware',  # Hashed, precompressed static files (async-capable)
+    'core.instrumentation.RequestInstrumentationMiddleware',  # Per-request query/latency metrics
+    'core.profiling.ProfilingMiddleware',  # Opt-in profiles of sampled/slow requests
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,8 +74,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],  # Shared templates
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parsed templates are kept per process; core.warmup warms this
+            # cache at worker boot so no request pays the compile cost
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -84,8 +94,58 @@ TEMPLATES = [
     },
 ]
 
+# Compile every project template when a worker starts (see core.warmup)
+TEMPLATE_WARMUP = os.getenv('TEMPLATE_WARMUP', str(not DEBUG)).lower() == 'true'
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Request instrumentation (core.instrumentation)
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True').lower() == 'true'
+REQUEST_METRICS_BUFFER_SIZE = int(os.getenv('REQUEST_METRICS_BUFFER_SIZE', '500'))
+REQUEST_METRICS_SQL_MAX_LENGTH = 500
+# Raise instead of warn when a @query_budget view goes over budget
+QUERY_BUDGET_ENFORCE = os.getenv('QUERY_BUDGET_ENFORCE', str(DEBUG)).lower() == 'true'
+TEST_RUNNER = 'core.test_runner.QueryBudgetTestRunner'
+
+# Prometheus metrics (core.metrics), scraped from /metrics
+# With several gunicorn workers set METRICS_DIR to a shared writable directory
+# so the endpoint reports totals across all of them.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')]
+
+# Request profiling (core.profiling), off by default. A PROFILING_SAMPLE_RATE
+# fraction of requests run under cProfile; requests slower than
+# PROFILING_SLOW_THRESHOLD_MS get statistical stack samples. Captures are kept
+# in PROFILING_DIR, oldest deleted beyond PROFILING_MAX_PROFILES.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SLOW_THRESHOLD_MS = float(os.getenv('PROFILING_SLOW_THRESHOLD_MS', '1000'))
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILING_SAMPLE_INTERVAL_MS', '10'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', '50'))
+
+# Cache (core.cache backends count hits/misses for /metrics). Production
+# should share one cache between workers: setting REDIS_URL (e.g. a Render
+# Key Value instance) selects Redis; CACHE_BACKEND/CACHE_LOCATION override.
+# Without either, each worker keeps its own local-memory cache.
+REDIS_URL = os.getenv('REDIS_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'core.cache.InstrumentedRedisCache' if REDIS_URL else 'core.cache.InstrumentedLocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', REDIS_URL),
+        'METRICS_NAME': 'default',
+    }
+}
+# With a per-process cache (the default) a write only invalidates the worker
+# that made it, so cached pages and dashboards are kept at most this long
+# (core.cache.cache_timeout)
+LOCAL_CACHE_MAX_SECONDS = int(os.getenv('LOCAL_CACHE_MAX_SECONDS', '5'))
+
 # Database
 DATABASES = {
     'default': {
@@ -96,11 +156,37 @@ DATABASES = {
         'HOST': os.getenv('DB_HOST', 'dpg-d375ipur433s73eecc10-a.singapore-postgres.render.com'),
         'PORT': os.getenv('DB_PORT', '5432'),
         'OPTIONS': {
-            'sslmode': 'require',
+            'sslmode': os.getenv('DB_SSLMODE', 'require'),
         },
     }
 }
 
+# Connection strategy for the remote Postgres (DB_CONNECTION_MODE):
+#   'per-request' - open and close a connection for every request
+#   'persistent'  - reuse connections for DB_CONN_MAX_AGE seconds, health-checked
+#   'pool'        - psycopg 3 connection pool inside each worker process
+#   'pgbouncer'   - connect through PgBouncer in transaction pooling mode
+DB_CONNECTION_MODE = os.getenv('DB_CONNECTION_MODE', 'persistent').lower()
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+
+if DB_CONNECTION_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_CONNECTION_MODE == 'pool':
+    # Django manages pooled connections itself; CONN_MAX_AGE must stay 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+elif DB_CONNECTION_MODE == 'pgbouncer':
+    # PgBouncer hands out a server connection per transaction, so session state
+    # such as server-side cursors and prepared statements cannot be relied on
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['default']['OPTIONS']['prepare_threshold'] = None
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -128,30 +214,322 @@ DEFAULT_FROM_EMAIL = 'triplegotp@gmail.com'
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Production builds per-layout bundles at collectstatic time, content-hashes
+# them and writes .gz/.br variants; development serves the source files as-is.
+STATICFILES_BACKEND = os.getenv(
+    'STATICFILES_BACKEND',
+    'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG else 'core.storage.BundledStaticFilesStorage'
+)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': STATICFILES_BACKEND},
+}
+STATIC_BUNDLES_ENABLED = os.getenv('STATIC_BUNDLES_ENABLED', str(not DEBUG)).lower() == 'true'
+
+# Shared assets of each base layout, concatenated in this order. The layout
+# renders its CSS bundle ahead of {% block head %}, so it only holds sheets
+# every page of the layout loads first.
+#
+# Each page's own stylesheets form a page bundle ({% bundle_css '<page>' %})
+# rendered where its <link>s used to be and listing them in their original
+# order. Pages cascade shared sheets such as dashboard.css and nav.css in
+# conflicting orders, so those are bundled per page instead of per layout.
+STATIC_BUNDLES = {
+    # templates/layout.html (public site)
+    'public': {
+        'css': ['css/home.css'],
+        'js': ['js/sitejs/modal_messages.js'],
+    },
+    # core/home.html, rendered in {% block head_first %} ahead of 'public'
+    'home': {'css': [
+        'css/projects.css',
+        'css/loader.css',
+        'css/sitecss/modal_messages.css',
+    ]},
+    # templates/admin-nav-footer-template/base.html
+    'admin': {
+        'js': ['js/adminjs/mobile-btn.js'],
+    },
+    'admin-home': {'css': [
+        'css/admincss/nav.css',
+        'css/sitecss/dashboard.css',
+        'css/admincss/header.css',
+    ]},
+    'admin-settings': {'css': [
+        'css/sitecss/settings.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/createblog.css',
+        'css/admincss/nav.css',
+        'css/admincss/header.css',
+    ]},
+    'admin-blogmanagement': {'css': [
+        'css/admincss/nav.css',
+        'css/admincss/header.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/reports.css',
+        'css/sitecss/history.css',
+        'css/admincss/blogmanagement.css',
+    ]},
+    'admin-messagecenter': {'css': [
+        'css/sitecss/dashboard.css',
+        'css/sitecss/history.css',
+        'css/sitecss/chatbot.css',
+        'css/admincss/adminmessagecenter.css',
+        'css/admincss/header.css',
+        'css/admincss/nav.css',
+    ]},
+    'admin-projectmanagement': {'css': [
+        'css/admincss/header.css',
+        'css/admincss/admindiaryreviewer.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/history.css',
+        'css/admincss/projectmanagement.css',
+        'css/admincss/blogmanagement.css',
+        'css/admincss/nav.css',
+        'css/admincss/admin-nav.css',
+    ]},
+    'admin-clientproject': {'css': [
+        'css/sitecss/reports.css',
+        'css/sitecss/dashboard.css',
+        'css/admincss/adminclientproject.css',
+        'css/admincss/nav.css',
+        'css/admincss/header.css',
+    ]},
+    'admin-diaryreviewer': {'css': [
+        'css/sitecss/diary.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/history.css',
+        'css/admincss/nav.css',
+        'css/admincss/header.css',
+        'css/admincss/admindiaryreviewer.css',
+    ]},
+    'admin-history': {'css': [
+        'css/sitecss/history.css',
+        'css/sitecss/dashboard.css',
+        'css/admincss/adminhistory.css',
+        'css/admincss/header.css',
+        'css/admincss/nav.css',
+    ]},
+    'admin-reports': {'css': [
+        'css/sitecss/reports.css',
+        'css/sitecss/dashboard.css',
+        'css/admincss/adminreports.css',
+        'css/admincss/header.css',
+        'css/admincss/nav.css',
+    ]},
+    # templates/site_diary/layout_format.html (wraps site_diary/navtemplate/layout.html)
+    'site': {
+        'css': ['css/sitecss/global-header.css'],
+        'js': ['js/sitejs/mobile-btn.js'],
+    },
+    'site-createblog': {'css': [
+        'css/sitecss/createblog.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/global-header.css',
+    ]},
+    'site-drafts': {'css': [
+        'css/sitecss/global-header.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/drafts.css',
+        'css/sitecss/dashboard.css',
+    ]},
+    'site-chatbot': {'css': [
+        'css/sitecss/global-header.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/history.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/createblog.css',
+        'css/sitecss/chatbot.css',
+    ]},
+    'site-dashboard': {'css': [
+        'css/sitecss/global-footer.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/createblog.css',
+    ]},
+    'site-diary': {'css': [
+        'css/sitecss/diary.css',
+        'css/sitecss/createblog.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/global-header.css',
+    ]},
+    'site-history': {'css': [
+        'css/sitecss/history.css',
+        'css/sitecss/createblog.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/dashboard.css',
+    ]},
+    'site-newproject': {'css': [
+        'css/sitecss/global-footer.css',
+        'css/sitecss/reports.css',
+        'css/sitecss/createblog.css',
+        'css/sitecss/newproject.css',
+    ]},
+    'site-reports': {'css': [
+        'css/sitecss/reports.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/global-header.css',
+    ]},
+    'site-settings': {'css': [
+        'css/sitecss/global-footer.css',
+        'css/sitecss/settings.css',
+    ]},
+    'site-project-detail': {'css': [
+        'css/sitecss/global-footer.css',
+        'css/sitecss/dashboard.css',
+        'css/sitecss/createblog.css',
+        'css/sitecss/newproject.css',
+    ]},
+    'site-sitedraft': {'css': [
+        'css/sitecss/drafts.css',
+        'css/sitecss/createblog.css',
+        'css/sitecss/global-footer.css',
+        'css/sitecss/global-header.css',
+    ]},
+}
+
+# Unhashed files get a short max-age; hashed names are served as immutable
+WHITENOISE_MAX_AGE = int(os.getenv('WHITENOISE_MAX_AGE', '3600'))
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media delivery (core.media.serve_media):
+#   'django'           - stream from Python with Range/sendfile support
+#   'x-accel-redirect' - hand off to nginx via an internal location
+#   'x-sendfile'       - hand off to Apache/lighttpd mod_xsendfile
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'django').lower()
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# Lifetime window (seconds) for signed diary photo URLs
+MEDIA_SIGNED_URL_TTL = int(os.getenv('MEDIA_SIGNED_URL_TTL', '3600'))
+
+# Diary CSV/JSON Lines import (site_diary.importer): rows per transaction and
+# rejected rows returned by the upload endpoint
+DIARY_IMPORT_BATCH_SIZE = int(os.getenv('DIARY_IMPORT_BATCH_SIZE', '1000'))
+DIARY_IMPORT_MAX_ERRORS = int(os.getenv('DIARY_IMPORT_MAX_ERRORS', '100'))
+
+# Site diary dashboard (site_diary.dashboard): how long a user's overview
+# stays cached; project, diary entry and delay writes drop it sooner
+DIARY_DASHBOARD_CACHE_SECONDS = int(os.getenv('DIARY_DASHBOARD_CACHE_SECONDS', '300'))
+
+# Delta-sync API (site_diary.sync): records per page, and how long change
+# log rows (and so client cursors) stay valid
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '500'))
+SYNC_CHANGE_RETENTION_DAYS = int(os.getenv('SYNC_CHANGE_RETENTION_DAYS', '30'))
+
+# Draft autosave (site_diary.autosave): saves between checkpoints, and size
+# caps for one autosave request and for a whole draft
+DRAFT_CHECKPOINT_EVERY = int(os.getenv('DRAFT_CHECKPOINT_EVERY', '20'))
+DRAFT_PATCH_MAX_BYTES = int(os.getenv('DRAFT_PATCH_MAX_BYTES', '32768'))
+DRAFT_STATE_MAX_BYTES = int(os.getenv('DRAFT_STATE_MAX_BYTES', '524288'))
+
+# Chatbot retrieval (chatbot.search): passages per answer, and how many
+# logged diary changes one catch-up of the index applies at most
+CHATBOT_TOP_K = int(os.getenv('CHATBOT_TOP_K', '5'))
+CHATBOT_INDEX_CATCH_UP_BATCH = int(os.getenv('CHATBOT_INDEX_CATCH_UP_BATCH', '2000'))
+# Messages kept per conversation; older turns are pruned after each exchange
+CHATBOT_HISTORY_LIMIT = int(os.getenv('CHATBOT_HISTORY_LIMIT', '50'))
+# Message bodies from this size up are stored zlib-compressed
+CHATBOT_COMPRESS_MIN_BYTES = int(os.getenv('CHATBOT_COMPRESS_MIN_BYTES', '512'))
+# compact_chat_history: threads idle this long are folded into a summary,
+# and deleted outright after CHATBOT_RETENTION_DAYS
+CHATBOT_COMPACT_AFTER_DAYS = int(os.getenv('CHATBOT_COMPACT_AFTER_DAYS', '90'))
+CHATBOT_RETENTION_DAYS = int(os.getenv('CHATBOT_RETENTION_DAYS', '365'))
+CHATBOT_MESSAGE_PAGE_SIZE = int(os.getenv('CHATBOT_MESSAGE_PAGE_SIZE', '50'))
+
+# Blog (blog.cache): how long listings, pages and feeds stay cached; any post
+# or tag change retires them sooner by bumping the content version
+BLOG_CACHE_SECONDS = int(os.getenv('BLOG_CACHE_SECONDS', '600'))
+BLOG_PAGE_SIZE = int(os.getenv('BLOG_PAGE_SIZE', '9'))
+BLOG_FEED_ITEMS = int(os.getenv('BLOG_FEED_ITEMS', '20'))
+
+# Admin dashboard (admin_side.metrics): how long the counters stay cached,
+# and how often the dashboard refreshes them; approval changes drop them sooner
+ADMIN_METRICS_CACHE_SECONDS = int(os.getenv('ADMIN_METRICS_CACHE_SECONDS', '30'))
+
 # Login/logout URLs
 LOGIN_URL = '/accounts/sitemanager/login/'
 LOGIN_REDIRECT_URL = '/admin-panel/'
 
+# Session storage (SESSION_BACKEND):
+#   'db'             - every request reads django_session
+#   'cached_db'      - read through the cache, written through to the DB, so
+#                      most requests never touch django_session. Needs a
+#                      shared CACHE_BACKEND (Redis/Memcached): with the local
+#                      cache a logout only reaches one worker, so startup
+#                      refuses it (core.sessions.check_session_cache)
+#   'signed_cookies' - no server-side storage at all; the data is signed but
+#                      readable by the client and cannot be revoked early
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'db').lower()
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'db': 'django.contrib.sessions.backends.db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = os.getenv('SESSION_CACHE_ALIAS', 'default')
+# sweep_sessions: expired rows deleted per transaction, and the pause between
+# batches that lets other writers in
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv('SESSION_SWEEP_BATCH_SIZE', '1000'))
+SESSION_SWEEP_PAUSE_SECONDS = float(os.getenv('SESSION_SWEEP_PAUSE_SECONDS', '0.1'))
+
 # Security settings
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
+# Logging: JSON lines on stdout, written by a background thread (core.log)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+# Share of DEBUG records kept; INFO and above are never sampled
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0' if DEBUG else '0.01'))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sample_debug': {
+            '()': 'core.log.DebugSamplingFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
+        },
+    },
+    'handlers': {
+        'queue': {
+            'class': 'core.log.AsyncQueueHandler',
+            'filters': ['sample_debug'],
+            'queue_size': int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        # Django's own DEBUG output (SQL, autoreload) is too chatty for the root level
+        'django': {'level': 'INFO'},
+        'security': {'level': 'INFO'},
+        'performance': {'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO').upper()},
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-AXES_FAILURE_LIMIT = 5  # lock out after 5 attempts
-AXES_COOLOFF_TIME = 1  # lockout period in hours
+# Login lockout (accounts.lockout): axes refuses locked-out clients in the
+# auth backend; failures are counted in the cache per username + IP over a
+# sliding LOGIN_FAILURE_WINDOW_SECONDS, and only a lockout touches the DB.
+# ProfileBackend is ModelBackend, but loads the session user with their
+# profiles in one query (accounts.backends)
+AUTHENTICATION_BACKENDS = [
+    'accounts.lockout.LockoutBackend',
+    'accounts.backends.ProfileBackend',
+]
+AXES_HANDLER = 'accounts.lockout.SlidingWindowLockoutHandler'
+AXES_LOCKOUT_PARAMETERS = [['username', 'ip_address']]
+AXES_FAILURE_LIMIT = int(os.getenv('AXES_FAILURE_LIMIT', '5'))  # lock out after 5 attempts
+AXES_COOLOFF_TIME = float(os.getenv('AXES_COOLOFF_HOURS', '1'))  # lockout period in hours
+LOGIN_FAILURE_WINDOW_SECONDS = int(os.getenv('LOGIN_FAILURE_WINDOW_SECONDS', '900'))
 AXES_LOCKOUT_TEMPLATE = 'client/lockout.html'  # create a lockout page
-
-# Optional: lockout by username and IP
-AXES_ONLY_USER_FAILURES = False
 AXES_LOCK_OUT_AT_FAILURE = True
 AXES_RESET_ON_SUCCESS = True
\ No newline at end of file
@@ -15,9 +15,9 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from core import media as core_media
 from site_diary import views as site_diary_views
 
 urlpatterns = [
@@ -37,7 +37,6 @@ urlpatterns = [
     path('adminside/diaryreviewer/', site_diary_views.admindiaryreviewer, name='direct_admindiaryreviewer'),
     path('adminside/history/', site_diary_views.adminhistory, name='direct_adminhistory'),
     path('adminside/reports/', site_diary_views.adminreports, name='direct_adminreports'),
-]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Uploaded media (Range requests, conditional GET, X-Accel-Redirect/X-Sendfile offload)
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), core_media.serve_media, name='serve_media'),
+]
\ No newline at end of file
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from axes.signals import user_locked_out
+
+        from .instrumentation import install_query_hook
+        from .metrics import record_axes_lockout
+        from .sessions import check_session_cache
+
+        check_session_cache()
+
+        user_locked_out.connect(record_axes_lockout, dispatch_uid='core.metrics.axes_lockout')
+        install_query_hook()
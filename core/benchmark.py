@@ -0,0 +1,250 @@
+"""
+Benchmark suite for Triple G BuildHub's hot paths.
+
+Each benchmark runs one operation (a page request, a report helper, a login)
+against whatever is in the database, normally the dataset from
+`manage.py generate_synthetic_data`. The runner records latency percentiles
+and query counts per benchmark. Results are plain dicts so
+`manage.py run_benchmarks` can dump them as JSON and compare them with a
+baseline from an earlier run.
+"""
+import logging
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from .instrumentation import RequestMetrics
+from .synthetic import PASSWORD, USER_PREFIX
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = {}
+
+
+class BenchmarkError(Exception):
+    """A benchmark could not run, e.g. no data or an error response"""
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def benchmark(name):
+    """Register a function taking a BenchmarkContext under `name`"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class BenchmarkContext:
+    """Users, clients and the project the benchmarks run against"""
+
+    def __init__(self):
+        from site_diary.models import Project
+
+        self.manager = User.objects.filter(username__startswith=USER_PREFIX, is_staff=True).order_by('id').first()
+        self.login_user = User.objects.filter(username=f'{USER_PREFIX}client').first()
+        if self.manager is None or self.login_user is None:
+            raise BenchmarkError('No synthetic users found; run `manage.py generate_synthetic_data` first')
+
+        # The project with the longest history is the worst case for reports
+        self.project = Project.objects.filter(project_manager__username__startswith=USER_PREFIX).annotate(
+            entry_count=Count('diary_entries')
+        ).order_by('-entry_count', 'id').first()
+        if self.project is None:
+            raise BenchmarkError('No synthetic projects found; run `manage.py generate_synthetic_data` first')
+
+        self.client = self.make_client()
+        self.client.force_login(self.manager)
+        self.anonymous = self.make_client()
+
+    @staticmethod
+    def make_client():
+        return Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+    @staticmethod
+    def check(response, expected=(200,)):
+        if response.status_code not in expected:
+            raise BenchmarkError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+        return response
+
+
+@benchmark('dashboard')
+def bench_dashboard(ctx):
+    ctx.check(ctx.client.get(reverse('site:dashboard')))
+
+
+@benchmark('history')
+def bench_history(ctx):
+    ctx.check(ctx.client.get(reverse('site:history')))
+
+
+@benchmark('reports')
+def bench_reports(ctx):
+    ctx.check(ctx.client.get(reverse('site:reports')))
+
+
+@benchmark('get_project_statistics')
+def bench_project_statistics(ctx):
+    from site_diary.utils import get_project_statistics
+
+    get_project_statistics(ctx.project)
+
+
+@benchmark('generate_diary_report')
+def bench_diary_report(ctx):
+    from site_diary.utils import generate_diary_report
+
+    report = generate_diary_report(ctx.project)
+    # The report template iterates every entry
+    list(report['entries'])
+
+
+@benchmark('project_list_api')
+def bench_project_list_api(ctx):
+    ctx.check(ctx.anonymous.get(reverse('portfolio:project_list_api')))
+
+
+@benchmark('chatbot_answer')
+def bench_chatbot_answer(ctx):
+    from chatbot.engine import answer_question
+    from chatbot.models import SearchDocument
+
+    if not SearchDocument.objects.exists():
+        raise BenchmarkError('The chatbot index is empty; run `manage.py update_chat_index --rebuild` first')
+    answer_question(ctx.manager, f'What delayed {ctx.project.name} last month?')
+
+
+@benchmark('login')
+def bench_login(ctx):
+    response = ctx.make_client().post(
+        reverse('accounts:client_login'), {'username': ctx.login_user.username, 'password': PASSWORD}
+    )
+    # A failed login re-renders the form with 200
+    ctx.check(response, expected=(302,))
+
+
+def run_benchmark(func, ctx, iterations=20, warmup=2):
+    """
+    Time one benchmark.
+
+    Returns:
+        dict: Latency percentiles in milliseconds and queries per iteration
+    """
+    for _ in range(warmup):
+        func(ctx)
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        counter = RequestMetrics()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            func(ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.queries)
+
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p90_ms': round(percentile(timings, 90), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': int(statistics.median(queries)),
+        'queries_max': max(queries),
+    }
+
+
+def get_environment():
+    """What the numbers were measured on, for the JSON report"""
+    from site_diary.models import DiaryEntry, LaborEntry, MaterialEntry, Project
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'dataset': {
+            'projects': Project.objects.count(),
+            'diary_entries': DiaryEntry.objects.count(),
+            'labor_entries': LaborEntry.objects.count(),
+            'material_entries': MaterialEntry.objects.count(),
+        },
+    }
+
+
+def run_benchmarks(names=None, iterations=20, warmup=2):
+    """
+    Run the named benchmarks (all by default).
+
+    Returns:
+        dict: {'environment': ..., 'results': {name: stats}}
+    """
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise BenchmarkError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    ctx = BenchmarkContext()
+    results = {}
+    for name in names:
+        try:
+            results[name] = run_benchmark(BENCHMARKS[name], ctx, iterations, warmup)
+        except Exception as e:
+            # One broken page should not hide the numbers for the rest
+            logger.exception('Benchmark failed', extra={'benchmark': name})
+            results[name] = {'error': f'{type(e).__name__}: {e}'}
+    return {'environment': get_environment(), 'results': results}
+
+
+def compare_results(baseline, current, max_regression=0.2, metric='p95_ms'):
+    """
+    Compare two run_benchmarks() reports.
+
+    A benchmark regresses when `metric` grew by more than `max_regression`
+    (a fraction) or it issues more queries than before.
+
+    Returns:
+        list: One human-readable line per regression
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        if 'error' in result:
+            regressions.append(f"{name}: failed ({result['error']})")
+            continue
+        before = baseline.get('results', {}).get(name)
+        if before is None or 'error' in before:
+            continue
+        if before[metric] and result[metric] > before[metric] * (1 + max_regression):
+            regressions.append(
+                f'{name}: {metric} {before[metric]:.1f} -> {result[metric]:.1f} '
+                f'(+{(result[metric] / before[metric] - 1):.0%})'
+            )
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+    return regressions
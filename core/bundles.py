@@ -0,0 +1,127 @@
+"""
+Static asset bundling for Triple G BuildHub.
+Concatenates and minifies the shared CSS/JS of each base layout into a single
+file per layout, and each page's own stylesheets into one file per page. Bundles are built during collectstatic by
+core.storage.BundledStaticFilesStorage and then hashed and precompressed
+(gzip/Brotli) by WhiteNoise like any other static file.
+"""
+import posixpath
+import re
+
+from django.conf import settings
+
+BUNDLE_DIR = 'bundles'
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_IMPORT_RE = re.compile(r'@import\s+[^;]+;')
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)')
+CSS_SPACE_AROUND_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def get_bundle_path(name, kind):
+    """Static path of a bundle, e.g. bundles/public.css"""
+    return f'{BUNDLE_DIR}/{name}.{kind}'
+
+
+def get_bundle_sources(name, kind):
+    """Source files of a bundle as configured in settings.STATIC_BUNDLES"""
+    return settings.STATIC_BUNDLES.get(name, {}).get(kind, [])
+
+
+def rebase_css_urls(css, source_path, bundle_path):
+    """
+    Rewrite relative url() references so they still resolve once the rules
+    move from source_path to bundle_path.
+    """
+    source_dir = posixpath.dirname(source_path)
+    bundle_dir = posixpath.dirname(bundle_path)
+
+    def replace(match):
+        quote, url = match.groups()
+        if not url or url.startswith(('/', '#', 'data:', 'http:', 'https:', '//')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(source_dir, url))
+        return f'url({quote}{posixpath.relpath(target, bundle_dir)}{quote})'
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def minify_css(css):
+    """
+    Conservative CSS minifier: drops comments and collapses whitespace.
+
+    Colons are left alone so descendant selectors such as `a :hover` keep
+    their meaning.
+    """
+    css = CSS_COMMENT_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = CSS_SPACE_AROUND_RE.sub(r'\1', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(js):
+    """
+    Whitespace-only JavaScript minifier.
+
+    Strips indentation, blank lines and whole-line `//` comments. Lines inside
+    multi-line template literals are passed through untouched.
+    """
+    lines = []
+    in_template = False
+    for line in js.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        # An odd number of unescaped backticks toggles template-literal state
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines)
+
+
+def build_css_bundle(sources, bundle_path, read):
+    """
+    Concatenate and minify stylesheets.
+
+    @import rules are hoisted to the top since CSS only honours them before
+    any other rule.
+    """
+    imports = []
+    bodies = []
+    for source in sources:
+        css = rebase_css_urls(read(source), source, bundle_path)
+        css = CSS_COMMENT_RE.sub('', css)
+        for rule in CSS_IMPORT_RE.findall(css):
+            if rule not in imports:
+                imports.append(rule)
+        bodies.append(CSS_IMPORT_RE.sub('', css))
+    return '\n'.join(imports + [minify_css(body) for body in bodies]) + '\n'
+
+
+def build_js_bundle(sources, read):
+    """Concatenate and minify scripts, keeping each file's statements separate"""
+    return ';\n'.join(minify_js(read(source)) for source in sources) + '\n'
+
+
+def build_bundles(read):
+    """
+    Build every configured bundle.
+
+    Args:
+        read: Callable taking a static path and returning its text content
+
+    Returns:
+        dict: Bundle path -> bundle content
+    """
+    bundles = {}
+    for name, kinds in settings.STATIC_BUNDLES.items():
+        if kinds.get('css'):
+            path = get_bundle_path(name, 'css')
+            bundles[path] = build_css_bundle(kinds['css'], path, read)
+        if kinds.get('js'):
+            path = get_bundle_path(name, 'js')
+            bundles[path] = build_js_bundle(kinds['js'], read)
+    return bundles
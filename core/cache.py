@@ -0,0 +1,87 @@
+"""
+Cache backends for Triple G BuildHub.
+Thin subclasses of Django's backends that count hits and misses into
+core.metrics, so /metrics can report the cache hit ratio.
+
+The default backend is local memory: each worker process has its own copy,
+and deleting a key in one worker leaves it in every other. Features that
+rely on invalidation or on counting across requests check is_shared_cache().
+Caches of rendered content set their timeouts through cache_timeout(), which
+bounds how long another worker's copy can outlive an invalidation.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+from .metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    """
+    Count get()/get_many() hits and misses.
+
+    Django does not tell a backend its alias, so samples are labelled with the
+    optional METRICS_NAME key of the CACHES entry (default: 'default').
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_alias = params.get('METRICS_NAME', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            CACHE_REQUESTS.inc(cache=self.metrics_alias, result='miss')
+            return default
+        CACHE_REQUESTS.inc(cache=self.metrics_alias, result='hit')
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        if found:
+            CACHE_REQUESTS.inc(len(found), cache=self.metrics_alias, result='hit')
+        if len(keys) > len(found):
+            CACHE_REQUESTS.inc(len(keys) - len(found), cache=self.metrics_alias, result='miss')
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class InstrumentedDatabaseCache(InstrumentedCacheMixin, DatabaseCache):
+    pass
+
+
+class InstrumentedFileBasedCache(InstrumentedCacheMixin, FileBasedCache):
+    pass
+
+
+# Backends whose entries every worker process (and host) sees
+SHARED_CACHE_BACKENDS = (RedisCache, BaseMemcachedCache, DatabaseCache)
+
+
+def is_shared_cache(alias='default'):
+    """Whether a key set or deleted in one process is seen by all of them"""
+    return isinstance(caches[alias], SHARED_CACHE_BACKENDS)
+
+
+def cache_timeout(seconds, alias='default'):
+    """
+    `seconds`, or LOCAL_CACHE_MAX_SECONDS if shorter and the cache is local:
+    there an invalidation never reaches the other workers' copies.
+    """
+    if is_shared_cache(alias):
+        return seconds
+    return min(seconds, settings.LOCAL_CACHE_MAX_SECONDS)
@@ -0,0 +1,265 @@
+"""
+Request instrumentation for Triple G BuildHub.
+Records per-request query count, DB time, slowest SQL, template render time
+and Python time, tags each request with its view name and user role, and
+keeps the most recent samples in an in-process ring buffer.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+
+from .metrics import observe_request
+
+logger = logging.getLogger('performance')
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+_buffer = deque(maxlen=getattr(settings, 'REQUEST_METRICS_BUFFER_SIZE', 500))
+_buffer_lock = threading.Lock()
+
+_template_timer_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view issues more queries than its declared budget."""
+
+
+class RequestMetrics:
+    """Counters for one request (or one query_budget-decorated view call)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_sql = ''
+        self.slowest_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if elapsed > self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_sql = sql
+
+
+def install_template_timer():
+    """
+    Time top-level template renders for the active request.
+
+    Wraps the Django template backend's Template.render, which render() and
+    render_to_string() go through once per page; includes and inclusion tags
+    render inside that call and are not counted twice.
+    """
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+
+    from django.template.backends.django import Template
+
+    original_render = Template.render
+
+    @wraps(original_render)
+    def timed_render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return original_render(self, context, request)
+
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_seconds += time.perf_counter() - started
+
+    Template.render = timed_render
+    _template_timer_installed = True
+
+
+def count_request_query(execute, sql, params, many, context):
+    """Execute wrapper on every connection, feeding the active request's RequestMetrics"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def add_query_hook(sender=None, connection=None, **kwargs):
+    if count_request_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_request_query)
+
+
+def install_query_hook():
+    """
+    Count the active request's queries on every connection.
+
+    Connections are per thread, and under ASGI the async ORM runs queries on
+    a different thread from the middleware, so wrapping the request in
+    connection.execute_wrapper() would miss them. The request's
+    RequestMetrics travels in a contextvar instead, which sync_to_async
+    carries over to those threads.
+
+    Called from CoreConfig.ready(), before any connection is opened.
+    """
+    connection_created.connect(add_query_hook, dispatch_uid='core.instrumentation.add_query_hook')
+    for existing in connections.all(initialized_only=True):
+        add_query_hook(connection=existing)
+
+
+def record_request_metrics(record):
+    """Append a request record to the ring buffer"""
+    with _buffer_lock:
+        _buffer.append(record)
+
+
+def get_recent_request_metrics(limit=None):
+    """Most recent request records, newest first"""
+    with _buffer_lock:
+        records = list(_buffer)
+    records.reverse()
+    return records[:limit] if limit else records
+
+
+def clear_request_metrics():
+    with _buffer_lock:
+        _buffer.clear()
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Measure every request and report it to the 'performance' logger and the
+    ring buffer read by core.views.request_metrics.
+
+    The user role is taken from request.user_role, set by
+    accounts.middleware.RoleBasedAccessMiddleware, so it is not recomputed.
+
+    Runs natively under both WSGI and ASGI; see install_query_hook for how
+    queries are attributed to the request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        self.report(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        self.report(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    def report(self, request, response, metrics, total_seconds):
+        record = {
+            'timestamp': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': get_view_name(request),
+            'role': getattr(request, 'user_role', None),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_seconds * 1000, 2),
+            'template_ms': round(metrics.template_seconds * 1000, 2),
+            # Everything except waiting on the database, templates included
+            'python_ms': round(max(total_seconds - metrics.db_seconds, 0) * 1000, 2),
+            'total_ms': round(total_seconds * 1000, 2),
+            'slowest_sql_ms': round(metrics.slowest_seconds * 1000, 2),
+            'slowest_sql': metrics.slowest_sql[:settings.REQUEST_METRICS_SQL_MAX_LENGTH],
+        }
+        record_request_metrics(record)
+        observe_request(record)
+        logger.info(
+            f"{record['method']} {record['path']} view={record['view']} role={record['role']} "
+            f"status={record['status']} queries={record['queries']} db_ms={record['db_ms']} "
+            f"template_ms={record['template_ms']} total_ms={record['total_ms']}",
+            extra={'request_metrics': record},
+        )
+
+
+def query_budget(max_queries):
+    """
+    Declare the maximum number of queries a view may issue.
+
+    Over-budget calls are logged as warnings; when QUERY_BUDGET_ENFORCE is on
+    (always under `manage.py test`, see core.test_runner) they raise
+    QueryBudgetExceeded so the test that hit the view fails.
+
+    Usage:
+        @login_required
+        @query_budget(12)
+        def history(request):
+            ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            metrics = RequestMetrics()
+            with connection.execute_wrapper(metrics):
+                response = view_func(request, *args, **kwargs)
+                # Lazy TemplateResponses query while rendering
+                if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                    response.render()
+
+            if metrics.queries > max_queries:
+                message = (
+                    f"{view_func.__module__}.{view_func.__qualname__} issued {metrics.queries} "
+                    f"queries, budget is {max_queries}"
+                )
+                if settings.QUERY_BUDGET_ENFORCE:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
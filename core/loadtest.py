@@ -0,0 +1,114 @@
+"""
+Concurrent-connection load test for a running server.
+
+`manage.py run_benchmarks` times single operations in-process; this drives a
+real server over HTTP with many keep-alive connections at once, which is
+where WSGI (one request per worker thread) and ASGI (many requests per
+event loop) differ. Start both servers on the same database and compare:
+
+    gunicorn config.wsgi:application -w 4 -b :8000
+    gunicorn config.asgi:application -w 4 -k uvicorn_worker.UvicornWorker -b :8001
+    manage.py load_test --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+"""
+import http.client
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .benchmark import percentile
+
+
+def connect(url, timeout):
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    return connection_class(url.hostname, url.port, timeout=timeout)
+
+
+def client_loop(url, paths, headers, start_at, stop_at, timeout, offset):
+    """
+    One client: send requests back to back over a keep-alive connection
+    until stop_at. Requests started before start_at are warm-up and are not
+    counted.
+
+    Returns:
+        tuple: (latencies in ms, Counter of status codes, connection errors)
+    """
+    latencies = []
+    statuses = Counter()
+    errors = 0
+    prefix = url.path.rstrip('/')
+    connection = connect(url, timeout)
+    index = offset
+    try:
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                break
+            path = paths[index % len(paths)]
+            index += 1
+            try:
+                connection.request('GET', prefix + path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                if started >= start_at:
+                    errors += 1
+                connection.close()
+                connection = connect(url, timeout)
+                continue
+            if started >= start_at:
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status] += 1
+            if response.will_close:
+                connection.close()
+                connection = connect(url, timeout)
+    finally:
+        connection.close()
+    return latencies, statuses, errors
+
+
+def run_load_test(base_url, paths, concurrency=50, duration=10.0, warmup=2.0, headers=None, timeout=30.0):
+    """
+    Hit `paths` on `base_url` from `concurrency` clients for `duration`
+    seconds after `warmup` seconds of untimed requests.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and status counts
+    """
+    url = urlsplit(base_url)
+    if url.scheme not in ('http', 'https') or not url.hostname:
+        raise ValueError(f'Expected an http(s):// URL, got {base_url!r}')
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(client_loop, url, paths, headers or {}, start_at, stop_at, timeout, offset)
+            for offset in range(concurrency)
+        ]
+        outcomes = [future.result() for future in futures]
+
+    latencies = [latency for outcome in outcomes for latency in outcome[0]]
+    statuses = sum((outcome[1] for outcome in outcomes), Counter())
+    errors = sum(outcome[2] for outcome in outcomes)
+    server_errors = sum(count for status, count in statuses.items() if status >= 500)
+    result = {
+        'url': base_url,
+        'paths': paths,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'requests': len(latencies),
+        'requests_per_s': round(len(latencies) / duration, 1),
+        'errors': errors + server_errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+    if latencies:
+        result.update({
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p90_ms': round(percentile(latencies, 90), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(max(latencies), 3),
+        })
+    return result
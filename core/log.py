@@ -0,0 +1,125 @@
+"""
+Logging pipeline for Triple G BuildHub.
+Request threads only put records on an in-memory queue; a background
+QueueListener thread formats them as JSON lines and writes them out, so a
+slow stdout/log collector never blocks a request.
+
+Wired up through settings.LOGGING.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Render a record as one JSON object per line, including `extra` fields"""
+
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exception'] = record.exc_text
+        if record.stack_info:
+            payload['stack'] = record.stack_info
+        return json.dumps(payload, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep every record at INFO and above but only a fraction of DEBUG ones.
+
+    Args:
+        rate (float): Share of DEBUG records to keep, 0.0 - 1.0
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler that owns its QueueListener and a JSON stdout handler.
+
+    The queue is bounded; when it is full new records are dropped (and
+    counted in `dropped`) rather than blocking the caller. After a fork (e.g.
+    gunicorn with --preload) the listener thread is restarted in the child.
+    """
+
+    def __init__(self, queue_size=10000, stream=None):
+        self.queue_size = queue_size
+        self.stream = stream or sys.stdout
+        self.dropped = 0
+        self.listener = None
+        self.pid = None
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.start()
+        atexit.register(self.stop)
+
+    def start(self):
+        target = logging.StreamHandler(self.stream)
+        target.setFormatter(JSONFormatter())
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.listener = QueueListener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        self.pid = os.getpid()
+
+    def stop(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+
+    def prepare(self, record):
+        """
+        Resolve the message and exception text in the calling thread (the
+        arguments may change after this returns) but leave JSON rendering to
+        the listener thread.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        super().emit(record)
@@ -0,0 +1,106 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signals
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from core.benchmark import percentile
+
+MODES = ('per-request', 'persistent', 'pool', 'pgbouncer')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare p50/p99 request latency across DB_CONNECTION_MODE values. '
+        'Point DB_HOST/DB_PORT/DB_SSLMODE at a local Postgres (and PgBouncer '
+        'for the pgbouncer mode) before running.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help=f'Comma-separated modes to compare (default: {",".join(MODES)})',
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode (default: 200)')
+        parser.add_argument(
+            '--url',
+            help='Request this URL through the full middleware stack instead of '
+                 'a minimal simulated request',
+        )
+        parser.add_argument(
+            '--pgbouncer-port', default='6432',
+            help='DB_PORT used for the pgbouncer mode (default: 6432)',
+        )
+        parser.add_argument('--worker', action='store_true', help='Internal: run one mode in this process')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.run_worker(options)
+            return
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+
+        self.stdout.write(f"{'mode':14} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10}")
+        for mode in modes:
+            result = self.run_mode(mode, options)
+            self.stdout.write(
+                f"{mode:14} {result['p50']:>10.2f} {result['p99']:>10.2f} {result['mean']:>10.2f}"
+            )
+
+    def run_mode(self, mode, options):
+        """Run one mode in a fresh process, since the settings differ per mode"""
+        env = dict(os.environ, DB_CONNECTION_MODE=mode)
+        if mode == 'pgbouncer':
+            env['DB_PORT'] = options['pgbouncer_port']
+
+        command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_db', '--worker',
+                   '--requests', str(options['requests'])]
+        if options['url']:
+            command += ['--url', options['url']]
+
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f"{mode} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, options):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0]) if options['url'] else None
+        samples = []
+
+        for _ in range(max(options['requests'], 1)):
+            started = time.perf_counter()
+            if client:
+                client.get(options['url'])
+            else:
+                self.simulate_request()
+            samples.append((time.perf_counter() - started) * 1000)
+
+        connection.close()
+        self.stdout.write(json.dumps({
+            'mode': settings.DB_CONNECTION_MODE,
+            'p50': percentile(samples, 50),
+            'p99': percentile(samples, 99),
+            'mean': statistics.mean(samples),
+        }))
+
+    def simulate_request(self):
+        """
+        One request's worth of database work, wrapped in the same signals the
+        handler sends so CONN_MAX_AGE, health checks and pool returns apply.
+        """
+        signals.request_started.send(sender=self.__class__)
+        try:
+            User.objects.filter(is_active=True).exists()
+        finally:
+            signals.request_finished.send(sender=self.__class__)
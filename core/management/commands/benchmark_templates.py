@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.warmup import reset_template_cache, warmup_templates
+
+
+class Command(BaseCommand):
+    help = 'Measure first-request latency with a cold template cache versus after warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', action='append', dest='urls',
+            help='URL to request (repeatable). Defaults to the public pages.',
+        )
+        parser.add_argument(
+            '--rounds', type=int, default=5,
+            help='Number of simulated worker boots to average over (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or ['/', '/about/', '/contact/', settings.LOGIN_URL]
+        rounds = max(options['rounds'], 1)
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+        cold = {url: [] for url in urls}
+        warm = {url: [] for url in urls}
+        warmup_ms = []
+
+        for _ in range(rounds):
+            # A new worker after a deploy: nothing compiled yet
+            reset_template_cache()
+            for url in urls:
+                cold[url].append(self.time_request(client, url))
+
+            # Same worker boot, but with the warm-up hook run first
+            reset_template_cache()
+            warmup_ms.append(warmup_templates()['seconds'] * 1000)
+            for url in urls:
+                warm[url].append(self.time_request(client, url))
+
+        self.stdout.write(f"Template warm-up: {statistics.median(warmup_ms):.1f} ms (median of {rounds})")
+        self.stdout.write(f"{'URL':40} {'cold ms':>10} {'warm ms':>10}")
+        for url in urls:
+            self.stdout.write(
+                f"{url:40} {statistics.median(cold[url]):>10.1f} {statistics.median(warm[url]):>10.1f}"
+            )
+
+    def time_request(self, client, url):
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            self.stdout.write(self.style.WARNING(f"{url} returned {response.status_code}"))
+        return elapsed
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.synthetic import SyntheticDataGenerator, delete_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large, reproducible synthetic construction dataset for '
+        '`manage.py run_benchmarks`. Replaces any synthetic data already present.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=20, help='Site diary projects (default: 20)')
+        parser.add_argument(
+            '--entries-per-project', type=int, default=100,
+            help='Daily diary entries per project (default: 100)',
+        )
+        parser.add_argument(
+            '--line-items', type=int, default=4,
+            help='Average labor and material items per diary entry (default: 4)',
+        )
+        parser.add_argument(
+            '--portfolio-projects', type=int, default=100, help='Portfolio projects (default: 100)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT (default: 2000)')
+        parser.add_argument('--delete', action='store_true', help='Only delete existing synthetic data')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        delete_dataset()
+        if options['delete']:
+            self.stdout.write(self.style.SUCCESS('Deleted synthetic data'))
+            return
+
+        generator = SyntheticDataGenerator(
+            projects=options['projects'],
+            entries_per_project=options['entries_per_project'],
+            line_items=options['line_items'],
+            portfolio_projects=options['portfolio_projects'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            stdout=self.stdout,
+        )
+        counts = generator.generate()
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'{label:28} {count:>12,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s'
+        ))
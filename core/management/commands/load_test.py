@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure throughput and latency of running servers under many concurrent '
+        'keep-alive connections, e.g. the WSGI and ASGI deployments side by side'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True, metavar='NAME=URL',
+            help='Server to test, e.g. wsgi=http://127.0.0.1:8000 (repeatable; the first is the reference)',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request, cycled through by each client (repeatable; default: /portfolio/api/projects/)',
+        )
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent connections (default: 50)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Timed seconds per target (default: 10)')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Untimed seconds first (default: 2)')
+        parser.add_argument(
+            '--header', action='append', default=[], metavar='NAME: VALUE',
+            help='Extra request header, e.g. "Host: buildhub.example" (repeatable)',
+        )
+        parser.add_argument('--output', help='Also write the JSON report here')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not name or not url:
+                raise CommandError(f'--target must look like NAME=URL, got {target!r}')
+            targets.append((name, url))
+        headers = {}
+        for header in options['header']:
+            name, sep, value = header.partition(':')
+            if not sep:
+                raise CommandError(f'--header must look like "NAME: VALUE", got {header!r}')
+            headers[name.strip()] = value.strip()
+        paths = options['paths'] or ['/portfolio/api/projects/']
+
+        results = {}
+        for name, url in targets:
+            self.stderr.write(f'{name}: {options["concurrency"]} connections for {options["duration"]:g}s ...')
+            try:
+                results[name] = run_load_test(
+                    url, paths, concurrency=max(options['concurrency'], 1), duration=options['duration'],
+                    warmup=options['warmup'], headers=headers,
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        reference = results[targets[0][0]]['requests_per_s']
+        self.stdout.write(
+            f"{'target':12} {'req/s':>10} {'vs ref':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errors':>7}"
+        )
+        for name, result in results.items():
+            if not result['requests']:
+                self.stdout.write(self.style.ERROR(f"{name:12} no successful requests ({result['errors']} errors)"))
+                continue
+            ratio = f"{result['requests_per_s'] / reference:.2f}x" if reference else '-'
+            self.stdout.write(
+                f"{name:12} {result['requests_per_s']:>10.1f} {ratio:>8} {result['p50_ms']:>10.1f} "
+                f"{result['p95_ms']:>10.1f} {result['p99_ms']:>10.1f} {result['errors']:>7}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'targets': results}, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
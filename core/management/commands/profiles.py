@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import pstats
+import shutil
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import (
+    CPROFILE_FILE, SQL_FILE, STACKS_FILE, get_profile_dir, list_profiles,
+)
+
+
+class Command(BaseCommand):
+    help = 'List captured request profiles, or summarize one of them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'capture', nargs='?',
+            help='Capture id (or unique prefix/suffix) to summarize. Omit to list captures.',
+        )
+        parser.add_argument('--view', help='Only list captures of this view')
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Rows to show: captures when listing, functions/queries when summarizing (default: 20)',
+        )
+        parser.add_argument(
+            '--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'],
+            help='cProfile sort order when summarizing (default: cumulative)',
+        )
+        parser.add_argument('--clear', action='store_true', help='Delete all captures')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            shutil.rmtree(get_profile_dir(), ignore_errors=True)
+            self.stdout.write(self.style.SUCCESS('Deleted all captured profiles'))
+            return
+
+        profiles = list_profiles()
+        if options['capture']:
+            matches = [
+                (capture_id, meta) for capture_id, meta in profiles
+                if capture_id == options['capture'] or capture_id.startswith(options['capture'])
+                or capture_id.endswith(options['capture'])
+            ]
+            if len(matches) != 1:
+                raise CommandError(
+                    f"{len(matches)} captures match {options['capture']!r}; pass a longer id"
+                )
+            self.summarize(*matches[0], limit=options['limit'], sort=options['sort'])
+            return
+
+        if options['view']:
+            profiles = [(capture_id, meta) for capture_id, meta in profiles if meta['view'] == options['view']]
+        if not profiles:
+            self.stdout.write(f'No captured profiles in {get_profile_dir()}')
+            return
+
+        self.stdout.write(
+            f"{'captured':19} {'kind':8} {'ms':>9} {'db ms':>9} {'queries':>7} {'status':>6}  view / path"
+        )
+        for capture_id, meta in profiles[:options['limit']]:
+            captured = datetime.fromtimestamp(meta['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(
+                f"{captured:19} {meta['kind']:8} {meta['duration_ms']:>9.1f} {meta['db_ms']:>9.1f} "
+                f"{meta['queries']:>7} {meta['status']:>6}  {meta['view']} {meta['method']} {meta['path']}"
+            )
+            self.stdout.write(f"    id: {capture_id}")
+
+    def summarize(self, capture_id, meta, limit, sort):
+        path = os.path.join(get_profile_dir(), capture_id)
+        self.stdout.write(
+            f"{meta['method']} {meta['path']} ({meta['view']}) -> {meta['status']}: "
+            f"{meta['duration_ms']:.1f} ms total, {meta['queries']} queries, {meta['db_ms']:.1f} ms in the database"
+        )
+
+        if meta['kind'] == 'cprofile':
+            self.stdout.write(f"\nTop {limit} functions by {sort}:")
+            stream = io.StringIO()
+            stats = pstats.Stats(os.path.join(path, CPROFILE_FILE), stream=stream)
+            stats.strip_dirs().sort_stats(sort).print_stats(limit)
+            self.stdout.write(stream.getvalue())
+        else:
+            self.summarize_stacks(os.path.join(path, STACKS_FILE), limit)
+
+        with open(os.path.join(path, SQL_FILE)) as f:
+            queries = json.load(f)
+        if queries:
+            self.stdout.write(f"Slowest {min(limit, len(queries))} of {len(queries)} queries:")
+            self.stdout.write(f"{'at ms':>9} {'ms':>8}  sql")
+            for query in sorted(queries, key=lambda query: query['duration_ms'], reverse=True)[:limit]:
+                self.stdout.write(f"{query['offset_ms']:>9.1f} {query['duration_ms']:>8.2f}  {query['sql']}")
+
+    def summarize_stacks(self, stacks_path, limit):
+        """Where the sampled stacks spent their time: innermost frame counts"""
+        leaf_counts = {}
+        total = 0
+        with open(stacks_path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                count = int(count)
+                total += count
+                leaf = stack.rsplit(';', 1)[-1]
+                leaf_counts[leaf] = leaf_counts.get(leaf, 0) + count
+
+        self.stdout.write(f"\n{total} stack samples; top {limit} innermost frames:")
+        for leaf, count in sorted(leaf_counts.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            self.stdout.write(f"{count:>6} {count / total:>6.1%}  {leaf}")
+        self.stdout.write(f"Full stacks (flamegraph.pl / speedscope folded format): {stacks_path}\n")
@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import BENCHMARKS, BenchmarkError, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot paths (dashboard, history, reports, report helpers, '
+        'project API, chatbot, login) and report latency percentiles and query counts as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', help=f'Comma-separated benchmarks to run (default: all of {", ".join(BENCHMARKS)})',
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per benchmark (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed runs first (default: 2)')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument(
+            '--baseline', help='JSON report from an earlier run; fail if any benchmark regressed',
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=0.2,
+            help='Allowed p95 slowdown versus the baseline, as a fraction (default: 0.2)',
+        )
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in (options['only'] or '').split(',') if name.strip()]
+        try:
+            report = run_benchmarks(names, iterations=max(options['iterations'], 1), warmup=options['warmup'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"{'benchmark':24} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'queries':>8}")
+            for name, result in report['results'].items():
+                if 'error' in result:
+                    self.stdout.write(self.style.ERROR(f"{name:24} {result['error']}"))
+                    continue
+                self.stdout.write(
+                    f"{name:24} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} "
+                    f"{result['p99_ms']:>10.1f} {result['queries']:>8}"
+                )
+            self.stdout.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        failed = [name for name, result in report['results'].items() if 'error' in result]
+        if failed and not options['baseline']:
+            raise CommandError(f"Benchmark(s) failed: {', '.join(failed)}")
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare_results(baseline, report, max_regression=options['max_regression'])
+            if regressions:
+                raise CommandError('Regressions versus baseline:\n  ' + '\n  '.join(regressions))
+            self.stderr.write(self.style.SUCCESS('No regressions versus baseline'))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sessions import delete_sessions, stores_sessions_in_db
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small batches (run it from cron instead of clearsessions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.SESSION_SWEEP_BATCH_SIZE,
+            help=f'Sessions deleted per transaction (default: {settings.SESSION_SWEEP_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=settings.SESSION_SWEEP_PAUSE_SECONDS,
+            help=f'Seconds to sleep between batches (default: {settings.SESSION_SWEEP_PAUSE_SECONDS})',
+        )
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        if not stores_sessions_in_db():
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no sessions in the database; nothing to sweep')
+            return
+        deleted = delete_sessions(
+            batch_size=options['batch_size'], pause=options['pause'], max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions'))
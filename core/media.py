@@ -0,0 +1,283 @@
+"""
+Media delivery for Triple G BuildHub.
+Serves uploaded files (project videos, diary photos, profile pictures) with
+HTTP Range support, conditional GET and optional web server offload.
+"""
+import math
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+
+from accounts.utils import log_access_violation
+
+# Upload directories that hold private site data and need a project check
+PROTECTED_MEDIA_PREFIXES = ('diary_photos/',)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+MEDIA_SIGNATURE_SALT = 'core.media.signed-url'
+
+
+class RangeFile:
+    """
+    File wrapper that yields at most `length` bytes from the current offset.
+
+    It exposes fileno() so gunicorn can hand the slice to sendfile(), and
+    deliberately has no seek()/tell() so FileResponse leaves Content-Length
+    to the caller.
+    """
+
+    def __init__(self, fileobj, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        self.name = fileobj.name
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.fileobj.fileno()
+
+    def close(self):
+        self.fileobj.close()
+
+
+def get_media_etag(stat_result):
+    """Build a strong ETag from file size and modification time."""
+    return f'"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range `Range` header.
+
+    Returns:
+        tuple: (start, end) inclusive byte offsets, None if the header should
+        be ignored (malformed or multi-range), or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def is_not_modified(request, etag, mtime):
+    """Evaluate If-None-Match / If-Modified-Since against the file."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since is not None:
+        return int(mtime) <= if_modified_since
+    return False
+
+
+def can_access_media(user, path):
+    """
+    Check whether a user may fetch a media file.
+
+    Public uploads (portfolio images/videos, profile pictures) are open; diary
+    photos are limited to users who can access the owning project.
+    """
+    if not path.startswith(PROTECTED_MEDIA_PREFIXES):
+        return True
+    if not user.is_authenticated:
+        return False
+
+    from site_diary.models import DiaryPhoto
+    from site_diary.utils import get_user_projects
+
+    return DiaryPhoto.objects.filter(
+        photo=path,
+        diary_entry__project__in=get_user_projects(user),
+    ).exists()
+
+
+def get_signed_url_expiry(now=None):
+    """
+    Pick the expiry timestamp for URLs signed now.
+
+    Expiries are rounded up to the next multiple of MEDIA_SIGNED_URL_TTL so
+    every page render inside the same window produces identical URLs, which
+    lets the browser reuse its cached copy of each photo.
+    """
+    ttl = settings.MEDIA_SIGNED_URL_TTL
+    now = time.time() if now is None else now
+    return int(math.ceil((now + ttl) / ttl) * ttl)
+
+
+def sign_media_path(path, expires):
+    """Return the HMAC signature for a media path and expiry timestamp."""
+    value = f'{path}:{expires}'
+    return salted_hmac(MEDIA_SIGNATURE_SALT, value, algorithm='sha256').hexdigest()[:32]
+
+
+def build_signed_media_url(path, expires=None):
+    """
+    Build a signed MEDIA_URL for a protected file.
+
+    Args:
+        path (str): File name relative to MEDIA_ROOT (FieldFile.name)
+        expires (int, optional): Unix timestamp; defaults to the current window
+
+    Returns:
+        str: URL carrying `expires` and `signature` query parameters
+    """
+    if expires is None:
+        expires = get_signed_url_expiry()
+    query = urlencode({'expires': expires, 'signature': sign_media_path(path, expires)})
+    return f'{settings.MEDIA_URL}{quote(path)}?{query}'
+
+
+def get_valid_signature_expiry(request, path):
+    """
+    Validate the signature on a media request without touching the database.
+
+    Returns:
+        int: The expiry timestamp if the signature is valid and unexpired,
+        otherwise None.
+    """
+    signature = request.GET.get('signature')
+    try:
+        expires = int(request.GET.get('expires', ''))
+    except ValueError:
+        return None
+
+    if not signature or expires <= time.time():
+        return None
+    if not constant_time_compare(signature, sign_media_path(path, expires)):
+        return None
+    return expires
+
+
+def build_offload_response(path, full_path, content_type):
+    """Hand the file off to the front-end web server."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SERVE_MODE == 'x-accel-redirect':
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{quote(path)}'
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT.
+
+    Supports single byte ranges (video seeking), ETag/Last-Modified
+    revalidation and, depending on MEDIA_SERVE_MODE, offloading the transfer
+    to nginx (X-Accel-Redirect) or Apache/lighttpd (X-Sendfile).
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path.lstrip('/'))
+    except SuspiciousFileOperation:
+        raise Http404('Media file not found')
+    # Check access against the file actually opened: safe_join() resolves
+    # `.`, `..` and doubled slashes, which would otherwise slip a protected
+    # file past the prefix test (/media/projects/../diary_photos/...)
+    path = os.path.relpath(full_path, safe_join(settings.MEDIA_ROOT)).replace(os.sep, '/')
+
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    signed_expires = None
+    if path.startswith(PROTECTED_MEDIA_PREFIXES):
+        signed_expires = get_valid_signature_expiry(request, path)
+
+    if signed_expires is None and not can_access_media(request.user, path):
+        client_ip = request.META.get('HTTP_X_FORWARDED_FOR',
+                                     request.META.get('REMOTE_ADDR', 'Unknown'))
+        if client_ip and ',' in client_ip:
+            client_ip = client_ip.split(',')[0].strip()
+        log_access_violation(request.user, request.path, client_ip, 'media_access_denied')
+        raise PermissionDenied
+
+    stat_result = os.stat(full_path)
+    etag = get_media_etag(stat_result)
+    last_modified = http_date(stat_result.st_mtime)
+    if signed_expires is not None:
+        # The URL stops working at `expires`, so the browser may keep it until then
+        cache_control = f'private, max-age={max(int(signed_expires - time.time()), 0)}, immutable'
+    elif path.startswith(PROTECTED_MEDIA_PREFIXES):
+        cache_control = 'private, no-cache'
+    else:
+        cache_control = 'public, max-age=86400'
+
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        response['Cache-Control'] = cache_control
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SERVE_MODE in ('x-accel-redirect', 'x-sendfile'):
+        response = build_offload_response(path, full_path, content_type)
+    else:
+        size = stat_result.st_size
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if range_header and (not if_range or if_range.strip() in (etag, last_modified)):
+            byte_range = parse_range_header(range_header, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+        fileobj = open(full_path, 'rb')
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            fileobj.seek(start)
+            response = FileResponse(RangeFile(fileobj, length), content_type=content_type)
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(fileobj, content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = cache_control
+    return response
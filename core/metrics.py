@@ -0,0 +1,269 @@
+"""
+Prometheus metrics for Triple G BuildHub.
+A small counter/histogram registry rendered in the Prometheus text format.
+
+Each process keeps its values in memory. When METRICS_DIR is set, every
+process also writes them to its own JSON file there, and a scrape of any
+gunicorn worker merges all files. The endpoint then reports totals for the
+whole server, not just the worker that happened to answer.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def label_key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+
+class Counter(Metric):
+    """Monotonically increasing value, e.g. requests served"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError('Counters can only increase')
+        key = self.label_key(labels)
+        with self.registry.lock:
+            family = self.registry.values.setdefault(self.name, {})
+            family[key] = family.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def empty_value(self):
+        return 0
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+    def samples(self, key, value):
+        yield self.name, key, value
+
+
+class Histogram(Metric):
+    """Distribution of observations in fixed buckets, e.g. request latency"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        with self.registry.lock:
+            family = self.registry.values.setdefault(self.name, {})
+            # Per-bucket (non-cumulative) counts, then +Inf, then sum
+            state = family.setdefault(key, self.empty_value())
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+        self.registry.maybe_flush()
+
+    def empty_value(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    @staticmethod
+    def merge(a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def samples(self, key, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value[:-1]):
+            cumulative += count
+            yield f'{self.name}_bucket', key, cumulative, ('le', format_value(bound))
+        yield f'{self.name}_count', key, cumulative
+        yield f'{self.name}_sum', key, value[-1]
+
+
+class Registry:
+    """Holds metric definitions and this process's values"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+        self.started = int(time.time() * 1000)
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def clear(self):
+        with self.lock:
+            self.values = {}
+
+    # Multiprocess support
+
+    def get_directory(self):
+        return getattr(settings, 'METRICS_DIR', '') or ''
+
+    def get_process_file(self):
+        # Start time in the name keeps a recycled PID from overwriting a dead
+        # worker's totals
+        return os.path.join(self.get_directory(), f'metrics-{os.getpid()}-{self.started}.json')
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {key: list(value) if isinstance(value, list) else value for key, value in family.items()}
+                for name, family in self.values.items()
+            }
+
+    def flush(self):
+        """Write this process's values to its file in METRICS_DIR"""
+        directory = self.get_directory()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = self.get_process_file()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        self.last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if not self.get_directory():
+            return
+        if time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def collect(self):
+        """Merge this process's live values with every other process's file"""
+        merged = self.snapshot()
+        directory = self.get_directory()
+        if not directory or not os.path.isdir(directory):
+            return merged
+
+        own_file = os.path.basename(self.get_process_file())
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == own_file:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, family in other.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in family.items():
+                    target[key] = metric.merge(target.get(key, metric.empty_value()), value)
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        values = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.get(name, {}).items()):
+                label_pairs = list(zip(metric.labelnames, json.loads(key)))
+                for sample in metric.samples(key, value):
+                    sample_name, _key, sample_value = sample[:3]
+                    pairs = label_pairs + [sample[3]] if len(sample) > 3 else label_pairs
+                    lines.append(f'{sample_name}{format_labels(pairs)} {format_value(sample_value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+
+# Application metrics
+
+HTTP_REQUESTS = Counter(
+    'tripleg_http_requests_total', 'HTTP requests by view, method and status',
+    ('view', 'method', 'status'),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'tripleg_http_request_duration_seconds', 'HTTP request latency by view', ('view',),
+)
+DB_QUERIES = Histogram(
+    'tripleg_db_queries_per_request', 'Database queries issued per request by view', ('view',),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_QUERY_DURATION = Counter(
+    'tripleg_db_query_seconds_total', 'Time spent waiting on the database by view', ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'tripleg_cache_requests_total', 'Cache lookups by cache alias and result (hit/miss)',
+    ('cache', 'result'),
+)
+OTP_EMAILS = Counter(
+    'tripleg_otp_emails_total', 'OTP verification emails by outcome (sent/failed)', ('status',),
+)
+OTP_EMAIL_DURATION = Histogram(
+    'tripleg_otp_email_duration_seconds', 'Time to hand an OTP email to the mail server',
+)
+AXES_LOCKOUTS = Counter(
+    'tripleg_axes_lockouts_total', 'Accounts or IPs locked out by django-axes',
+)
+ACCESS_VIOLATIONS = Counter(
+    'tripleg_access_violations_total', 'Access violations reported by log_access_violation',
+    ('violation_type',),
+)
+
+
+def observe_request(record):
+    """Feed one core.instrumentation request record into the metrics"""
+    view = record['view'] or 'unresolved'
+    HTTP_REQUESTS.inc(view=view, method=record['method'], status=record['status'])
+    HTTP_REQUEST_DURATION.observe(record['total_ms'] / 1000, view=view)
+    DB_QUERIES.observe(record['queries'], view=view)
+    DB_QUERY_DURATION.inc(record['db_ms'] / 1000, view=view)
+
+
+def record_axes_lockout(sender, **kwargs):
+    """axes.signals.user_locked_out receiver"""
+    AXES_LOCKOUTS.inc()
+
@@ -0,0 +1,41 @@
+"""
+Middleware shared by the whole site.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise with a native async path.
+
+    Upstream WhiteNoise is sync-only, and it sits at the top of the stack, so
+    under ASGI Django would hop every request to a thread and back just to
+    pass through it. The static file lookup is an in-memory dict (or a stat
+    with WHITENOISE_AUTOREFRESH in development), so it is safe to run on the
+    event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    def find_static(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    async def __acall__(self, request):
+        static_file = self.find_static(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
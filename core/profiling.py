@@ -0,0 +1,240 @@
+"""
+Opt-in request profiling for Triple G BuildHub.
+
+Two ways a request gets captured:
+  * sampled: a PROFILING_SAMPLE_RATE fraction of requests run under cProfile
+  * slow: a background thread takes stack samples of any request that has
+    been running longer than PROFILING_SLOW_THRESHOLD_MS
+
+Each capture stores the profile and the request's SQL timeline in its own
+directory under PROFILING_DIR, keeping at most PROFILING_MAX_PROFILES.
+Inspect them with `manage.py profiles`.
+"""
+import cProfile
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .instrumentation import get_view_name
+
+META_FILE = 'meta.json'
+SQL_FILE = 'sql.json'
+CPROFILE_FILE = 'profile.prof'
+STACKS_FILE = 'stacks.folded'
+
+
+class SQLTimeline:
+    """connection.execute_wrapper hook recording when each query ran"""
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        query_started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'offset_ms': round((query_started - self.started) * 1000, 2),
+                'duration_ms': round((time.perf_counter() - query_started) * 1000, 2),
+                'sql': sql[:settings.REQUEST_METRICS_SQL_MAX_LENGTH],
+            })
+
+
+class InFlightRequest:
+    def __init__(self, started):
+        self.started = started
+        self.samples = Counter()
+
+
+def format_stack(frame):
+    """Collapse a frame chain into flamegraph 'folded' form, outermost first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """
+    Background thread that samples the stacks of slow in-flight requests.
+
+    Request threads only register/unregister themselves in a dict; all the
+    sampling work happens on this thread, and only once a request has passed
+    the threshold.
+    """
+
+    def __init__(self, threshold, interval):
+        self.threshold = threshold
+        self.interval = interval
+        self.in_flight = {}
+        self.pid = None
+        self.thread = None
+
+    def ensure_running(self):
+        # Threads do not survive a fork, so start one per worker process
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='request-stack-sampler', daemon=True)
+            self.thread.start()
+
+    def register(self, started):
+        state = InFlightRequest(started)
+        self.in_flight[threading.get_ident()] = state
+        return state
+
+    def unregister(self):
+        self.in_flight.pop(threading.get_ident(), None)
+
+    def sample_once(self):
+        now = time.perf_counter()
+        slow = [(ident, state) for ident, state in list(self.in_flight.items())
+                if now - state.started >= self.threshold]
+        if not slow:
+            return
+        frames = sys._current_frames()
+        for ident, state in slow:
+            frame = frames.get(ident)
+            if frame is not None:
+                state.samples[format_stack(frame)] += 1
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.sample_once()
+
+
+def get_profile_dir():
+    return str(settings.PROFILING_DIR)
+
+
+def list_profiles():
+    """Captured profiles, newest first, as (capture id, meta dict)"""
+    directory = get_profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        meta_path = os.path.join(directory, name, META_FILE)
+        try:
+            with open(meta_path) as f:
+                profiles.append((name, json.load(f)))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def trim_profiles():
+    """Delete the oldest captures beyond PROFILING_MAX_PROFILES"""
+    directory = get_profile_dir()
+    captures = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name))
+    )
+    for name in captures[:max(len(captures) - settings.PROFILING_MAX_PROFILES, 0)]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def save_profile(meta, sql_timeline, profiler=None, samples=None):
+    """
+    Write one capture to the ring directory.
+
+    Returns:
+        str: The capture id (directory name)
+    """
+    capture_id = '{:.6f}-{}-{}'.format(
+        meta['timestamp'], os.getpid(), (meta['view'] or 'unresolved').replace(':', '.').replace('/', '_')
+    )
+    path = os.path.join(get_profile_dir(), capture_id)
+    os.makedirs(path, exist_ok=True)
+
+    if profiler is not None:
+        profiler.dump_stats(os.path.join(path, CPROFILE_FILE))
+    if samples:
+        with open(os.path.join(path, STACKS_FILE), 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+    with open(os.path.join(path, SQL_FILE), 'w') as f:
+        json.dump(sql_timeline, f, indent=1)
+    # meta.json last: list_profiles() ignores captures without it
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+
+    trim_profiles()
+    return capture_id
+
+
+class ProfilingMiddleware:
+    """
+    Capture profiles of sampled or slow requests.
+
+    Disabled unless PROFILING_ENABLED is set, in which case Django drops it
+    from the stack entirely. Sync-only: cProfile and the stack sampler follow
+    threads, not coroutines, so under ASGI enabling it puts a thread hop on
+    every request.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        threshold_ms = settings.PROFILING_SLOW_THRESHOLD_MS
+        self.sampler = None
+        if threshold_ms > 0:
+            self.sampler = StackSampler(threshold_ms / 1000, settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+
+    def __call__(self, request):
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and self.sampler is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        timeline = SQLTimeline(started)
+        profiler = cProfile.Profile() if sampled else None
+        in_flight = None
+        if self.sampler is not None and not sampled:
+            self.sampler.ensure_running()
+            in_flight = self.sampler.register(started)
+
+        try:
+            with connection.execute_wrapper(timeline):
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            if in_flight is not None:
+                self.sampler.unregister()
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        samples = in_flight.samples if in_flight is not None else None
+        if profiler is not None or samples:
+            meta = {
+                'timestamp': time.time(),
+                'kind': 'cprofile' if profiler is not None else 'stacks',
+                'method': request.method,
+                'path': request.path,
+                'view': get_view_name(request),
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'queries': len(timeline.queries),
+                'db_ms': round(sum(query['duration_ms'] for query in timeline.queries), 2),
+            }
+            save_profile(meta, timeline.queries, profiler=profiler, samples=samples)
+        return response
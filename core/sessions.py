@@ -0,0 +1,83 @@
+"""
+Session storage helpers for Triple G BuildHub.
+
+SESSION_BACKEND (see settings) picks where sessions live. With 'db' and
+'cached_db' the django_session table keeps growing until it is swept.
+Sweeping deletes rows in small batches, each in its own short transaction,
+so neither logins nor session reads ever wait behind a long DELETE.
+
+'cached_db' serves a session from the cache whenever it is there, so a
+logout, sweep or purge only takes effect everywhere if every worker shares
+that cache. check_session_cache() refuses to start otherwise.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+DB_BACKED_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+CACHED_DB_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+def stores_sessions_in_db():
+    return settings.SESSION_ENGINE in DB_BACKED_ENGINES
+
+
+def check_session_cache():
+    """Run at startup: cached_db sessions need a cache every worker shares"""
+    if settings.SESSION_ENGINE == CACHED_DB_ENGINE and not is_shared_cache(settings.SESSION_CACHE_ALIAS):
+        raise ImproperlyConfigured(
+            "SESSION_BACKEND=cached_db needs a shared cache (Redis or Memcached) as "
+            f"SESSION_CACHE_ALIAS {settings.SESSION_CACHE_ALIAS!r}. With a per-process cache a "
+            "logged-out session stays valid in every other worker."
+        )
+
+
+def delete_sessions(expired_only=True, batch_size=None, pause=None, max_batches=None):
+    """
+    Delete sessions batch by batch; with expired_only=False, every session.
+
+    Each batch selects up to `batch_size` keys through the expire_date index
+    and deletes exactly those, then sleeps `pause` seconds to let other
+    writers in. With cached_db the cached copies of the deleted sessions are
+    dropped as well. Returns the number of sessions deleted.
+    """
+    batch_size = batch_size or settings.SESSION_SWEEP_BATCH_SIZE
+    pause = settings.SESSION_SWEEP_PAUSE_SECONDS if pause is None else pause
+    sessions = Session.objects.order_by('expire_date')
+    if expired_only:
+        # Fixed up front so sessions expiring mid-sweep wait for the next run
+        sessions = sessions.filter(expire_date__lt=timezone.now())
+
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        keys = list(sessions.values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            break
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        if settings.SESSION_ENGINE == CACHED_DB_ENGINE:
+            caches[settings.SESSION_CACHE_ALIAS].delete_many([KEY_PREFIX + key for key in keys])
+        batches += 1
+        if len(keys) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    logger.info("Deleted sessions", extra={
+        'deleted': deleted, 'batches': batches, 'expired_only': expired_only,
+    })
+    return deleted
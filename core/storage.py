@@ -0,0 +1,47 @@
+"""
+Static files storage for Triple G BuildHub.
+"""
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .bundles import build_bundles
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise manifest storage that also builds the per-layout bundles.
+
+    Bundles are written into STATIC_ROOT before post-processing, so they get
+    content-hashed names plus .gz/.br siblings, and WhiteNoise serves them
+    with far-future immutable cache headers.
+    """
+
+    def url_converter(self, name, hashed_files, template=None):
+        """
+        Leave url() references to missing files as written instead of
+        aborting collectstatic; some legacy stylesheets point at images that
+        were never committed.
+        """
+        converter = super().url_converter(name, hashed_files, template)
+
+        def safe_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+
+        return safe_converter
+
+    def read_text(self, name):
+        with self.open(name) as f:
+            return f.read().decode('utf-8')
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for bundle_path, content in build_bundles(self.read_text).items():
+                if self.exists(bundle_path):
+                    self.delete(bundle_path)
+                self.save(bundle_path, ContentFile(content.encode('utf-8')))
+                paths[bundle_path] = (self, bundle_path)
+
+        yield from super().post_process(paths, dry_run=dry_run, **options)
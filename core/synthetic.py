@@ -0,0 +1,346 @@
+"""
+Synthetic construction dataset for benchmarks.
+
+Generates users, site diary projects with a long history of diary entries
+and their labor/material/equipment/delay/visitor line items, plus portfolio
+projects with their stats and timelines. Rows go in with bulk_create in
+batches of `batch_size`, one transaction per batch, or with Postgres COPY for
+the diary line-item tables when `use_copy` is set. The same seed and sizes
+always produce the same rows, so benchmark runs are comparable.
+
+All generated rows hang off users whose username starts with USER_PREFIX (and
+portfolio categories starting with CATEGORY_PREFIX), which is how
+delete_dataset() finds them again.
+"""
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+USER_PREFIX = 'synthetic_'
+CATEGORY_PREFIX = 'Synthetic '
+PASSWORD = 'synthetic-pass-123'
+
+TRADES = ['Carpenter', 'Electrician', 'Plumber', 'Mason', 'Welder', 'Painter', 'Steel Fixer', 'Tiler']
+MATERIALS = [
+    ('Portland Cement', 'bags'), ('Rebar 12mm', 'tons'), ('Ready-mix Concrete', 'm3'),
+    ('Plywood', 'pcs'), ('Hollow Blocks', 'pcs'), ('Sand', 'm3'), ('Gravel', 'm3'),
+    ('Electrical Wire', 'rolls'), ('PVC Pipe', 'm'), ('Paint', 'liters'),
+]
+EQUIPMENT = [('Excavator', 'Excavator'), ('Tower Crane', 'Crane'), ('Concrete Mixer', 'Mixer'), ('Backhoe', 'Loader')]
+WORK = [
+    'Formwork and rebar installation on level {n}', 'Concrete pouring for slab {n}',
+    'Masonry works on grid line {n}', 'Electrical rough-in at floor {n}',
+    'Plumbing installation in unit {n}', 'Excavation and backfilling at zone {n}',
+]
+LOCATIONS = ['Makati', 'Quezon City', 'Pasig', 'Taguig', 'Cebu City', 'Davao City', 'Iloilo City']
+MILESTONES = ['Planning & Design', 'Foundation', 'Structure', 'Enclosure & Utilities', 'Finishing & Handover']
+WEATHER = ['sunny', 'sunny', 'cloudy', 'cloudy', 'rainy', 'stormy', 'windy', 'foggy']
+
+# Large child tables that nothing references, so COPY (which does not hand
+# back ids) can load them
+COPY_MODELS = {
+    'site_diary.LaborEntry', 'site_diary.MaterialEntry', 'site_diary.EquipmentEntry',
+    'site_diary.DelayEntry', 'site_diary.VisitorEntry',
+}
+
+
+def copy_supported():
+    """COPY needs Postgres through psycopg 3"""
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def copy_rows(model, objects):
+    """Insert unsaved objects with COPY ... FROM STDIN. Ids are not set on them."""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(sql) as copy:
+            for obj in objects:
+                copy.write_row([field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields])
+
+
+class SyntheticDataGenerator:
+    """
+    Args:
+        projects (int): Site diary projects to create
+        entries_per_project (int): Diary entries (one per day) for each project
+        line_items (int): Average labor and material items per diary entry
+        portfolio_projects (int): Portfolio projects to create
+        seed (int): Random seed; same seed and sizes give the same data
+        batch_size (int): Rows per INSERT/COPY and per transaction
+        end_date (date): Date of the most recent diary entry (default: today)
+        use_copy (bool): Load the line-item tables with COPY when on Postgres
+    """
+
+    def __init__(self, projects=20, entries_per_project=100, line_items=4, portfolio_projects=100,
+                 seed=42, batch_size=2000, end_date=None, use_copy=False, stdout=None):
+        self.projects = projects
+        self.entries_per_project = entries_per_project
+        self.line_items = line_items
+        self.portfolio_projects = portfolio_projects
+        self.batch_size = batch_size
+        self.end_date = end_date or date.today()
+        self.random = random.Random(seed)
+        self.use_copy = use_copy and copy_supported()
+        self.stdout = stdout
+        self.counts = {}
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def bulk_create(self, model, objects):
+        """Insert objects batch by batch, committing each batch"""
+        use_copy = self.use_copy and model._meta.label in COPY_MODELS
+        for start in range(0, len(objects), self.batch_size):
+            batch = objects[start:start + self.batch_size]
+            with transaction.atomic():
+                if use_copy:
+                    copy_rows(model, batch)
+                else:
+                    model.objects.bulk_create(batch, batch_size=self.batch_size)
+        key = model._meta.label
+        self.counts[key] = self.counts.get(key, 0) + len(objects)
+
+    def money(self, low, high):
+        return Decimal(self.random.randint(low * 100, high * 100)) / 100
+
+    def generate(self):
+        """
+        Create the whole dataset.
+
+        Returns:
+            dict: Rows created per model label
+        """
+        if self.projects:
+            managers, architects = self.create_users()
+            for index in range(self.projects):
+                self.create_project(index, managers[index % len(managers)], architects[index % len(architects)])
+                if (index + 1) % 10 == 0 or index + 1 == self.projects:
+                    self.log(f'  {index + 1}/{self.projects} projects')
+        if self.portfolio_projects:
+            self.create_portfolio()
+        return self.counts
+
+    def create_users(self):
+        from accounts.models import Profile
+
+        # One hash for every user: hashing per user would dominate generation
+        password = make_password(PASSWORD)
+        manager_count = max(self.projects // 10, 1)
+        architect_count = max(self.projects // 5, 1)
+        users = [
+            User(username=f'{USER_PREFIX}pm_{n}', email=f'{USER_PREFIX}pm_{n}@example.com',
+                 first_name='PM', last_name=str(n), password=password, is_staff=True)
+            for n in range(manager_count)
+        ] + [
+            User(username=f'{USER_PREFIX}architect_{n}', email=f'{USER_PREFIX}architect_{n}@example.com',
+                 first_name='Architect', last_name=str(n), password=password)
+            for n in range(architect_count)
+        ] + [
+            User(username=f'{USER_PREFIX}client', email=f'{USER_PREFIX}client@example.com',
+                 first_name='Client', last_name='User', password=password),
+        ]
+        self.bulk_create(User, users)
+
+        users = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('id'))
+        roles = {'pm': 'customer', 'architect': 'architect', 'client': 'customer'}
+        self.bulk_create(Profile, [
+            Profile(user=user, role=roles[user.username[len(USER_PREFIX):].split('_')[0]]) for user in users
+        ])
+        managers = [user for user in users if user.is_staff]
+        architects = [user for user in users if user.username.startswith(f'{USER_PREFIX}architect_')]
+        return managers, architects
+
+    def create_project(self, index, manager, architect):
+        from site_diary.models import DiaryEntry, Project
+
+        start = self.end_date - timedelta(days=self.entries_per_project)
+        project = Project.objects.create(
+            name=f'Synthetic Project {index:04d}',
+            description='Generated for benchmarks',
+            client_name=f'Client {index % 37}',
+            project_manager=manager,
+            architect=architect,
+            location=self.random.choice(LOCATIONS),
+            start_date=start,
+            expected_end_date=start + timedelta(days=self.entries_per_project + self.random.randint(30, 400)),
+            budget=self.money(1_000_000, 50_000_000),
+            status=self.random.choice(['active', 'active', 'active', 'planning', 'on_hold', 'completed']),
+        )
+        self.counts['site_diary.Project'] = self.counts.get('site_diary.Project', 0) + 1
+
+        entries = []
+        for day in range(self.entries_per_project):
+            high = self.random.randint(26, 36)
+            entries.append(DiaryEntry(
+                project=project,
+                entry_date=start + timedelta(days=day + 1),
+                created_by=manager,
+                weather_condition=self.random.choice(WEATHER),
+                temperature_high=high,
+                temperature_low=high - self.random.randint(4, 10),
+                humidity=self.random.randint(50, 95),
+                wind_speed=self.money(0, 40),
+                work_description=self.random.choice(WORK).format(n=self.random.randint(1, 30)),
+                progress_percentage=Decimal(str(round(100 * (day + 1) / self.entries_per_project, 2))),
+                quality_issues='Honeycombing on column face' if self.random.random() < 0.1 else '',
+                safety_incidents='Worker without harness at edge' if self.random.random() < 0.05 else '',
+                general_notes='',
+                reviewed_by=architect,
+                approved=self.random.random() < 0.7,
+            ))
+        self.bulk_create(DiaryEntry, entries)
+        if entries and entries[0].pk is None:
+            # Backends that cannot return bulk-inserted ids
+            entries = list(project.diary_entries.order_by('entry_date'))
+        self.create_line_items(entries)
+
+    def create_line_items(self, entries):
+        from site_diary.models import DelayEntry, EquipmentEntry, LaborEntry, MaterialEntry, VisitorEntry
+
+        pending = {model: [] for model in (LaborEntry, MaterialEntry, EquipmentEntry, DelayEntry, VisitorEntry)}
+
+        def add(obj):
+            batch = pending[type(obj)]
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self.bulk_create(type(obj), batch)
+                batch.clear()
+
+        for entry in entries:
+            for _ in range(self.random.randint(1, 2 * self.line_items - 1)):
+                add(LaborEntry(
+                    diary_entry_id=entry.pk,
+                    labor_type=self.random.choice(['skilled', 'unskilled', 'supervisor', 'foreman']),
+                    trade_description=self.random.choice(TRADES),
+                    workers_count=self.random.randint(1, 25),
+                    hours_worked=Decimal('8.00'),
+                    hourly_rate=self.money(60, 250),
+                    overtime_hours=Decimal(self.random.choice([0, 0, 0, 1, 2])),
+                ))
+            for _ in range(self.random.randint(1, 2 * self.line_items - 1)):
+                name, unit = self.random.choice(MATERIALS)
+                delivered = self.money(1, 500)
+                add(MaterialEntry(
+                    diary_entry_id=entry.pk, material_name=name, unit=unit,
+                    quantity_delivered=delivered, quantity_used=delivered * Decimal('0.8'),
+                    unit_cost=self.money(50, 5000), supplier=f'Supplier {self.random.randint(1, 40)}',
+                ))
+            for _ in range(self.random.randint(0, 2)):
+                name, kind = self.random.choice(EQUIPMENT)
+                add(EquipmentEntry(
+                    diary_entry_id=entry.pk, equipment_name=name, equipment_type=kind,
+                    hours_operated=Decimal(self.random.randint(1, 10)), rental_cost_per_hour=self.money(500, 5000),
+                ))
+            if self.random.random() < 0.3:
+                add(DelayEntry(
+                    diary_entry_id=entry.pk,
+                    category=self.random.choice(['weather', 'material', 'equipment', 'labor', 'permit']),
+                    description='Work stopped', duration_hours=Decimal(self.random.randint(1, 8)),
+                    impact_level=self.random.choice(['low', 'medium', 'high']),
+                    affected_activities='Concrete works',
+                ))
+            if self.random.random() < 0.2:
+                add(VisitorEntry(
+                    diary_entry_id=entry.pk, visitor_name=f'Visitor {self.random.randint(1, 500)}',
+                    visitor_type=self.random.choice(['client', 'inspector', 'consultant', 'supplier']),
+                    arrival_time=time(self.random.randint(7, 15)), purpose_of_visit='Site inspection',
+                ))
+
+        for model, batch in pending.items():
+            if batch:
+                self.bulk_create(model, batch)
+
+    def create_portfolio(self):
+        from portfolio.models import Category, Project, ProjectStat, ProjectTimeline
+
+        categories = []
+        for name in ('Residential', 'Commercial', 'Public'):
+            category, _ = Category.objects.get_or_create(name=f'{CATEGORY_PREFIX}{name}')
+            categories.append(category)
+        projects = [
+            Project(
+                title=f'Synthetic Portfolio Project {n:05d}',
+                description='Generated for benchmarks. ' * 5,
+                category=self.random.choice(categories),
+                year=self.random.randint(2015, self.end_date.year),
+                location=f'{self.random.choice(LOCATIONS)}, Philippines',
+                size=f'{self.random.randint(80, 5000)} m²',
+                duration=f'{self.random.randint(4, 36)} Months',
+                completion_date=self.end_date - timedelta(days=self.random.randint(0, 3000)),
+                lead_architect=f'Architect {self.random.randint(1, 30)}',
+                status=self.random.choice(['planned', 'ongoing', 'completed']),
+                featured=self.random.random() < 0.1,
+            )
+            for n in range(self.portfolio_projects)
+        ]
+        self.bulk_create(Project, projects)
+        if projects and projects[0].pk is None:
+            projects = list(Project.objects.filter(category__in=categories).order_by('title'))
+
+        stats = []
+        timeline = []
+        for project in projects:
+            stats += [
+                ProjectStat(project_id=project.pk, label='Total Area', value=project.size, order=1),
+                ProjectStat(project_id=project.pk, label='Floors', value=str(self.random.randint(1, 40)), order=2),
+            ]
+            milestone = project.completion_date - timedelta(days=30 * len(MILESTONES))
+            for order, title in enumerate(MILESTONES, start=1):
+                milestone += timedelta(days=30)
+                timeline.append(ProjectTimeline(
+                    project_id=project.pk, title=title, date=milestone, description=f'{title} phase',
+                    completed=project.status == 'completed' or milestone <= self.end_date, order=order,
+                ))
+        self.bulk_create(ProjectStat, stats)
+        self.bulk_create(ProjectTimeline, timeline)
+
+
+def delete_in_chunks(queryset, chunk_size=10000):
+    """
+    Delete a queryset a chunk of ids at a time. Models with delete signal
+    receivers (the site diary line items, see site_diary.signals) cannot be
+    fast-deleted, so one .delete() would load every row into memory first.
+    """
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        queryset.model.objects.filter(pk__in=ids).delete()
+
+
+def delete_dataset(diary=True, portfolio=True):
+    """
+    Delete synthetic rows. Line items go first, in chunks, rather than
+    Django collecting millions of objects for the cascade. The sync change
+    log is not written to: synthetic rows were never recorded there.
+
+    Args:
+        diary (bool): Delete the synthetic users and their site diary data
+        portfolio (bool): Delete the synthetic portfolio categories and projects
+    """
+    from portfolio.models import Category
+    from site_diary.models import (
+        DelayEntry, DiaryEntry, DiaryPhoto, EquipmentEntry, LaborEntry, MaterialEntry, Project, VisitorEntry,
+    )
+    from site_diary.sync import bulk_changes
+
+    projects = Project.objects.filter(project_manager__username__startswith=USER_PREFIX)
+    with transaction.atomic(), bulk_changes():
+        if diary:
+            for model in (LaborEntry, MaterialEntry, EquipmentEntry, DelayEntry, VisitorEntry, DiaryPhoto):
+                delete_in_chunks(model.objects.filter(diary_entry__project__in=projects))
+            delete_in_chunks(DiaryEntry.objects.filter(project__in=projects))
+            projects.delete()
+            User.objects.filter(username__startswith=USER_PREFIX).delete()
+        if portfolio:
+            Category.objects.filter(name__startswith=CATEGORY_PREFIX).delete()
@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from core.bundles import get_bundle_path, get_bundle_sources
+
+register = template.Library()
+
+
+def _asset_paths(name, kind):
+    """Bundle path when bundling is enabled, otherwise the individual sources"""
+    sources = get_bundle_sources(name, kind)
+    if settings.STATIC_BUNDLES_ENABLED and sources:
+        return [get_bundle_path(name, kind)]
+    return sources
+
+
+@register.simple_tag
+def bundle_css(name):
+    """Render <link> tags for a CSS bundle, e.g. {% bundle_css 'public' %}"""
+    return format_html_join(
+        '\n', '<link rel="stylesheet" href="{}">',
+        ((static(path),) for path in _asset_paths(name, 'css'))
+    )
+
+
+@register.simple_tag
+def bundle_js(name):
+    """Render <script> tags for a JS bundle, e.g. {% bundle_js 'public' %}"""
+    return format_html_join(
+        '\n', '<script src="{}"></script>',
+        ((static(path),) for path in _asset_paths(name, 'js'))
+    )
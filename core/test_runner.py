@@ -0,0 +1,16 @@
+"""
+Test runner for Triple G BuildHub.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that turns query_budget warnings into test failures, so a
+    change that adds queries to a budgeted view is caught in CI.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_ENFORCE = True
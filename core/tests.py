@@ -1,3 +1,736 @@
-from django.test import TestCase
+import collections
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Context, Engine, Template
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import (
+    LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, Client, override_settings,
+)
+
+from core.benchmark import compare_results, percentile, run_benchmarks
+from core.loadtest import run_load_test
+from core.bundles import build_css_bundle, minify_css, minify_js
+from core.instrumentation import (
+    QueryBudgetExceeded, clear_request_metrics, get_recent_request_metrics, query_budget,
+)
+from core.log import AsyncQueueHandler, DebugSamplingFilter, JSONFormatter
+from core.metrics import (
+    ACCESS_VIOLATIONS, AXES_LOCKOUTS, CACHE_REQUESTS, OTP_EMAILS, REGISTRY,
+    Counter, Histogram, Registry,
+)
+from core.media import build_signed_media_url, get_signed_url_expiry
+from core.sessions import check_session_cache, delete_sessions
+from core.profiling import ProfilingMiddleware, StackSampler, list_profiles, save_profile
+from core.synthetic import PASSWORD as SYNTHETIC_PASSWORD, SyntheticDataGenerator, delete_dataset
+from core.warmup import get_template_engine, iter_template_names, reset_template_cache, warmup_templates
+from portfolio.models import Category
+from site_diary.models import Project, DiaryEntry, DiaryPhoto, LaborEntry
+
+
+class MediaServingTest(TestCase):
+    """Test Range, conditional GET and access control in core.media"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'projects', 'videos'))
+        self.video_bytes = bytes(range(256)) * 4
+        with open(os.path.join(self.media_root, 'projects', 'videos', 'walkthrough.mp4'), 'wb') as f:
+            f.write(self.video_bytes)
+
+        os.makedirs(os.path.join(self.media_root, 'diary_photos', '2025', '01', '01'))
+        with open(os.path.join(self.media_root, 'diary_photos', '2025', '01', '01', 'slab.jpg'), 'wb') as f:
+            f.write(b'jpeg-bytes')
+
+        self.manager = User.objects.create_user(username='pm_media', password='testpass123', is_staff=True)
+        self.outsider = User.objects.create_user(username='outsider_media', password='testpass123')
+        project = Project.objects.create(
+            name='Media Project',
+            client_name='Client',
+            project_manager=self.manager,
+            location='Site',
+            start_date=date.today() - timedelta(days=10),
+            expected_end_date=date.today() + timedelta(days=100),
+            budget=Decimal('1000.00'),
+            status='active',
+        )
+        entry = DiaryEntry.objects.create(
+            project=project,
+            created_by=self.manager,
+            work_description='Slab pour',
+        )
+        DiaryPhoto.objects.create(diary_entry=entry, photo='diary_photos/2025/01/01/slab.jpg')
+        self.client = Client()
+
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_response_advertises_ranges(self):
+        response = self.client.get('/media/projects/videos/walkthrough.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertIn('ETag', response)
+        self.assertEqual(self._content(response), self.video_bytes)
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get('/media/projects/videos/walkthrough.mp4', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.video_bytes)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self._content(response), self.video_bytes[100:200])
+
+    def test_suffix_range(self):
+        response = self.client.get('/media/projects/videos/walkthrough.mp4', HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._content(response), self.video_bytes[-10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get('/media/projects/videos/walkthrough.mp4', HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.video_bytes)}')
+
+    def test_stale_if_range_serves_full_file(self):
+        response = self.client.get(
+            '/media/projects/videos/walkthrough.mp4',
+            HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"stale"',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_with_etag(self):
+        etag = self.client.get('/media/projects/videos/walkthrough.mp4')['ETag']
+        response = self.client.get('/media/projects/videos/walkthrough.mp4', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_traversal_rejected(self):
+        response = self.client.get('/media/../config/settings.py')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unnormalized_paths_cannot_bypass_access_checks(self):
+        for path in (
+            '/media/./diary_photos/2025/01/01/slab.jpg',
+            '/media/projects/../diary_photos/2025/01/01/slab.jpg',
+            '/media/diary_photos//2025/01/01/slab.jpg',
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 403)
+
+        # The signature covers the normalized name, so signed links still work
+        url = build_signed_media_url('diary_photos/2025/01/01/slab.jpg')
+        self.assertEqual(self.client.get(url.replace('/media/', '/media/./')).status_code, 200)
+
+    def test_diary_photo_requires_project_access(self):
+        path = '/media/diary_photos/2025/01/01/slab.jpg'
+        self.assertEqual(self.client.get(path).status_code, 403)
+
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(path).status_code, 403)
+
+        self.client.force_login(self.manager)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_x_accel_redirect_offload(self):
+        response = self.client.get('/media/projects/videos/walkthrough.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/projects/videos/walkthrough.mp4')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVE_MODE='x-sendfile')
+    def test_x_sendfile_offload(self):
+        response = self.client.get('/media/projects/videos/walkthrough.mp4')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(self.media_root, 'projects', 'videos', 'walkthrough.mp4'),
+        )
+
+    def test_signed_url_served_without_permission_queries(self):
+        url = build_signed_media_url('diary_photos/2025/01/01/slab.jpg')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_tampered_or_expired_signature_rejected(self):
+        url = build_signed_media_url('diary_photos/2025/01/01/slab.jpg')
+        tampered = url.split('signature=')[0] + 'signature=' + '0' * 32
+        self.assertEqual(self.client.get(tampered).status_code, 403)
+
+        expired = build_signed_media_url('diary_photos/2025/01/01/slab.jpg', int(time.time()) - 1)
+        self.assertEqual(self.client.get(expired).status_code, 403)
+
+    @override_settings(MEDIA_SIGNED_URL_TTL=3600)
+    def test_signed_url_expiry_is_bucketed(self):
+        self.assertEqual(get_signed_url_expiry(now=100), 3600 * 2)
+        self.assertEqual(get_signed_url_expiry(now=3500), 3600 * 2)
+        self.assertEqual(get_signed_url_expiry(now=3700), 3600 * 3)
+
+
+class StaticBundleTest(SimpleTestCase):
+    """Test bundle building, the bundle template tags and collectstatic output"""
+
+    def test_minify_css(self):
+        css = "/* header */\n.nav  a > span {\n  color: red;\n  margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), '.nav a>span{color: red;margin: 0 auto}')
+
+    def test_minify_js_keeps_template_literals(self):
+        js = "  // comment\nconst a = 1;\n\nconst t = `line one\n    line two`;\n"
+        self.assertEqual(minify_js(js), 'const a = 1;\nconst t = `line one\n    line two`;')
+
+    def test_css_bundle_hoists_imports_and_rebases_urls(self):
+        sources = {
+            'css/sitecss/a.css': '.a { background: url("../../images/bg.png"); }',
+            'css/b.css': "@import url('https://fonts.example.com/x.css');\n.b { color: blue; }",
+        }
+        bundle = build_css_bundle(list(sources), 'bundles/site.css', sources.__getitem__)
+        lines = bundle.splitlines()
+        self.assertEqual(lines[0], "@import url('https://fonts.example.com/x.css');")
+        self.assertIn('url("../images/bg.png")', bundle)
+
+    @override_settings(STATIC_BUNDLES_ENABLED=True)
+    def test_bundle_tags_emit_single_file(self):
+        html = Template("{% load static_bundles %}{% bundle_css 'site' %}{% bundle_js 'site' %}").render(Context())
+        self.assertEqual(html.count('<link'), 1)
+        self.assertEqual(html.count('<script'), 1)
+        self.assertIn('bundles/site.css', html)
+
+    @override_settings(STATIC_BUNDLES_ENABLED=False)
+    def test_bundle_tags_emit_sources_when_disabled(self):
+        html = Template("{% load static_bundles %}{% bundle_css 'admin-reports' %}").render(Context())
+        sheets = re.findall(r'href="/static/(css/[^"]+)"', html)
+        self.assertEqual(sheets, settings.STATIC_BUNDLES['admin-reports']['css'])
+
+    @override_settings(STATIC_BUNDLES_ENABLED=True)
+    def test_bundle_without_css_emits_nothing(self):
+        html = Template("{% load static_bundles %}{% bundle_css 'admin' %}").render(Context())
+        self.assertEqual(html, '')
+
+    @override_settings(STATIC_BUNDLES_ENABLED=False)
+    def test_pages_keep_their_stylesheet_order(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        html = render_to_string('core/home.html', request=request)
+        sheets = re.findall(r'href="/static/(css/[^"]+)"', html)
+        self.assertEqual(sheets, ['css/projects.css', 'css/loader.css', 'css/sitecss/modal_messages.css', 'css/home.css'])
+
+    @override_settings(STATIC_BUNDLES_ENABLED=True)
+    def test_page_loads_its_bundle_and_the_layout_bundle(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        html = render_to_string('core/home.html', request=request)
+        sheets = re.findall(r'href="/static/([^"]+\.css)"', html)
+        self.assertEqual(sheets, ['bundles/home.css', 'bundles/public.css'])
+
+    def test_collectstatic_writes_hashed_compressed_bundles(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'core.storage.BundledStaticFilesStorage'},
+        }
+        with override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        files = os.listdir(os.path.join(static_root, 'bundles'))
+        for name, kind in (('public', 'css'), ('site', 'css'), ('admin', 'js'), ('admin-reports', 'css')):
+            hashed = [f for f in files if f.startswith(f'{name}.') and f.endswith(f'.{kind}')]
+            self.assertEqual(len(hashed), 2)  # original plus content-hashed copy
+            self.assertTrue(any(f.startswith(f'{name}.') and f.endswith(f'.{kind}.gz') for f in files))
+            self.assertTrue(any(f.startswith(f'{name}.') and f.endswith(f'.{kind}.br') for f in files))
+        self.assertNotIn('admin.css', files)
+
+
+class TemplateWarmupTest(SimpleTestCase):
+    """Test that worker warm-up fills the cached template loader"""
+
+    def test_warmup_compiles_project_templates(self):
+        engine = get_template_engine()
+        reset_template_cache(engine)
+        self.addCleanup(reset_template_cache, engine)
+
+        names = list(iter_template_names(engine))
+        self.assertIn('layout.html', names)
+        self.assertIn('core/home.html', names)
+        self.assertFalse(any(name.startswith('admin/base') for name in names))
+
+        result = warmup_templates(engine)
+        self.assertEqual(result['compiled'], len(names))
+        self.assertEqual(result['failed'], [])
+        cached_loader = engine.template_loaders[0]
+        self.assertIn('core/home.html', cached_loader.get_template_cache)
+
+    def test_broken_template_is_skipped(self):
+        template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, template_dir)
+        with open(os.path.join(template_dir, 'ok.html'), 'w') as f:
+            f.write('{{ value }}')
+        with open(os.path.join(template_dir, 'broken.html'), 'w') as f:
+            f.write('{% if %}')
+
+        engine = Engine(
+            dirs=[template_dir],
+            loaders=[('django.template.loaders.cached.Loader', ['django.template.loaders.filesystem.Loader'])],
+        )
+        with override_settings(BASE_DIR=template_dir), self.assertLogs('core.warmup', 'WARNING'):
+            result = warmup_templates(engine)
+        self.assertEqual(result['compiled'], 1)
+        self.assertEqual(result['failed'], ['broken.html'])
+
+
+class BenchmarkHelpersTest(SimpleTestCase):
+    """Test the latency statistics used by the benchmark commands"""
+
+    def test_percentile_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7.5], 99), 7.5)
+
+    def test_compare_results_flags_slower_or_chattier_benchmarks(self):
+        baseline = {'results': {
+            'history': {'p95_ms': 100.0, 'queries': 9},
+            'reports': {'p95_ms': 100.0, 'queries': 300},
+        }}
+        current = {'results': {
+            'history': {'p95_ms': 110.0, 'queries': 9},
+            'reports': {'p95_ms': 150.0, 'queries': 301},
+            'dashboard': {'error': 'NoReverseMatch: project_detail'},
+        }}
+        regressions = compare_results(baseline, current, max_regression=0.2)
+        self.assertEqual(len(regressions), 3)
+        self.assertFalse(any(line.startswith('history') for line in regressions))
+
+
+class SyntheticBenchmarkTest(TestCase):
+    """Test the synthetic dataset generator and the benchmark runner"""
+
+    def _generate(self, seed=7):
+        return SyntheticDataGenerator(
+            projects=2, entries_per_project=5, line_items=2, portfolio_projects=3, seed=seed
+        ).generate()
+
+    def test_generator_creates_linked_rows(self):
+        counts = self._generate()
+        self.assertEqual(counts['site_diary.Project'], 2)
+        self.assertEqual(counts['site_diary.DiaryEntry'], 10)
+        self.assertEqual(counts['portfolio.Project'], 3)
+        self.assertEqual(LaborEntry.objects.count(), counts['site_diary.LaborEntry'])
+        self.assertTrue(User.objects.get(username='synthetic_client').check_password(SYNTHETIC_PASSWORD))
+
+    def test_same_seed_gives_same_data(self):
+        self._generate()
+        first = list(DiaryEntry.objects.order_by('project__name', 'entry_date').values_list('work_description', 'humidity'))
+        delete_dataset()
+        self.assertFalse(DiaryEntry.objects.exists())
+        self._generate()
+        second = list(DiaryEntry.objects.order_by('project__name', 'entry_date').values_list('work_description', 'humidity'))
+        self.assertEqual(first, second)
+
+    def test_run_benchmarks_reports_percentiles_and_queries(self):
+        self._generate()
+        report = run_benchmarks(['history', 'get_project_statistics', 'project_list_api'], iterations=2, warmup=0)
+        self.assertEqual(report['environment']['dataset']['diary_entries'], 10)
+        for result in report['results'].values():
+            self.assertNotIn('error', result)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries'], 0)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestInstrumentationTest(TestCase):
+    """Test request metrics collection, the superadmin endpoint and query budgets"""
+
+    def setUp(self):
+        clear_request_metrics()
+        self.addCleanup(clear_request_metrics)
+
+    def test_request_is_recorded_with_view_and_role(self):
+        self.client.get('/')
+        record = get_recent_request_metrics()[0]
+        self.assertEqual(record['view'], 'core:index')
+        self.assertEqual(record['role'], 'anonymous')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['db_ms'])
+
+    def test_queries_and_slowest_sql_recorded(self):
+        user = User.objects.create_user(username='metrics_user', password='testpass123')
+        self.client.force_login(user)
+        self.client.get('/about/')
+        record = get_recent_request_metrics()[0]
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('SELECT', record['slowest_sql'])
+
+    def test_endpoint_is_superadmin_only(self):
+        user = User.objects.create_user(username='plain_metrics', password='testpass123')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/diagnostics/requests/').status_code, 302)
+
+        superadmin = User.objects.create_superuser('root_metrics', 'root@test.com', 'testpass123')
+        self.client.force_login(superadmin)
+        self.client.get('/about/')
+        response = self.client.get('/diagnostics/requests/?view=core:about')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['requests'][0]['role'], 'superadmin')
+
+    def _budgeted_view(self, budget):
+        @query_budget(budget)
+        def view(request):
+            list(User.objects.all())
+            list(User.objects.all())
+            return HttpResponse('ok')
+        return view
+
+    @override_settings(QUERY_BUDGET_ENFORCE=True)
+    def test_query_budget_fails_when_exceeded(self):
+        request = RequestFactory().get('/')
+        self.assertEqual(self._budgeted_view(2)(request).status_code, 200)
+        with self.assertRaises(QueryBudgetExceeded):
+            self._budgeted_view(1)(request)
+
+    @override_settings(QUERY_BUDGET_ENFORCE=False)
+    def test_query_budget_warns_outside_tests(self):
+        request = RequestFactory().get('/')
+        with self.assertLogs('performance', 'WARNING'):
+            self._budgeted_view(1)(request)
+
+
+class AsgiDeploymentTest(TestCase):
+    """Test that the middleware stack and async views run natively under ASGI"""
+
+    def setUp(self):
+        clear_request_metrics()
+        self.addCleanup(clear_request_metrics)
+        Category.objects.create(name='ASGI Category', slug='asgi-category')
+
+    def test_async_stack_needs_no_sync_adapters(self):
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            logging.getLogger('django.request').debug('loading middleware')
+            ASGIHandler()
+        self.assertEqual([line for line in logs.output if 'adapted' in line], [])
+
+    async def test_async_requests_are_access_controlled_and_measured(self):
+        response = await self.async_client.get('/diary/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/accounts/client/login/', response.url)
+
+        response = await self.async_client.get('/portfolio/api/categories/')
+        self.assertEqual(response.json()['categories'][0]['project_count'], 0)
+        record = get_recent_request_metrics()[0]
+        self.assertEqual((record['view'], record['role']), ('portfolio:categories_api', 'anonymous'))
+        self.assertGreater(record['queries'], 0)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    """Test the concurrent-connection load test against a live server"""
+
+    def test_reports_throughput_and_statuses(self):
+        Category.objects.create(name='Load Category', slug='load-category')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'load.json')
+        out = io.StringIO()
+        call_command(
+            'load_test', '--target', f'live={self.live_server_url}', '--path', '/portfolio/api/categories/',
+            '--concurrency', '1', '--duration', '0.5', '--warmup', '0', '--output', path,
+            stdout=out, stderr=io.StringIO(),
+        )
+        with open(path) as f:
+            result = json.load(f)['targets']['live']
+        self.assertGreater(result['requests'], 0)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['statuses'], {'200': result['requests']})
+        self.assertIn('1.00x', out.getvalue())
+
+        with self.assertRaises(ValueError):
+            run_load_test('localhost:8000', ['/'])
+
+
+class MetricsTest(TestCase):
+    """Test the Prometheus registry, multiprocess merging and /metrics"""
+
+    def setUp(self):
+        REGISTRY.clear()
+        self.addCleanup(REGISTRY.clear)
+
+    def _value(self, metric, **labels):
+        return REGISTRY.snapshot().get(metric.name, {}).get(metric.label_key(labels), 0)
+
+    def test_text_format(self):
+        registry = Registry()
+        requests = Counter('app_requests_total', 'Requests', ('view',), registry=registry)
+        latency = Histogram('app_latency_seconds', 'Latency', buckets=(0.1, 1), registry=registry)
+        requests.inc(view='core:"index"')
+        requests.inc(2, view='core:"index"')
+        latency.observe(0.05)
+        latency.observe(5)
+
+        text = registry.render()
+        self.assertIn('# TYPE app_requests_total counter', text)
+        self.assertIn('app_requests_total{view="core:\\"index\\""} 3', text)
+        self.assertIn('app_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('app_latency_seconds_bucket{le="1"} 1', text)
+        self.assertIn('app_latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('app_latency_seconds_count 2', text)
+        self.assertIn('app_latency_seconds_sum 5.05', text)
+
+    def test_values_merged_across_processes(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        registry = Registry()
+        lockouts = Counter('app_lockouts_total', 'Lockouts', registry=registry)
+
+        with override_settings(METRICS_DIR=metrics_dir, METRICS_FLUSH_INTERVAL=0):
+            lockouts.inc()
+            # Another worker's file
+            with open(os.path.join(metrics_dir, 'metrics-99999-1.json'), 'w') as f:
+                f.write('{"app_lockouts_total": {"[]": 4}}')
+            self.assertIn('app_lockouts_total 5', registry.render())
+            self.assertEqual(len(os.listdir(metrics_dir)), 2)
+
+    def test_endpoint_requires_allowed_ip_or_token(self):
+        self.client.get('/about/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('tripleg_http_requests_total{view="core:about",method="GET",status="200"} 1',
+                      response.content.decode())
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9',
+                                       HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_application_events_are_counted(self):
+        from axes.signals import user_locked_out
+        from django.contrib.auth.models import AnonymousUser
+        from django.core.cache import cache
+        from accounts.utils import log_access_violation, send_otp_email
+
+        log_access_violation(AnonymousUser(), '/diary/', '127.0.0.1', 'media_access_denied')
+        self.assertEqual(self._value(ACCESS_VIOLATIONS, violation_type='media_access_denied'), 1)
+
+        user_locked_out.send(sender=self.__class__, request=None, username='x', ip_address='127.0.0.1')
+        self.assertEqual(self._value(AXES_LOCKOUTS), 1)
+
+        cache.delete('metrics-test')
+        cache.get('metrics-test')
+        cache.set('metrics-test', 1)
+        cache.get('metrics-test')
+        self.assertEqual(self._value(CACHE_REQUESTS, cache='default', result='hit'), 1)
+        self.assertEqual(self._value(CACHE_REQUESTS, cache='default', result='miss'), 1)
+
+        send_otp_email('Verify', 'Your OTP code is 123456', 'noreply@test.com', ['user@test.com'])
+        self.assertEqual(self._value(OTP_EMAILS, status='sent'), 1)
+
+
+class StructuredLoggingTest(SimpleTestCase):
+    """Test the JSON formatter, debug sampling and the queue handler"""
+
+    def _record(self, level=logging.INFO, msg='hello %s', args=('world',), **extra):
+        record = logging.LogRecord('tripleg.test', level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        payload = json.loads(JSONFormatter().format(self._record(user_id=7)))
+        self.assertEqual(payload['message'], 'hello world')
+        self.assertEqual(payload['level'], 'INFO')
+        self.assertEqual(payload['logger'], 'tripleg.test')
+        self.assertEqual(payload['user_id'], 7)
+
+    def test_debug_sampling(self):
+        drop_all = DebugSamplingFilter(rate=0.0)
+        self.assertFalse(drop_all.filter(self._record(level=logging.DEBUG)))
+        self.assertTrue(drop_all.filter(self._record(level=logging.INFO)))
+        self.assertTrue(DebugSamplingFilter(rate=1.0).filter(self._record(level=logging.DEBUG)))
+
+    def test_queue_handler_writes_json_lines_off_thread(self):
+        stream = io.StringIO()
+        handler = AsyncQueueHandler(stream=stream)
+        self.addCleanup(handler.stop)
+        handler.handle(self._record(user_id=3))
+        handler.stop()
+
+        payload = json.loads(stream.getvalue().strip())
+        self.assertEqual(payload['message'], 'hello world')
+        self.assertEqual(payload['user_id'], 3)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = AsyncQueueHandler(queue_size=1, stream=io.StringIO())
+        handler.stop()  # Nothing drains the queue now
+        handler.handle(self._record())
+        handler.handle(self._record())
+        self.assertEqual(handler.dropped, 1)
+
+
+class ProfilingTest(TestCase):
+    """Test the sampling profiler middleware, the capture ring and the profiles command"""
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        self.factory = RequestFactory()
+
+    def _view(self, request):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return HttpResponse('ok')
+
+    def _settings(self, **overrides):
+        values = {
+            'PROFILING_ENABLED': True, 'PROFILING_SAMPLE_RATE': 1.0, 'PROFILING_SLOW_THRESHOLD_MS': 0,
+            'PROFILING_DIR': self.profile_dir, 'PROFILING_MAX_PROFILES': 50,
+        }
+        values.update(overrides)
+        return override_settings(**values)
+
+    def test_disabled_middleware_is_not_used(self):
+        with self._settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(self._view)
+
+    def test_sampled_request_writes_cprofile_and_sql_timeline(self):
+        with self._settings():
+            ProfilingMiddleware(self._view)(self.factory.get('/reports/'))
+            profiles = list_profiles()
+
+        self.assertEqual(len(profiles), 1)
+        capture_id, meta = profiles[0]
+        self.assertEqual(meta['kind'], 'cprofile')
+        self.assertEqual(meta['path'], '/reports/')
+        self.assertEqual(meta['queries'], 1)
+        capture_dir = os.path.join(self.profile_dir, capture_id)
+        self.assertTrue(os.path.exists(os.path.join(capture_dir, 'profile.prof')))
+        with open(os.path.join(capture_dir, 'sql.json')) as f:
+            self.assertIn('SELECT 1', json.load(f)[0]['sql'])
+
+    def test_unsampled_fast_request_is_not_captured(self):
+        with self._settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_SLOW_THRESHOLD_MS=60000):
+            ProfilingMiddleware(self._view)(self.factory.get('/'))
+            self.assertEqual(list_profiles(), [])
+
+    def test_stack_sampler_only_samples_slow_requests(self):
+        sampler = StackSampler(threshold=0.5, interval=0.01)
+        state = sampler.register(time.perf_counter())
+        sampler.sample_once()
+        self.assertFalse(state.samples)
+
+        state.started -= 1
+        sampler.sample_once()
+        sampler.unregister()
+        self.assertEqual(sum(state.samples.values()), 1)
+        self.assertIn('test_stack_sampler_only_samples_slow_requests', next(iter(state.samples)))
+
+    def test_ring_directory_keeps_newest_captures(self):
+        with self._settings(PROFILING_MAX_PROFILES=2):
+            for offset in range(4):
+                meta = {'timestamp': 1000.0 + offset, 'view': 'core:home', 'kind': 'stacks'}
+                save_profile(meta, [], samples=collections.Counter({'a;b': 1}))
+            timestamps = [meta['timestamp'] for _, meta in list_profiles()]
+        self.assertEqual(timestamps, [1003.0, 1002.0])
+
+    def test_profiles_command_lists_and_summarizes(self):
+        with self._settings():
+            ProfilingMiddleware(self._view)(self.factory.get('/reports/'))
+            capture_id = list_profiles()[0][0]
+
+            listing = io.StringIO()
+            call_command('profiles', stdout=listing)
+            summary = io.StringIO()
+            call_command('profiles', capture_id, stdout=summary)
+
+        self.assertIn(capture_id, listing.getvalue())
+        self.assertIn('Top 20 functions by cumulative', summary.getvalue())
+        self.assertIn('SELECT 1', summary.getvalue())
+
+
+class SessionSweepTest(TestCase):
+    """Test batched session cleanup"""
+
+    def _sessions(self, count, expires_in):
+        Session.objects.bulk_create(
+            Session(session_key=f'{expires_in.days}-{i}'.ljust(32, 'x'), session_data='',
+                    expire_date=timezone.now() + expires_in)
+            for i in range(count)
+        )
+
+    def test_sweep_deletes_only_expired_sessions_in_batches(self):
+        self._sessions(7, timedelta(days=-1))
+        self._sessions(3, timedelta(days=1))
+
+        self.assertEqual(delete_sessions(batch_size=2, pause=0, max_batches=2), 4)
+        out = io.StringIO()
+        call_command('sweep_sessions', '--batch-size', '2', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 3 expired sessions', out.getvalue())
+        self.assertEqual(Session.objects.count(), 3)
+
+        self.assertEqual(delete_sessions(expired_only=False, batch_size=2, pause=0), 3)
+        self.assertFalse(Session.objects.exists())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_sessions_skip_the_database(self):
+        user = User.objects.create_user(username='session_user', password='testpass123')
+        self.client.force_login(user)
+        self.client.get('/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/')
+        self.assertFalse([q for q in queries if 'django_session' in q['sql']])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_deleting_sessions_drops_their_cached_copies(self):
+        user = User.objects.create_user(username='session_user', password='testpass123')
+        self.client.force_login(user)
+        key = self.client.session.session_key
+        self.assertIsNotNone(caches['default'].get(f'django.contrib.sessions.cached_db{key}'))
+
+        delete_sessions(expired_only=False, pause=0)
+        self.assertIsNone(caches['default'].get(f'django.contrib.sessions.cached_db{key}'))
+        response = self.client.get('/')
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_cached_sessions_need_a_shared_cache(self):
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            with self.assertRaises(ImproperlyConfigured):
+                check_session_cache()
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'c'}}
+            with override_settings(CACHES=shared):
+                check_session_cache()
+        # The default backend needs no cache
+        check_session_cache()
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions_have_nothing_to_sweep(self):
+        out = io.StringIO()
+        call_command('sweep_sessions', stdout=out)
+        self.assertIn('nothing to sweep', out.getvalue())
@@ -15,4 +15,6 @@ urlpatterns = [
     path('project/', views.project, name='project'),
     path('usersettings/', views.usersettings, name='usersettings'),
     path('user/', user_dashboard_redirect, name='user_dashboard'),  # Redirect for backward compatibility
+    path('diagnostics/requests/', views.request_metrics, name='request_metrics'),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,12 +1,21 @@
+import logging
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.conf import settings
 from django.db import transaction
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_protect
 from accounts.models import Profile
 from accounts.forms import ProfileUpdateForm
-from accounts.decorators import allow_public_access, require_public_role
+from accounts.decorators import allow_public_access, require_public_role, require_superadmin_role
+from .instrumentation import get_recent_request_metrics
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+security_logger = logging.getLogger('security')
 
 @allow_public_access
 def home(request):
@@ -34,8 +43,7 @@ def usersettings(request):
     User Settings View - Ensures each user only sees and edits their own data
     Security: Uses request.user for all queries, never accepts user ID from request
     """
-    # Debug: Print current user info
-    print(f"[DEBUG] USERSETTINGS - Current user: {request.user.username} (ID: {request.user.id})")
+    logger.debug("User settings requested", extra={'user_id': request.user.id})
     
     # SECURITY: Always use request.user - never trust user input for user identification
     current_user = request.user
@@ -43,20 +51,22 @@ def usersettings(request):
     # Get or create profile for the CURRENT USER ONLY
     try:
         profile = Profile.objects.select_for_update().get(user=current_user)
-        print(f"[DEBUG] USERSETTINGS - Found existing profile for user: {current_user.username}")
+        logger.debug("Found existing profile", extra={'user_id': current_user.id, 'profile_id': profile.id})
     except Profile.DoesNotExist:
         # Create profile if it doesn't exist (signal should handle this, but fallback)
         profile = Profile.objects.create(user=current_user, role='customer')
-        print(f"[DEBUG] USERSETTINGS - Created new profile for user: {current_user.username}")
+        logger.info("Created missing profile", extra={'user_id': current_user.id, 'profile_id': profile.id})
     
     # SECURITY CHECK: Verify profile belongs to current user
     if profile.user != current_user:
-        print(f"[SECURITY ERROR] Profile user mismatch! Profile belongs to {profile.user}, current user is {current_user}")
+        security_logger.error(
+            "Profile user mismatch",
+            extra={'user_id': current_user.id, 'profile_id': profile.id, 'profile_user_id': profile.user_id},
+        )
         messages.error(request, 'Security error: Profile access denied.')
         return redirect('core:home')
     
-    print(f"[DEBUG] USERSETTINGS - Profile verified for user: {profile.user.username} (Profile ID: {profile.id})")
-    print(f"[DEBUG] USERSETTINGS - Profile data: phone={profile.phone}, architect={profile.assigned_architect}, project={profile.project_name}")
+    logger.debug("Profile ownership verified", extra={'user_id': current_user.id, 'profile_id': profile.id})
     
     if request.method == 'POST':
         # SECURITY: Pass current_user explicitly to form
@@ -70,7 +80,10 @@ def usersettings(request):
         if form.is_valid():
             # SECURITY: Double-check user ownership before saving
             if profile.user != current_user:
-                print(f"[SECURITY ERROR] Attempted to save profile for wrong user!")
+                security_logger.error(
+                    "Attempted to save profile for wrong user",
+                    extra={'user_id': current_user.id, 'profile_id': profile.id},
+                )
                 messages.error(request, 'Security error: Unauthorized profile update.')
                 return redirect('core:usersettings')
             
@@ -78,8 +91,7 @@ def usersettings(request):
                 # Save with explicit user parameter
                 with transaction.atomic():
                     updated_profile = form.save(user=current_user)
-                    print(f"[DEBUG] USERSETTINGS - Profile updated for user: {updated_profile.user.username}")
-                    print(f"[DEBUG] USERSETTINGS - Updated data: {current_user.first_name} {current_user.last_name}, {updated_profile.phone}, {updated_profile.assigned_architect}")
+                    logger.info("Profile updated", extra={'user_id': current_user.id, 'profile_id': updated_profile.id})
                     
                     # Success message with user's name
                     user_name = current_user.get_full_name() or current_user.username
@@ -88,12 +100,12 @@ def usersettings(request):
                 return redirect('core:usersettings')
                 
             except Exception as e:
-                print(f"[ERROR] USERSETTINGS - Failed to save profile: {str(e)}")
+                logger.exception("Failed to save profile", extra={'user_id': current_user.id})
                 messages.error(request, f'Failed to update profile: {str(e)}')
                 
         else:
             messages.error(request, 'Please correct the errors below.')
-            print(f"[DEBUG] USERSETTINGS - Form errors: {form.errors}")
+            logger.debug("Profile form invalid", extra={'user_id': current_user.id, 'fields': list(form.errors)})
             # Add specific field errors to messages
             for field, errors in form.errors.items():
                 for error in errors:
@@ -110,7 +122,6 @@ def usersettings(request):
             'project_start': profile.project_start or '',
         }
         
-        print(f"[DEBUG] USERSETTINGS - Initial form data: {initial_data}")
         form = ProfileUpdateForm(instance=profile, user=current_user, initial=initial_data)
     
     # SECURITY: Only pass current user's data to template
@@ -128,8 +139,6 @@ def usersettings(request):
         'user_id': current_user.id,
     }
     
-    print(f"[DEBUG] USERSETTINGS - Rendering template for user: {current_user.username}")
-    
     # Add cache-busting timestamp
     import time
     context['cache_buster'] = int(time.time())
@@ -144,4 +153,39 @@ def usersettings(request):
     return response
 
 def login(request):
-    return render(request, 'core/login.html')
\ No newline at end of file
+    return render(request, 'core/login.html')
+
+
+@require_superadmin_role
+@never_cache
+def request_metrics(request):
+    """
+    Recent per-request metrics from this worker's ring buffer (superadmin only).
+
+    Optional ?limit=N and ?view=<view name> narrow the result.
+    """
+    records = get_recent_request_metrics()
+    view_name = request.GET.get('view')
+    if view_name:
+        records = [record for record in records if record['view'] == view_name]
+    try:
+        limit = int(request.GET.get('limit', 100))
+    except ValueError:
+        limit = 100
+    return JsonResponse({'count': len(records[:limit]), 'requests': records[:limit]})
+
+
+@never_cache
+def metrics(request):
+    """
+    Prometheus scrape endpoint (text exposition format).
+
+    Allowed from METRICS_ALLOWED_IPS, or from anywhere with
+    `Authorization: Bearer <METRICS_TOKEN>` when a token is configured.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    has_token = bool(token) and constant_time_compare(authorization, f'Bearer {token}')
+    if not has_token and request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
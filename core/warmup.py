@@ -0,0 +1,88 @@
+"""
+Template warm-up for Triple G BuildHub.
+Compiles every project template into the cached template loader when a
+worker starts, so the first request after a deploy does not pay the parse
+cost for each page it touches.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def get_template_engine():
+    """Return the project's DjangoTemplates engine"""
+    return engines['django'].engine
+
+
+def iter_template_names(engine=None):
+    """
+    Yield the name of every project template reachable by the engine.
+
+    Only directories inside BASE_DIR are scanned: third-party templates (e.g.
+    django.contrib.admin) are left to load on demand.
+    """
+    engine = engine or get_template_engine()
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    seen = set()
+
+    for loader in engine.template_loaders:
+        loaders = loader.loaders if isinstance(loader, CachedLoader) else [loader]
+        for sub_loader in loaders:
+            for directory in sub_loader.get_dirs():
+                directory = os.path.realpath(directory)
+                if not directory.startswith(base_dir) or not os.path.isdir(directory):
+                    continue
+                for root, _dirs, files in os.walk(directory):
+                    for filename in sorted(files):
+                        if not filename.endswith(TEMPLATE_EXTENSIONS):
+                            continue
+                        name = os.path.relpath(os.path.join(root, filename), directory)
+                        name = name.replace(os.sep, '/')
+                        if name not in seen:
+                            seen.add(name)
+                            yield name
+
+
+def warmup_templates(engine=None):
+    """
+    Parse every project template so it lands in the cached loader.
+
+    Templates that fail to compile are logged and skipped; they will raise
+    again, as before, when a view actually renders them.
+
+    Returns:
+        dict: {'compiled': int, 'failed': list of names, 'seconds': float}
+    """
+    engine = engine or get_template_engine()
+    started = time.perf_counter()
+    compiled = 0
+    failed = []
+
+    for name in iter_template_names(engine):
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist, UnicodeDecodeError) as e:
+            failed.append(name)
+            logger.warning(f"Template warm-up skipped {name}: {e}")
+        else:
+            compiled += 1
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Template warm-up compiled {compiled} templates in {seconds * 1000:.0f} ms")
+    return {'compiled': compiled, 'failed': failed, 'seconds': seconds}
+
+
+def reset_template_cache(engine=None):
+    """Empty the cached loader, as in a freshly started worker"""
+    engine = engine or get_template_engine()
+    for loader in engine.template_loaders:
+        if isinstance(loader, CachedLoader):
+            loader.reset()
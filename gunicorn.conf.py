@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration for Triple G BuildHub.
+Gunicorn reads ./gunicorn.conf.py automatically, so both start commands
+pick up these hooks unchanged:
+
+    gunicorn config.wsgi:application                                    # sync workers
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker    # async workers
+
+Under ASGI one worker serves many concurrent requests; async views (the
+portfolio API, OTP resends) await the database and mail server instead of
+holding a thread. `manage.py load_test` compares the two setups.
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    """Drop per-worker metrics files left by a previous master (core.metrics)."""
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, 'metrics-*')):
+            os.remove(path)
+
+
+def post_worker_init(worker):
+    """
+    Compile all templates once the worker has loaded Django.
+
+    post_fork runs before the worker imports the WSGI app, so the warm-up
+    happens here instead; with --preload it still runs per worker because the
+    cached loader is only populated after the fork.
+    """
+    from django.conf import settings
+
+    if settings.TEMPLATE_WARMUP:
+        from core.warmup import warmup_templates
+
+        result = warmup_templates()
+        worker.log.info(
+            "Template warm-up: %d compiled, %d failed in %.0f ms",
+            result['compiled'], len(result['failed']), result['seconds'] * 1000,
+        )
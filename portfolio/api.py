@@ -1,14 +1,35 @@
+"""
+Public JSON API for the portfolio.
+
+The views are async: under ASGI they await the database instead of holding
+a worker thread, and under WSGI Django runs them to completion as usual.
+"""
 from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from .models import Project, Category
 import json
 
 
+async def apaginate(queryset, number, per_page):
+    """
+    Paginator.get_page() for async views: the count and the page's rows are
+    fetched with the async ORM.
+
+    Returns:
+        tuple: (Paginator, Page, list of objects on the page)
+    """
+    paginator = Paginator(queryset, per_page)
+    # Paginator.count is a cached_property; fill it so nothing queries synchronously
+    paginator.count = await queryset.acount()
+    page_obj = paginator.get_page(number)
+    return paginator, page_obj, [obj async for obj in page_obj.object_list]
+
+
 @require_http_methods(["GET"])
-def project_list_api(request):
+async def project_list_api(request):
     """API endpoint for project list with filtering"""
     try:
         # Get filter parameters
@@ -45,12 +66,11 @@ def project_list_api(request):
         
         # Order and paginate
         projects = projects.order_by('-featured', '-completion_date', '-created_at')
-        paginator = Paginator(projects, per_page)
-        page_obj = paginator.get_page(page)
+        paginator, page_obj, page_projects = await apaginate(projects, page, per_page)
         
         # Serialize projects
         projects_data = []
-        for project in page_obj:
+        for project in page_projects:
             project_data = {
                 'id': project.id,
                 'title': project.title,
@@ -95,12 +115,12 @@ def project_list_api(request):
 
 
 @require_http_methods(["GET"])
-def project_detail_api(request, project_id):
+async def project_detail_api(request, project_id):
     """API endpoint for project detail"""
     try:
-        project = Project.objects.select_related('category').prefetch_related(
+        project = await Project.objects.select_related('category').prefetch_related(
             'images', 'stats', 'timeline'
-        ).get(id=project_id)
+        ).aget(id=project_id)
         
         # Serialize project with all related data
         project_data = {
@@ -171,18 +191,18 @@ def project_detail_api(request, project_id):
 
 
 @require_http_methods(["GET"])
-def categories_api(request):
+async def categories_api(request):
     """API endpoint for categories"""
     try:
-        categories = Category.objects.all().order_by('name')
+        categories = Category.objects.annotate(project_count=Count('projects')).order_by('name')
         categories_data = [
             {
                 'id': cat.id,
                 'name': cat.name,
                 'slug': cat.slug,
-                'project_count': cat.projects.count()
+                'project_count': cat.project_count
             }
-            for cat in categories
+            async for cat in categories
         ]
         
         return JsonResponse({
@@ -1,14 +1,46 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from datetime import date
 from portfolio.models import Category, Project, ProjectImage, ProjectStat, ProjectTimeline
+from core.synthetic import SyntheticDataGenerator, delete_dataset
 
 
 class Command(BaseCommand):
     help = 'Seed the database with sample project data'
 
-    @transaction.atomic
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=0,
+            help='Also bulk-load N generated projects with stats and timelines (replaces earlier generated ones)',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per batch/transaction (default: 5000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated data (default: 42)')
+
     def handle(self, *args, **options):
+        self.seed_sample_projects()
+        if options['scale'] > 0:
+            self.load_scaled_data(options)
+
+    def load_scaled_data(self, options):
+        """Bulk-load generated projects on top of the hand-written samples"""
+        started = time.perf_counter()
+        delete_dataset(diary=False)
+        counts = SyntheticDataGenerator(
+            projects=0,
+            portfolio_projects=options['scale'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        ).generate()
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'  {label:28} {count:>12,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s'
+        ))
+
+    @transaction.atomic
+    def seed_sample_projects(self):
         self.stdout.write('Seeding project data...')
         
         # Create categories
@@ -188,13 +220,13 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'Created project: {project.title}')
                 
-                # Create stats
-                for stat_data in stats_data:
-                    ProjectStat.objects.create(project=project, **stat_data)
-                
-                # Create timeline
-                for timeline_item in timeline_data:
-                    ProjectTimeline.objects.create(project=project, **timeline_item)
+                # Create stats and timeline
+                ProjectStat.objects.bulk_create(
+                    ProjectStat(project=project, **stat_data) for stat_data in stats_data
+                )
+                ProjectTimeline.objects.bulk_create(
+                    ProjectTimeline(project=project, **timeline_item) for timeline_item in timeline_data
+                )
             else:
                 self.stdout.write(f'Project already exists: {project.title}')
         
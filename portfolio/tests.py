@@ -1,3 +1,6 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
@@ -196,3 +199,20 @@ class PortfolioAPITest(TestCase):
         self.assertTrue(data['success'])
         self.assertEqual(len(data['categories']), 1)
         self.assertEqual(data['categories'][0]['name'], 'Test Category')
+
+
+class SeedProjectsCommandTest(TestCase):
+    """Test the seed_projects management command"""
+
+    def test_scale_bulk_loads_projects_with_stats_and_timeline(self):
+        call_command('seed_projects', '--scale', '25', '--batch-size', '10', stdout=StringIO())
+        generated = Project.objects.filter(title__startswith='Synthetic Portfolio Project')
+        self.assertEqual(generated.count(), 25)
+        self.assertEqual(ProjectStat.objects.filter(project__in=generated).count(), 50)
+        self.assertEqual(ProjectTimeline.objects.filter(project__in=generated).count(), 125)
+
+        # Re-running replaces the generated projects instead of duplicating them
+        call_command('seed_projects', '--scale', '25', stdout=StringIO())
+        self.assertEqual(generated.count(), 25)
+        self.assertEqual(Project.objects.exclude(title__startswith='Synthetic').count(), 6)
+
@@ -0,0 +1,315 @@
+"""
+Incremental autosave for diary and blog drafts.
+
+The editor does not re-post the whole form every few seconds. It sends only
+what changed since its last save, as a short list of operations on the
+draft's JSON state:
+
+    {"op": "replace", "path": "/entry/work_description", "value": "..."}
+    {"op": "add", "path": "/labor/-", "value": {"trade_description": "..."}}
+    {"op": "remove", "path": "/labor/1"}
+    {"op": "splice", "path": "/body", "at": 120, "remove": 3, "insert": "..."}
+
+Paths are JSON Pointers (RFC 6901). add/replace/remove follow JSON Patch
+(RFC 6902). splice edits a string in place, so typing into a long text field
+costs a few bytes per save rather than the whole field.
+
+Each save is one INSERT of a DraftPatch numbered after the client's `base`.
+A client that is behind (another tab, a lost response) gets the current
+state back to rebase onto. Every DRAFT_CHECKPOINT_EVERY patches the state is
+written back to the draft row and the folded patches are deleted. Restoring
+a draft therefore reads at most that many small rows.
+"""
+import copy
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from blog.models import CATEGORY_CHOICES, PostDraft
+
+from .models import DiaryDraft, DraftPatch
+
+logger = logging.getLogger(__name__)
+
+# Diary state keys: the entry form, then one list per formset prefix
+FORMSET_PREFIXES = ('labor', 'material', 'equipment', 'delay', 'visitor')
+# Blog state keys -> max length (the PostDraft fields of the same name)
+BLOG_FIELDS = {'title': 200, 'category': 30, 'tags': 255, 'body': None}
+BLOG_CATEGORIES = {value for value, _ in CATEGORY_CHOICES}
+
+DRAFT_MODELS = {'diary': DiaryDraft, 'blog': PostDraft}
+OWNER_FIELDS = {'diary': 'user', 'blog': 'author'}
+
+
+class PatchError(ValueError):
+    """The operations are malformed or do not apply to the draft's state"""
+
+
+class PatchConflict(Exception):
+    """The client's base is not the latest save; it has to rebase"""
+
+    def __init__(self, seq, state):
+        super().__init__(f"Draft is at save {seq}")
+        self.seq = seq
+        self.state = state
+
+
+def kind_of(draft):
+    return 'blog' if isinstance(draft, PostDraft) else 'diary'
+
+
+def blank_state(kind):
+    if kind == 'blog':
+        return {field: '' for field in BLOG_FIELDS}
+    return {'entry': {}, **{prefix: [] for prefix in FORMSET_PREFIXES}}
+
+
+def checkpoint_state(draft):
+    """The state as of the draft's last checkpoint"""
+    if kind_of(draft) == 'blog':
+        return {field: getattr(draft, field) for field in BLOG_FIELDS}
+    return {**blank_state('diary'), **copy.deepcopy(draft.state)}
+
+
+def diary_title(state):
+    entry = state.get('entry') or {}
+    text = str(entry.get('title') or entry.get('work_description') or '').strip()
+    return text.splitlines()[0][:200] if text else ''
+
+
+# Applying operations
+
+def _parse_pointer(path):
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise PatchError(f"Invalid path {path!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in path[1:].split('/')]
+
+
+def _list_index(container, token, allow_end):
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit():
+        raise PatchError(f"Invalid list index {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"List index {index} out of range")
+    return index
+
+
+def _resolve(state, tokens):
+    """The container holding the last token of a path"""
+    target = state
+    for token in tokens[:-1]:
+        if isinstance(target, dict) and token in target:
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_list_index(target, token, allow_end=False)]
+        else:
+            raise PatchError(f"Path segment {token!r} not found")
+    if not isinstance(target, (dict, list)):
+        raise PatchError("Path does not point into an object or list")
+    return target
+
+
+def apply_op(state, op):
+    if not isinstance(op, dict):
+        raise PatchError("Each operation must be an object")
+    tokens = _parse_pointer(op.get('path'))
+    container, token = _resolve(state, tokens), tokens[-1]
+    kind = op.get('op')
+
+    if kind in ('add', 'replace'):
+        if 'value' not in op:
+            raise PatchError(f"{kind} needs a value")
+        if isinstance(container, dict):
+            if kind == 'replace' and token not in container:
+                raise PatchError(f"Nothing to replace at {op['path']}")
+            container[token] = op['value']
+        elif kind == 'add':
+            container.insert(_list_index(container, token, allow_end=True), op['value'])
+        else:
+            container[_list_index(container, token, allow_end=False)] = op['value']
+    elif kind == 'remove':
+        if isinstance(container, dict):
+            if token not in container:
+                raise PatchError(f"Nothing to remove at {op['path']}")
+            del container[token]
+        else:
+            del container[_list_index(container, token, allow_end=False)]
+    elif kind == 'splice':
+        key = token if isinstance(container, dict) else _list_index(container, token, allow_end=False)
+        text = container.get(key, '') if isinstance(container, dict) else container[key]
+        at, remove, insert = op.get('at'), op.get('remove', 0), op.get('insert', '')
+        if not isinstance(text, str) or not isinstance(insert, str):
+            raise PatchError("splice only edits strings")
+        if (not isinstance(at, int) or not isinstance(remove, int) or isinstance(at, bool)
+                or at < 0 or remove < 0 or at + remove > len(text)):
+            raise PatchError("splice range is outside the string")
+        container[key] = text[:at] + insert + text[at + remove:]
+    else:
+        raise PatchError(f"Unknown operation {kind!r}")
+
+
+def apply_ops(state, ops):
+    """Return a copy of `state` with the operations applied, all or nothing"""
+    if not isinstance(ops, list) or not ops:
+        raise PatchError("ops must be a non-empty list")
+    state = copy.deepcopy(state)
+    for op in ops:
+        apply_op(state, op)
+    return state
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def validate_state(kind, state):
+    """Reject states the draft could not be saved or restored from"""
+    if not isinstance(state, dict):
+        raise PatchError("Draft state must be an object")
+    if len(json.dumps(state, separators=(',', ':'))) > settings.DRAFT_STATE_MAX_BYTES:
+        raise PatchError("Draft is too large")
+    if kind == 'blog':
+        if set(state) != set(BLOG_FIELDS):
+            raise PatchError("Blog drafts hold title, category, tags and body only")
+        for field, max_length in BLOG_FIELDS.items():
+            if not isinstance(state[field], str) or (max_length and len(state[field]) > max_length):
+                raise PatchError(f"Invalid {field}")
+        if state['category'] and state['category'] not in BLOG_CATEGORIES:
+            raise PatchError("Unknown category")
+        return
+    if not isinstance(state.get('entry'), dict) or not set(state) <= {'entry', *FORMSET_PREFIXES}:
+        raise PatchError("Diary drafts hold the entry form and its formsets only")
+    forms = [state['entry']]
+    for prefix in FORMSET_PREFIXES:
+        rows = state.get(prefix, [])
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise PatchError(f"{prefix} must be a list of objects")
+        forms.extend(rows)
+    if not all(_is_scalar(value) for form in forms for value in form.values()):
+        raise PatchError("Form values must be strings, numbers, booleans or null")
+
+
+# Storage
+
+def create_draft(kind, user, state=None):
+    state = state if state is not None else blank_state(kind)
+    validate_state(kind, state)
+    if kind == 'blog':
+        return PostDraft.objects.create(author=user, **state)
+    return DiaryDraft.objects.create(user=user, state=state, title=diary_title(state))
+
+
+def get_draft(kind, user, pk):
+    """The user's draft, or None"""
+    model = DRAFT_MODELS.get(kind)
+    if model is None:
+        return None
+    return model.objects.filter(pk=pk, **{OWNER_FIELDS[kind]: user}).first()
+
+
+def _replay(draft, patches):
+    seq, state, modified = draft.checkpoint_seq, checkpoint_state(draft), draft.updated_at
+    for patch_seq, ops, created_at in patches:
+        if patch_seq <= seq:
+            continue
+        try:
+            state = apply_ops(state, ops)
+        except PatchError:
+            # Validated when it was stored; never let one row lock the draft
+            logger.warning("Skipping draft patch that no longer applies",
+                           extra={'draft_id': draft.pk, 'seq': patch_seq})
+        seq, modified = patch_seq, max(modified, created_at)
+    return seq, state, modified
+
+
+def _patch_rows(kind, draft_ids):
+    return (
+        DraftPatch.objects.filter(kind=kind, draft_id__in=draft_ids)
+        .order_by('draft_id', 'seq')
+        .values_list('draft_id', 'seq', 'ops', 'created_at')
+    )
+
+
+def load_draft(draft):
+    """(seq, state, last modified) including autosaves since the checkpoint"""
+    patches = _patch_rows(kind_of(draft), [draft.pk]).filter(seq__gt=draft.checkpoint_seq)
+    return _replay(draft, [row[1:] for row in patches])
+
+
+def load_drafts(drafts):
+    """load_draft() for a list of drafts of one kind, with a single query"""
+    if not drafts:
+        return {}
+    by_draft = {draft.pk: [] for draft in drafts}
+    for draft_id, *row in _patch_rows(kind_of(drafts[0]), list(by_draft)):
+        by_draft[draft_id].append(row)
+    return {draft.pk: _replay(draft, by_draft[draft.pk]) for draft in drafts}
+
+
+def write_checkpoint(draft, state, seq):
+    """Store `state` on the draft row and drop the patches it includes"""
+    kind = kind_of(draft)
+    if kind == 'blog':
+        fields = dict(state)
+    else:
+        fields = {'state': state, 'title': diary_title(state)}
+    with transaction.atomic():
+        # Never move a checkpoint backwards if a newer one won the race
+        updated = type(draft).objects.filter(pk=draft.pk, checkpoint_seq__lt=seq).update(
+            checkpoint_seq=seq, updated_at=timezone.now(), **fields
+        )
+        if updated:
+            DraftPatch.objects.filter(kind=kind, draft_id=draft.pk, seq__lte=seq).delete()
+    if updated:
+        for field, value in fields.items():
+            setattr(draft, field, value)
+        draft.checkpoint_seq = seq
+
+
+def save_patch(draft, base, ops):
+    """
+    Append one autosave made on top of save number `base`.
+
+    Returns (seq, state) after the save. Raises PatchConflict if `base` is
+    stale and PatchError if the operations do not apply.
+    """
+    kind = kind_of(draft)
+    seq, state, _ = load_draft(draft)
+    if base != seq:
+        raise PatchConflict(seq, state)
+    state = apply_ops(state, ops)
+    validate_state(kind, state)
+    try:
+        with transaction.atomic():
+            DraftPatch.objects.create(kind=kind, draft_id=draft.pk, seq=seq + 1, ops=ops)
+    except IntegrityError:
+        # Another request saved on the same base first
+        seq, state, _ = load_draft(draft)
+        raise PatchConflict(seq, state)
+    seq += 1
+    if seq - draft.checkpoint_seq >= settings.DRAFT_CHECKPOINT_EVERY:
+        write_checkpoint(draft, state, seq)
+    return seq, state
+
+
+def retire_patches(draft):
+    """After a full form save has overwritten the draft, drop its autosaves"""
+    kind = kind_of(draft)
+    seq = DraftPatch.objects.filter(kind=kind, draft_id=draft.pk).aggregate(seq=Max('seq'))['seq']
+    if seq is None:
+        return
+    with transaction.atomic():
+        # Keep numbering from the last autosave so open editors see a conflict
+        type(draft).objects.filter(pk=draft.pk, checkpoint_seq__lt=seq).update(checkpoint_seq=seq)
+        DraftPatch.objects.filter(kind=kind, draft_id=draft.pk, seq__lte=seq).delete()
+    draft.checkpoint_seq = max(draft.checkpoint_seq, seq)
+
+
+def delete_patches(kind, draft_id):
+    DraftPatch.objects.filter(kind=kind, draft_id=draft_id).delete()
@@ -0,0 +1,84 @@
+"""
+Data for the site diary dashboard.
+
+The counters come from one aggregate query over the projects the user can
+see. A project joins to its diary entries only once, so counting the
+joined rows gives the entry total. The recent projects, entries and delays
+are read with one query each. The whole result is cached per user for
+DIARY_DASHBOARD_CACHE_SECONDS. Staff see every project, so they share one
+cached copy. A repeat visit therefore costs a single cache read.
+
+Writes to a project, a diary entry or a delay drop the cached dashboards of
+the project's manager and architect, and the staff copy (see signals.py).
+Reassigning a project to someone else leaves the previous owner's copy to
+expire on its own. The deletes only reach every worker through a shared
+cache; with the local one, copies are kept for at most
+LOCAL_CACHE_MAX_SECONDS instead (core.cache.cache_timeout).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.cache import cache_timeout
+
+from .models import DelayEntry, DiaryEntry, Project
+
+ALL_PROJECTS_KEY = 'site_diary:dashboard:all'
+RECENT_ITEMS = 5
+
+
+def user_key(user_id):
+    return f'site_diary:dashboard:user:{user_id}'
+
+
+def visible_projects(user):
+    if user.is_staff:
+        return Project.objects.all()
+    return Project.objects.filter(Q(project_manager=user) | Q(architect=user))
+
+
+def project_stats(projects):
+    """The dashboard counters, in a single query"""
+    return projects.aggregate(
+        total_projects=Count('pk', distinct=True),
+        active_projects=Count('pk', filter=Q(status='active'), distinct=True),
+        completed_projects=Count('pk', filter=Q(status='completed'), distinct=True),
+        total_entries=Count('diary_entries'),
+    )
+
+
+def build_dashboard(user):
+    projects = visible_projects(user)
+    return {
+        'projects': list(projects[:RECENT_ITEMS]),
+        'recent_entries': list(
+            DiaryEntry.objects.filter(project__in=projects)
+            .select_related('project', 'created_by').order_by('-created_at')[:RECENT_ITEMS]
+        ),
+        'recent_delays': list(
+            DelayEntry.objects.filter(diary_entry__project__in=projects)
+            .select_related('diary_entry__project').order_by('-diary_entry__entry_date')[:RECENT_ITEMS]
+        ),
+        'stats': project_stats(projects),
+    }
+
+
+def get_dashboard(user):
+    """The user's dashboard context, from the cache when fresh"""
+    key = ALL_PROJECTS_KEY if user.is_staff else user_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(user)
+        cache.set(key, data, cache_timeout(settings.DIARY_DASHBOARD_CACHE_SECONDS))
+    return data
+
+
+def invalidate_dashboards(user_ids):
+    """Drop the staff copy and the given users' dashboards"""
+    cache.delete_many([ALL_PROJECTS_KEY, *(user_key(user_id) for user_id in user_ids if user_id)])
+
+
+def invalidate_project_dashboards(**lookup):
+    """invalidate_dashboards() for the owners of the projects matching `lookup`"""
+    owners = Project.objects.filter(**lookup).values_list('project_manager_id', 'architect_id')
+    invalidate_dashboards({user_id for pair in owners for user_id in pair})
@@ -0,0 +1,369 @@
+"""
+Bulk import of diary entries from CSV or JSON Lines.
+
+One row is one diary entry. Its line items go in optional list fields
+(labor_entries, material_entries, equipment_entries, delay_entries,
+visitor_entries). In JSON Lines these are nested arrays; in CSV they are
+columns holding a JSON array.
+
+    {"project": 3, "entry_date": "2025-03-01", "work_description": "Slab pour",
+     "labor_entries": [{"labor_type": "skilled", "trade_description": "Mason",
+                        "workers_count": 4, "hours_worked": "8"}]}
+
+The file is read row by row and imported in batches, one transaction per
+batch, so memory stays flat however large the file is. Entries are upserted
+on (project, entry_date): an existing entry for that day is overwritten.
+For every line-item list present in the row, that entry's existing items of
+that type are replaced. Item types not mentioned in the row are left alone.
+"""
+import csv
+import io
+import json
+import logging
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from .dashboard import invalidate_project_dashboards
+from .models import (
+    DiaryEntry, LaborEntry, MaterialEntry, EquipmentEntry, DelayEntry, VisitorEntry
+)
+from .sync import append_changes, build_changes, bulk_changes
+from .utils import get_user_projects, validate_diary_entry_data
+
+logger = logging.getLogger(__name__)
+
+# Columns a row may set on DiaryEntry. Approval fields are deliberately not
+# importable.
+ENTRY_FIELDS = [
+    'entry_date', 'weather_condition', 'temperature_high', 'temperature_low', 'humidity',
+    'wind_speed', 'work_description', 'progress_percentage', 'quality_issues',
+    'safety_incidents', 'general_notes', 'photos_taken',
+]
+CHILD_MODELS = {
+    'labor_entries': LaborEntry,
+    'material_entries': MaterialEntry,
+    'equipment_entries': EquipmentEntry,
+    'delay_entries': DelayEntry,
+    'visitor_entries': VisitorEntry,
+}
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportReport:
+    """
+    Totals for one import plus the rejected rows.
+
+    Args:
+        max_errors (int): Rejected rows to keep in `errors`; the rest are only
+            counted (and still passed to `on_error`)
+        on_error (callable): Called with each error dict as it happens, e.g.
+            to stream them to a file
+    """
+
+    def __init__(self, max_errors=100, on_error=None):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.on_error = on_error
+
+    def add_error(self, line, row, messages):
+        self.failed += 1
+        error = {
+            'line': line,
+            'project': row.get('project') if isinstance(row, dict) else None,
+            'entry_date': row.get('entry_date') if isinstance(row, dict) else None,
+            'errors': messages,
+        }
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, file_format):
+    """
+    Yield (line number, row dict) from a text stream without reading it all.
+
+    Rows that cannot be parsed are yielded as (line number, ValueError).
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield reader.line_num, ValueError(f'Invalid CSV: {e}')
+                continue
+            parsed = {}
+            try:
+                for key, value in row.items():
+                    if key is None or value is None:
+                        raise ValueError('Row has a different number of columns than the header')
+                    key = key.strip()
+                    if key in CHILD_MODELS:
+                        parsed[key] = json.loads(value) if value.strip() else []
+                    elif value != '':
+                        parsed[key] = value
+            except ValueError as e:
+                yield reader.line_num, ValueError(str(e))
+                continue
+            yield reader.line_num, parsed
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f'Invalid JSON: {e}')
+                continue
+            if not isinstance(row, dict):
+                yield line_number, ValueError('Each line must be a JSON object')
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f"Unknown format {file_format!r}; expected one of {', '.join(FORMATS)}")
+
+
+def clean_fields(model, data, fields):
+    """
+    Run each field's own cleaning (type conversion, choices, validators).
+
+    Returns:
+        tuple: (cleaned dict, list of error messages)
+    """
+    cleaned = {}
+    errors = []
+    for name in fields:
+        field = model._meta.get_field(name)
+        if name not in data or data[name] in ('', None):
+            if not field.blank and not field.has_default() and not field.null:
+                errors.append(f'{name}: This field is required.')
+            continue
+        try:
+            cleaned[name] = field.clean(data[name], None)
+        except ValidationError as e:
+            errors.append(f"{name}: {' '.join(e.messages)}")
+    return cleaned, errors
+
+
+def child_fields(model):
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != 'diary_entry'
+    ]
+
+
+def clean_children(row):
+    """Clean the line-item lists present in a row"""
+    children = {}
+    errors = []
+    for key, model in CHILD_MODELS.items():
+        if key not in row:
+            continue
+        items = row[key]
+        if not isinstance(items, list):
+            errors.append(f'{key}: Must be a list.')
+            continue
+        fields = child_fields(model)
+        cleaned_items = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append(f'{key}[{index}]: Must be an object.')
+                continue
+            unknown = set(item) - set(fields)
+            if unknown:
+                errors.append(f"{key}[{index}]: Unknown field(s) {', '.join(sorted(unknown))}.")
+                continue
+            cleaned, item_errors = clean_fields(model, item, fields)
+            errors += [f'{key}[{index}].{message}' for message in item_errors]
+            cleaned_items.append(cleaned)
+        children[key] = cleaned_items
+    return children, errors
+
+
+class DiaryImporter:
+    """
+    Import rows into DiaryEntry and its line items on behalf of `user`.
+
+    Rows are only accepted for projects get_user_projects(user) returns, and
+    new entries are recorded as created by `user`.
+    """
+
+    def __init__(self, user, batch_size=1000, report=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.report = report or ImportReport()
+
+    def run(self, stream, file_format):
+        batch = []
+        for line, row in iter_rows(stream, file_format):
+            self.report.rows += 1
+            if isinstance(row, Exception):
+                self.report.add_error(line, {}, [str(row)])
+                continue
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        logger.info('Diary import finished', extra={
+            'user_id': self.user.id,
+            'rows': self.report.rows,
+            'entries_created': self.report.created,
+            'entries_updated': self.report.updated,
+            'rows_rejected': self.report.failed,
+        })
+        return self.report
+
+    def validate_batch(self, batch):
+        """
+        Validate a batch in one go: a single query resolves every project the
+        batch mentions, then each row runs through the field and
+        validate_diary_entry_data rules.
+
+        Returns:
+            list: (line, row, cleaned entry dict, cleaned children) for valid rows
+        """
+        project_ids = set()
+        for _, row in batch:
+            try:
+                project_ids.add(int(row.get('project')))
+            except (TypeError, ValueError):
+                pass
+        allowed = set(
+            get_user_projects(self.user).filter(pk__in=project_ids).values_list('pk', flat=True)
+        )
+
+        valid = []
+        seen = {}
+        for line, row in batch:
+            cleaned, errors = clean_fields(DiaryEntry, row, ENTRY_FIELDS)
+            children, child_errors = clean_children(row)
+            errors += child_errors
+
+            try:
+                project_id = int(row.get('project'))
+            except (TypeError, ValueError):
+                project_id = None
+                errors.append('project: A project id is required.')
+            if project_id is not None and project_id not in allowed:
+                errors.append('project: Unknown project or no access.')
+
+            if not errors:
+                errors = validate_diary_entry_data({**cleaned, 'project': project_id})
+            key = (project_id, cleaned.get('entry_date'))
+            if not errors and key in seen:
+                errors = [f'Duplicate of line {seen[key]} (same project and entry_date).']
+
+            if errors:
+                self.report.add_error(line, row, errors)
+                continue
+            seen[key] = line
+            valid.append((line, row, dict(cleaned, project_id=project_id), children))
+        return valid
+
+    def import_batch(self, batch):
+        valid = self.validate_batch(batch)
+        if not valid:
+            return
+        try:
+            with transaction.atomic(), bulk_changes():
+                self.write_batch(valid)
+        except DatabaseError as e:
+            logger.warning('Diary import batch failed', exc_info=True, extra={'user_id': self.user.id})
+            for line, row, _, _ in valid:
+                self.report.add_error(line, row, [f'Database error: {e}'])
+
+    def write_batch(self, valid):
+        keys = [(cleaned['project_id'], cleaned['entry_date']) for _, _, cleaned, _ in valid]
+        project_ids = {project_id for project_id, _ in keys}
+        dates = {entry_date for _, entry_date in keys}
+        existing = set(
+            DiaryEntry.objects.filter(project_id__in=project_ids, entry_date__in=dates)
+            .values_list('project_id', 'entry_date')
+        ) & set(keys)
+
+        entries = [DiaryEntry(created_by=self.user, **cleaned) for _, _, cleaned, _ in valid]
+        DiaryEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['project', 'entry_date'],
+            update_fields=ENTRY_FIELDS[1:] + ['updated_at'],
+        )
+        if any(entry.pk is None for entry in entries):
+            # Backends that cannot return ids from an upsert
+            ids = {
+                (project_id, entry_date): pk for pk, project_id, entry_date in
+                DiaryEntry.objects.filter(project_id__in=project_ids, entry_date__in=dates)
+                .values_list('pk', 'project_id', 'entry_date')
+            }
+            for entry in entries:
+                entry.pk = ids[(entry.project_id, entry.entry_date)]
+
+        # Per-object signals are off inside bulk_changes(); the batch's change
+        # log rows are written last, as they hold the change log lock until
+        # commit (see sync.append_changes)
+        changes = []
+        for key, model in CHILD_MODELS.items():
+            replaced = [entry.pk for entry, (_, _, _, children) in zip(entries, valid) if key in children]
+            if not replaced:
+                continue
+            old_items = model.objects.filter(diary_entry_id__in=replaced)
+            changes += build_changes(model, old_items.values_list('pk', 'diary_entry_id'), 'd')
+            old_items.delete()
+            created = model.objects.bulk_create([
+                model(diary_entry_id=entry.pk, **item)
+                for entry, (_, _, _, children) in zip(entries, valid)
+                for item in children.get(key, [])
+            ])
+            if any(item.pk is None for item in created):
+                created = model.objects.filter(diary_entry_id__in=replaced)
+            changes += build_changes(model, [(item.pk, item.diary_entry_id) for item in created], 'u')
+        changes += build_changes(DiaryEntry, [(entry.pk, entry.project_id) for entry in entries], 'u')
+        append_changes(changes)
+        # bulk_create() sends no signals: refresh the dashboards here
+        transaction.on_commit(partial(invalidate_project_dashboards, pk__in=project_ids))
+
+        self.report.updated += len(existing)
+        self.report.created += len(entries) - len(existing)
+
+
+def import_diary_file(user, fileobj, file_format, batch_size=1000, report=None, encoding='utf-8-sig'):
+    """
+    Import a binary or text file object.
+
+    Returns:
+        ImportReport
+    """
+    stream = fileobj
+    if not isinstance(fileobj, io.TextIOBase):
+        stream = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+    return DiaryImporter(user, batch_size=batch_size, report=report).run(stream, file_format)
@@ -0,0 +1,70 @@
+import csv
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from site_diary.importer import FORMATS, ImportReport, detect_format, import_diary_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Import diary entries and their line items from a CSV or JSON Lines file '
+        '(upserting on project + entry_date)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument(
+            '--user', required=True,
+            help='Username to import as; only their projects are accepted and new entries are created by them',
+        )
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DIARY_IMPORT_BATCH_SIZE,
+            help=f'Rows per transaction (default: {settings.DIARY_IMPORT_BATCH_SIZE})',
+        )
+        parser.add_argument('--errors', help='Write rejected rows to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        file_format = options['format'] or detect_format(options['path'])
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        try:
+            on_error = None
+            if error_file is not None:
+                writer = csv.writer(error_file)
+                writer.writerow(['line', 'project', 'entry_date', 'errors'])
+
+                def on_error(error):
+                    writer.writerow([error['line'], error['project'], error['entry_date'], '; '.join(error['errors'])])
+
+            report = ImportReport(max_errors=20, on_error=on_error)
+            started = time.perf_counter()
+            if options['path'] == '-':
+                import_diary_file(user, sys.stdin, file_format, options['batch_size'], report)
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                    import_diary_file(user, f, file_format, options['batch_size'], report)
+        finally:
+            if error_file is not None:
+                error_file.close()
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {'; '.join(error['errors'])}")
+        if report.failed > len(report.errors):
+            more = report.failed - len(report.errors)
+            where = f" (all in {options['errors']})" if options['errors'] else ''
+            self.stderr.write(f'... and {more} more rejected rows{where}')
+
+        style = self.style.SUCCESS if not report.failed else self.style.WARNING
+        self.stdout.write(style(
+            f'{report.rows:,} rows in {time.perf_counter() - started:.1f}s: {report.created:,} created, '
+            f'{report.updated:,} updated, {report.failed:,} rejected'
+        ))
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from site_diary.sync import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete delta-sync change log rows older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_CHANGE_RETENTION_DAYS,
+            help=f'Keep this many days of changes (default: SYNC_CHANGE_RETENTION_DAYS={settings.SYNC_CHANGE_RETENTION_DAYS})',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted:,} change log rows'))
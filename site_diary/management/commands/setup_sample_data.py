@@ -1,3 +1,5 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -6,10 +8,32 @@ from site_diary.models import (
     Project, DiaryEntry, LaborEntry, MaterialEntry, 
     EquipmentEntry, DelayEntry, VisitorEntry
 )
+from core.synthetic import SyntheticDataGenerator, delete_dataset
 
 class Command(BaseCommand):
     help = 'Create sample data for site diary app testing'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=0,
+            help='Also bulk-load N generated projects, each with --entries-per-project daily entries '
+                 'and ~10 line items per entry (replaces earlier generated data)',
+        )
+        parser.add_argument(
+            '--entries-per-project', type=int, default=365,
+            help='Daily diary entries per generated project (default: 365)',
+        )
+        parser.add_argument(
+            '--line-items', type=int, default=4,
+            help='Average labor and material items per generated entry (default: 4)',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per batch/transaction (default: 5000)')
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Load the line-item tables with Postgres COPY instead of INSERT',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated data (default: 42)')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Creating sample data for site diary app...'))
         
@@ -219,3 +243,28 @@ class Command(BaseCommand):
         self.stdout.write(f'  - Admin: admin/admin123')
         self.stdout.write(f'  - Project Manager: pm_john/pm123')
         self.stdout.write(f'  - Architect: arch_jane/arch123')
+
+        if options['scale'] > 0:
+            self.load_scaled_data(options)
+
+    def load_scaled_data(self, options):
+        """Bulk-load generated projects on top of the hand-written samples"""
+        started = time.perf_counter()
+        self.stdout.write(f"Generating {options['scale']} projects...")
+        delete_dataset(portfolio=False)
+        counts = SyntheticDataGenerator(
+            projects=options['scale'],
+            entries_per_project=options['entries_per_project'],
+            line_items=options['line_items'],
+            portfolio_projects=0,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            use_copy=options['copy'],
+            stdout=self.stdout,
+        ).generate()
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'  {label:28} {count:>12,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s '
+            f'(generated users log in with core.synthetic.PASSWORD)'
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_diary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('project_id', models.BigIntegerField(blank=True, null=True)),
+                ('diary_entry_id', models.BigIntegerField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('u', 'Upsert'), ('d', 'Delete')], max_length=1)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project_id', 'id'], name='site_diary__project_0a6205_idx'), models.Index(fields=['diary_entry_id', 'id'], name='site_diary__diary_e_15e734_idx'), models.Index(fields=['changed_at'], name='site_diary__changed_711b5d_idx')],
+            },
+        ),
+    ]
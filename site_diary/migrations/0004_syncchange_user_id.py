@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_diary', '0003_draft_autosave'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncchange',
+            name='user_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['user_id', 'id'], name='site_diary__user_id_753832_idx'),
+        ),
+    ]
@@ -244,3 +244,88 @@ class DiaryPhoto(models.Model):
     
     def __str__(self):
         return f"Photo for {self.diary_entry} - {self.caption}"
+
+class SyncChange(models.Model):
+    """
+    Change log behind the delta-sync API: one row per saved or deleted diary
+    entry or line item, and one per user who lost or gained sight of a
+    project. The auto-increment id is the change sequence clients sync from.
+    """
+    ACTIONS = [
+        ('u', 'Upsert'),
+        ('d', 'Delete'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # Set for diary entries; line items are scoped through diary_entry_id
+    project_id = models.BigIntegerField(null=True, blank=True)
+    diary_entry_id = models.BigIntegerField(null=True, blank=True)
+    # Project access rows ('projects'): the user who lost or gained the
+    # project; null on a deletion means every staff user
+    user_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=1, choices=ACTIONS)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'id']),
+            models.Index(fields=['diary_entry_id', 'id']),
+            models.Index(fields=['user_id', 'id']),
+            models.Index(fields=['changed_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.get_action_display()} {self.model} {self.object_id}"
+
+class DiaryDraft(models.Model):
+    """
+    An unsaved diary entry, autosaved while it is being written. `state` is
+    the last checkpoint: {"entry": {...}, "labor": [{...}], ...}, keyed like
+    the diary form and its formset prefixes. Edits since then are
+    DraftPatch rows after `checkpoint_seq` (see site_diary.autosave).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='diary_drafts')
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='diary_drafts')
+    title = models.CharField(max_length=200, blank=True)
+    state = models.JSONField(default=dict)
+    checkpoint_seq = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at']),
+        ]
+
+    def __str__(self):
+        return self.title or f"Untitled diary draft {self.pk}"
+
+class DraftPatch(models.Model):
+    """
+    One autosave of a diary or blog draft: the edit operations sent by the
+    client, numbered per draft. Rows are only ever inserted, then deleted
+    once a checkpoint has folded them into the draft.
+    """
+    KINDS = [
+        ('diary', 'Diary entry'),
+        ('blog', 'Blog post'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    draft_id = models.BigIntegerField()
+    seq = models.PositiveIntegerField()
+    ops = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Also the lookup index; rejects a second write on the same base
+            models.UniqueConstraint(fields=['kind', 'draft_id', 'seq'], name='unique_draft_patch_seq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} draft {self.draft_id} #{self.seq}"
@@ -0,0 +1,84 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .autosave import DRAFT_MODELS, delete_patches, kind_of
+from .dashboard import invalidate_dashboards, invalidate_project_dashboards
+from .models import DelayEntry, DiaryEntry, Project
+from .sync import SYNC_MODELS, access_changes, append_changes, change_for, recording_suppressed
+
+
+def record_sync_upsert(sender, instance, raw=False, **kwargs):
+    """Log saved diary entries and line items for the delta-sync API"""
+    if not raw and not recording_suppressed():
+        append_changes([change_for(instance, 'u')])
+
+
+def record_sync_delete(sender, instance, **kwargs):
+    """Log deleted diary entries and line items as sync tombstones"""
+    if not recording_suppressed():
+        append_changes([change_for(instance, 'd')])
+
+
+def remember_project_owners(sender, instance, raw=False, **kwargs):
+    """Note who could see the project before the save (see record_project_access)"""
+    instance._old_owners = ()
+    if instance.pk and not raw:
+        instance._old_owners = Project.objects.filter(pk=instance.pk).values_list(
+            'project_manager_id', 'architect_id'
+        ).first() or ()
+
+
+def record_project_access(sender, instance, created, raw=False, **kwargs):
+    """Log the users who lost or gained the project by a change of owners"""
+    owners = (instance.project_manager_id, instance.architect_id)
+    if not created and not raw and not recording_suppressed():
+        changes = access_changes(instance.pk, getattr(instance, '_old_owners', owners), owners)
+        if changes:
+            append_changes(changes)
+
+
+def record_project_delete(sender, instance, **kwargs):
+    """Log project tombstones for everyone who could see the deleted project"""
+    if not recording_suppressed():
+        owners = (instance.project_manager_id, instance.architect_id)
+        append_changes(access_changes(instance.pk, owners, (), deleted=True))
+
+
+def delete_draft_patches(sender, instance, **kwargs):
+    """Drop a deleted draft's pending autosaves"""
+    delete_patches(kind_of(instance), instance.pk)
+
+
+def project_changed(sender, instance, **kwargs):
+    """Drop the cached dashboards that list the project"""
+    owners = [instance.project_manager_id, instance.architect_id]
+    transaction.on_commit(partial(invalidate_dashboards, owners))
+
+
+def diary_entry_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_project_dashboards, pk=instance.project_id))
+
+
+def delay_entry_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_project_dashboards, diary_entries=instance.diary_entry_id))
+
+
+# Connected per model: a sender-less receiver would stop Django from
+# fast-deleting every other model too
+for model in SYNC_MODELS.values():
+    post_save.connect(record_sync_upsert, sender=model, dispatch_uid=f'sync_upsert_{model.__name__}')
+    post_delete.connect(record_sync_delete, sender=model, dispatch_uid=f'sync_delete_{model.__name__}')
+
+pre_save.connect(remember_project_owners, sender=Project, dispatch_uid='sync_owners_Project')
+post_save.connect(record_project_access, sender=Project, dispatch_uid='sync_access_Project')
+post_delete.connect(record_project_delete, sender=Project, dispatch_uid='sync_delete_Project')
+
+for kind, model in DRAFT_MODELS.items():
+    post_delete.connect(delete_draft_patches, sender=model, dispatch_uid=f'draft_patches_{kind}')
+
+for model, receiver in ((Project, project_changed), (DiaryEntry, diary_entry_changed),
+                        (DelayEntry, delay_entry_changed)):
+    post_save.connect(receiver, sender=model, dispatch_uid=f'dashboard_save_{model.__name__}')
+    post_delete.connect(receiver, sender=model, dispatch_uid=f'dashboard_delete_{model.__name__}')
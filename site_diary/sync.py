@@ -0,0 +1,333 @@
+"""
+Delta sync for offline site clients.
+
+Every save or delete of a DiaryEntry or one of its line items appends a
+SyncChange row (see signals.py), whose id is a monotonic change sequence. A
+client keeps a local copy current like this:
+
+  1. Call with no cursor. This returns a snapshot of everything it can see,
+     page by page. The last page's cursor points at the change sequence as
+     it was when the snapshot started.
+  2. Then call with that cursor. Each page holds the records changed since,
+     with the current values of upserted rows and tombstones for deleted
+     ones. Each page also returns the next cursor.
+
+Pages are columnar ({"fields": [...], "rows": [[...], ...]}) to keep them
+small. The view gzips them.
+
+A user can also lose a project, because it was deleted or they stopped
+being its manager or architect. The project's own rows then leave their
+feed, so a project tombstone is logged for them instead, and the page lists
+it under deleted["projects"]: the client drops that project's entries and
+line items. Gaining a project answers with a CursorError instead, which
+tells the client to take a fresh snapshot that includes it.
+
+Cursors move forward by id, so ids must follow commit order. A sequence
+hands ids out at INSERT time, and a slow transaction could otherwise commit
+a lower id after clients had moved past a higher one. append_changes() makes
+the order hold (see there), so every committed change is safe to serve at
+once.
+"""
+import base64
+import contextvars
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import (
+    DiaryEntry, LaborEntry, MaterialEntry, EquipmentEntry, DelayEntry, VisitorEntry, SyncChange
+)
+from .utils import get_user_projects
+
+# Key in the sync payload -> model, in snapshot order
+SYNC_MODELS = {
+    'diary_entries': DiaryEntry,
+    'labor_entries': LaborEntry,
+    'material_entries': MaterialEntry,
+    'equipment_entries': EquipmentEntry,
+    'delay_entries': DelayEntry,
+    'visitor_entries': VisitorEntry,
+}
+MODEL_KEYS = {model: key for key, model in SYNC_MODELS.items()}
+# Change log key of project access rows (see access_changes())
+PROJECT_KEY = 'projects'
+
+# PostgreSQL advisory lock id serialising change log inserts
+CHANGE_LOG_LOCK_ID = 7_180_371_201
+
+_recording_suppressed = contextvars.ContextVar('sync_recording_suppressed', default=False)
+
+# Sent after append_changes() inserts rows, inside the writer's transaction
+changes_appended = Signal()
+
+
+class CursorError(ValueError):
+    """The cursor is malformed or older than the change log retention"""
+
+
+# Recording changes
+
+def change_for(instance, action):
+    model = type(instance)
+    if model is DiaryEntry:
+        return SyncChange(
+            model=MODEL_KEYS[model], object_id=instance.pk, project_id=instance.project_id,
+            diary_entry_id=instance.pk, action=action,
+        )
+    return SyncChange(
+        model=MODEL_KEYS[model], object_id=instance.pk, diary_entry_id=instance.diary_entry_id, action=action,
+    )
+
+
+def recording_suppressed():
+    return _recording_suppressed.get()
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Turn off per-object change recording, for code that records its changes
+    with record_changes() in bulk instead.
+    """
+    token = _recording_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _recording_suppressed.reset(token)
+
+
+def append_changes(changes):
+    """
+    Insert SyncChange rows so that their ids follow commit order.
+
+    On PostgreSQL the insert first takes a transaction-scoped advisory lock,
+    held until the surrounding transaction ends. Only one transaction at a
+    time can then hold uncommitted changes, and it took its ids after every
+    committed one. SQLite already runs one writing transaction at a time.
+    Writers wait on the lock from their first change until they commit, so
+    long transactions should record their changes last (see the importer).
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGE_LOG_LOCK_ID])
+        SyncChange.objects.bulk_create(changes, batch_size=1000)
+    changes_appended.send(sender=SyncChange, changes=changes)
+
+
+def build_changes(model, rows, action):
+    """
+    Unsaved SyncChange rows, for append_changes().
+
+    Args:
+        model: A SYNC_MODELS model
+        rows: (object id, diary entry id) pairs; for DiaryEntry, (id, project id)
+        action (str): 'u' for created/updated, 'd' for deleted
+    """
+    key = MODEL_KEYS[model]
+    if model is DiaryEntry:
+        return [
+            SyncChange(model=key, object_id=pk, project_id=project_id, diary_entry_id=pk, action=action)
+            for pk, project_id in rows
+        ]
+    return [SyncChange(model=key, object_id=pk, diary_entry_id=entry_id, action=action) for pk, entry_id in rows]
+
+
+def access_changes(project_id, before, after, deleted=False):
+    """
+    Unsaved SyncChange rows for the users who lost ('d') or gained ('u') a
+    project, for append_changes().
+
+    Args:
+        before, after: ids of the project's manager and architect before and
+            after the change (None entries are ignored)
+        deleted (bool): The project itself is gone, so staff lose it too
+    """
+    before, after = set(before) - {None}, set(after) - {None}
+    changes = [
+        SyncChange(model=PROJECT_KEY, object_id=project_id, user_id=user_id, action=action)
+        for action, user_ids in (('d', before - after), ('u', after - before))
+        for user_id in sorted(user_ids)
+    ]
+    if deleted:
+        changes.append(SyncChange(model=PROJECT_KEY, object_id=project_id, action='d'))
+    return changes
+
+
+def record_changes(model, rows, action):
+    """Record changes in one INSERT (arguments as for build_changes())"""
+    append_changes(build_changes(model, rows, action))
+
+
+# Cursors
+
+def encode_cursor(seq, timestamp, snapshot=None):
+    payload = {'s': seq, 't': int(timestamp.timestamp())}
+    if snapshot is not None:
+        payload['p'] = snapshot
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (seq, timestamp, snapshot position or None)
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        seq = int(payload['s'])
+        timestamp = datetime.fromtimestamp(int(payload['t']), tz=dt_timezone.utc)
+        snapshot = payload.get('p')
+        if snapshot is not None:
+            snapshot = [int(snapshot[0]), int(snapshot[1])]
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise CursorError('Invalid cursor')
+
+    retention = timedelta(days=settings.SYNC_CHANGE_RETENTION_DAYS)
+    if snapshot is None and timestamp < timezone.now() - retention:
+        raise CursorError('Cursor is older than the change log; sync again without a cursor')
+    return seq, timestamp, snapshot
+
+
+# Serialisation
+
+def sync_fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def serialize_rows(model, queryset):
+    fields = sync_fields(model)
+    return {'fields': fields, 'rows': [list(row) for row in queryset.values_list(*fields)]}
+
+
+def scope(model, projects):
+    """Restrict a SYNC_MODELS queryset to the given projects"""
+    if model is DiaryEntry:
+        return model.objects.filter(project__in=projects)
+    return model.objects.filter(diary_entry__project__in=projects)
+
+
+# Pages
+
+def snapshot_page(user, seq, started, position, limit):
+    """One page of the initial snapshot, walking SYNC_MODELS in id order"""
+    projects = get_user_projects(user)
+    model_index, last_id = position
+    keys = list(SYNC_MODELS)
+    key = keys[model_index]
+    model = SYNC_MODELS[key]
+
+    queryset = scope(model, projects).filter(pk__gt=last_id).order_by('pk')[:limit]
+    page = serialize_rows(model, queryset)
+    changes = {key: page} if page['rows'] else {}
+
+    if len(page['rows']) == limit:
+        next_position = [model_index, page['rows'][-1][0]]
+    elif model_index + 1 < len(keys):
+        next_position = [model_index + 1, 0]
+    else:
+        next_position = None
+
+    return {
+        'cursor': encode_cursor(seq, started, next_position),
+        'has_more': next_position is not None,
+        'snapshot': True,
+        'changes': changes,
+        'deleted': {},
+    }
+
+
+def changes_page(user, seq, limit):
+    """Records changed after change sequence `seq`, compacted per object"""
+    projects = get_user_projects(user)
+    visible = Q(project_id__in=projects.values('pk')) | Q(
+        diary_entry_id__in=DiaryEntry.objects.filter(project__in=projects).values('pk')
+    ) | Q(model=PROJECT_KEY, user_id=user.pk)
+    if user.is_staff:
+        visible |= Q(model=PROJECT_KEY, user_id__isnull=True)
+    batch = list(
+        SyncChange.objects.filter(visible, pk__gt=seq)
+        .order_by('pk').values_list('pk', 'model', 'object_id', 'action', 'changed_at')[:limit]
+    )
+
+    # Only the latest change to each object matters
+    latest = {}
+    for pk, model_key, object_id, action, changed_at in batch:
+        latest[(model_key, object_id)] = action
+
+    changes = {}
+    deleted = {}
+    access = {object_id: action for (model_key, object_id), action in latest.items() if model_key == PROJECT_KEY}
+    if access:
+        # Judge by what the user sees now: staff keep deleted owners' projects,
+        # and a project lost and regained within the batch is still theirs
+        current = set(projects.filter(pk__in=access).values_list('pk', flat=True))
+        if any(action == 'u' for project_id, action in access.items() if project_id in current):
+            raise CursorError('Your projects have changed; sync again without a cursor')
+        removed = sorted(project_id for project_id in access if project_id not in current)
+        if removed:
+            deleted[PROJECT_KEY] = removed
+
+    for key, model in SYNC_MODELS.items():
+        upserted = [object_id for (model_key, object_id), action in latest.items()
+                    if model_key == key and action == 'u']
+        removed = [object_id for (model_key, object_id), action in latest.items()
+                   if model_key == key and action == 'd']
+        if upserted:
+            page = serialize_rows(model, scope(model, projects).filter(pk__in=upserted).order_by('pk'))
+            # Gone since (deleted by a change on a later page) or moved out of reach
+            found = {row[0] for row in page['rows']}
+            removed += [object_id for object_id in upserted if object_id not in found]
+            if page['rows']:
+                changes[key] = page
+        if removed:
+            deleted[key] = sorted(removed)
+
+    if batch:
+        next_seq, changed_at = batch[-1][0], batch[-1][4]
+    else:
+        next_seq, changed_at = seq, timezone.now()
+    return {
+        'cursor': encode_cursor(next_seq, changed_at),
+        'has_more': len(batch) == limit,
+        'snapshot': False,
+        'changes': changes,
+        'deleted': deleted,
+    }
+
+
+def get_sync_page(user, cursor=None, limit=None):
+    """
+    Returns:
+        dict: The JSON payload for one sync request
+    """
+    limit = max(1, min(limit or settings.SYNC_PAGE_SIZE, settings.SYNC_PAGE_SIZE))
+    if not cursor:
+        started = timezone.now()
+        seq = SyncChange.objects.aggregate(seq=Max('pk'))['seq'] or 0
+        return snapshot_page(user, seq, started, [0, 0], limit)
+
+    seq, timestamp, snapshot = decode_cursor(cursor)
+    if snapshot is not None:
+        if not 0 <= snapshot[0] < len(SYNC_MODELS):
+            raise CursorError('Invalid cursor')
+        return snapshot_page(user, seq, timestamp, snapshot, limit)
+    return changes_page(user, seq, limit)
+
+
+def prune_changes(days=None):
+    """
+    Delete change log rows older than SYNC_CHANGE_RETENTION_DAYS.
+
+    Returns:
+        int: Rows deleted
+    """
+    days = settings.SYNC_CHANGE_RETENTION_DAYS if days is None else days
+    deleted, _ = SyncChange.objects.filter(changed_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
@@ -1,16 +1,35 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import date, timedelta
 from decimal import Decimal
 
+from core.cache import InstrumentedLocMemCache
+
 from .models import (
     Project, DiaryEntry, LaborEntry, MaterialEntry, 
-    EquipmentEntry, DelayEntry, VisitorEntry, DiaryPhoto
+    EquipmentEntry, DelayEntry, VisitorEntry, DiaryPhoto, SyncChange,
+    DiaryDraft, DraftPatch
 )
+from .autosave import PatchError, apply_ops, load_draft
+from .dashboard import get_dashboard, project_stats, visible_projects
 from .utils import (
     get_user_projects, get_project_statistics, 
-    validate_diary_entry_data, generate_diary_report
+    validate_diary_entry_data, generate_diary_report,
+    attach_signed_photo_urls
 )
 
 
@@ -324,3 +343,515 @@ class UtilsTestCase(TestCase):
         self.assertEqual(len(entries), 2)
         # Should be ordered by entry_date (ascending)
         self.assertTrue(entries[0].entry_date <= entries[1].entry_date)
+
+    def test_attach_signed_photo_urls_single_query(self):
+        """Test that a page of entries gets signed photo URLs in one query"""
+        DiaryPhoto.objects.create(diary_entry=self.diary_entry1, photo='diary_photos/2025/01/01/a.jpg', caption='A')
+        DiaryPhoto.objects.create(diary_entry=self.diary_entry1, photo='diary_photos/2025/01/01/b.jpg')
+        DiaryPhoto.objects.create(diary_entry=self.diary_entry2, photo='diary_photos/2025/01/02/c.jpg')
+        entries = [self.diary_entry1, self.diary_entry2]
+        
+        with self.assertNumQueries(1):
+            attach_signed_photo_urls(entries)
+        
+        self.assertEqual(len(self.diary_entry1.photo_urls), 2)
+        self.assertEqual(self.diary_entry1.photo_urls[0]['caption'], 'A')
+        self.assertIn('signature=', self.diary_entry2.photo_urls[0]['url'])
+        self.assertTrue(self.diary_entry2.photo_urls[0]['url'].startswith('/media/diary_photos/2025/01/02/c.jpg?'))
+
+
+class HistoryViewTestCase(TestCase):
+    """Test the diary history view stays within its query budget"""
+
+    def test_history_query_count_independent_of_entries(self):
+        """History issues a fixed number of queries however many entries exist"""
+        manager = User.objects.create_user(username='pm_history', password='testpass123', is_staff=True)
+        project = Project.objects.create(
+            name='History Project',
+            client_name='Client',
+            project_manager=manager,
+            location='Site',
+            start_date=date.today() - timedelta(days=30),
+            expected_end_date=date.today() + timedelta(days=100),
+            budget=Decimal('1000.00'),
+            status='active'
+        )
+        for day in range(12):
+            entry = DiaryEntry.objects.create(
+                project=project,
+                entry_date=date.today() - timedelta(days=day),
+                created_by=manager,
+                work_description=f'Day {day}'
+            )
+            LaborEntry.objects.create(
+                diary_entry=entry, labor_type='skilled', trade_description='Masons',
+                workers_count=2, hours_worked=Decimal('8.0'), hourly_rate=Decimal('20.00')
+            )
+        
+        self.client.force_login(manager)
+        # Raises QueryBudgetExceeded under the test runner if over budget
+        response = self.client.get('/diary/history/')
+        self.assertEqual(response.status_code, 200)
+
+
+class SetupSampleDataCommandTest(TestCase):
+    """Test the setup_sample_data management command"""
+
+    def test_scale_bulk_loads_generated_projects(self):
+        call_command(
+            'setup_sample_data', '--scale', '3', '--entries-per-project', '10', '--batch-size', '7',
+            stdout=StringIO(),
+        )
+        generated = Project.objects.filter(name__startswith='Synthetic Project')
+        self.assertEqual(generated.count(), 3)
+        self.assertEqual(DiaryEntry.objects.filter(project__in=generated).count(), 30)
+        self.assertTrue(LaborEntry.objects.filter(diary_entry__project__in=generated).exists())
+        self.assertTrue(MaterialEntry.objects.filter(diary_entry__project__in=generated).exists())
+
+        # The hand-written samples are still created alongside
+        self.assertTrue(Project.objects.filter(name='Downtown Office Complex').exists())
+
+
+class DiaryImportTestCase(TestCase):
+    """Test the CSV/JSON Lines diary importer, its command and upload endpoint"""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='pm_import', password='testpass123')
+        self.outsider = User.objects.create_user(username='outsider_import', password='testpass123')
+        self.project = Project.objects.create(
+            name='Import Project',
+            client_name='Client',
+            project_manager=self.manager,
+            location='Site',
+            start_date=date(2025, 1, 1),
+            expected_end_date=date(2025, 12, 31),
+            budget=Decimal('1000.00'),
+            status='active'
+        )
+
+    def _csv(self, *rows):
+        header = 'project,entry_date,work_description,humidity,labor_entries\n'
+        return header + ''.join(rows)
+
+    def _labor(self, workers):
+        items = [{'labor_type': 'skilled', 'trade_description': 'Mason', 'workers_count': workers, 'hours_worked': '8'}]
+        return '"' + json.dumps(items).replace('"', '""') + '"'
+
+    def test_command_imports_and_upserts_with_error_report(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'diary.csv')
+        errors_path = path + '.errors.csv'
+        with open(path, 'w') as f:
+            f.write(self._csv(
+                f'{self.project.id},2025-03-01,Slab pour,60,{self._labor(4)}\n',
+                f'{self.project.id},2025-03-02,Rebar,150,\n',
+                f'{self.project.id},not-a-date,Walls,60,\n',
+            ))
+        call_command('import_diary', path, '--user', 'pm_import', '--errors', errors_path,
+                     stdout=StringIO(), stderr=StringIO())
+
+        entry = DiaryEntry.objects.get(project=self.project, entry_date=date(2025, 3, 1))
+        self.assertEqual(entry.created_by, self.manager)
+        self.assertEqual(entry.labor_entries.get().workers_count, 4)
+        with open(errors_path) as f:
+            error_lines = f.read().splitlines()
+        self.assertEqual(len(error_lines), 3)
+        self.assertIn('Humidity must be between 0 and 100', error_lines[1])
+        self.assertIn('entry_date', error_lines[2])
+
+        # Same day again: the entry is updated and its labor items replaced
+        with open(path, 'w') as f:
+            f.write(self._csv(f'{self.project.id},2025-03-01,Slab pour revised,70,{self._labor(6)}\n'))
+        call_command('import_diary', path, '--user', 'pm_import', stdout=StringIO())
+        entry.refresh_from_db()
+        self.assertEqual(entry.work_description, 'Slab pour revised')
+        self.assertEqual(list(entry.labor_entries.values_list('workers_count', flat=True)), [6])
+        self.assertEqual(DiaryEntry.objects.filter(project=self.project).count(), 1)
+
+    def test_change_log_is_written_last_in_one_insert(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .importer import import_diary_file
+        body = self._csv(f'{self.project.id},2025-03-01,Slab pour,60,{self._labor(4)}\n')
+        with CaptureQueriesContext(connection) as queries:
+            import_diary_file(self.manager, StringIO(body), 'csv')
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertIn('site_diary_syncchange', writes[-1])
+        self.assertEqual(sum('site_diary_syncchange' in sql for sql in writes), 1)
+        self.assertEqual(SyncChange.objects.count(), 2)
+
+    def test_upload_endpoint_rejects_projects_without_access(self):
+        lines = [
+            {'project': self.project.id, 'entry_date': '2025-04-01', 'work_description': 'Formwork'},
+            {'project': self.project.id, 'entry_date': '2025-04-01', 'work_description': 'Duplicate'},
+        ]
+        body = ''.join(json.dumps(line) + '\n' for line in lines).encode()
+
+        self.client.force_login(self.outsider)
+        response = self.client.post('/diary/import/', {'file': SimpleUploadedFile('diary.jsonl', body)})
+        self.assertEqual(response.json()['failed'], 2)
+        self.assertIn('no access', response.json()['errors'][0]['errors'][0])
+        self.assertFalse(DiaryEntry.objects.exists())
+
+        # Files above FILE_UPLOAD_MAX_MEMORY_SIZE are streamed from a temp file
+        self.client.force_login(self.manager)
+        with self.settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0):
+            response = self.client.post('/diary/import/', {'file': SimpleUploadedFile('diary.jsonl', body)})
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 1))
+        self.assertIn('Duplicate of line 1', data['errors'][0]['errors'][0])
+
+
+@override_settings(SYNC_PAGE_SIZE=2)
+class SyncApiTestCase(TestCase):
+    """Test the delta-sync feed for offline clients"""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='pm_sync', password='testpass123')
+        self.outsider = User.objects.create_user(username='outsider_sync', password='testpass123')
+        self.project = self._project('Sync Project', self.manager)
+        self.other_project = self._project('Other Project', self.outsider)
+        self.entries = [
+            DiaryEntry.objects.create(
+                project=self.project, entry_date=date(2025, 2, day), created_by=self.manager,
+                work_description=f'Day {day}',
+            )
+            for day in (1, 2, 3)
+        ]
+        self.labor = LaborEntry.objects.create(
+            diary_entry=self.entries[0], labor_type='skilled', trade_description='Mason',
+            workers_count=3, hours_worked=Decimal('8'),
+        )
+        DiaryEntry.objects.create(
+            project=self.other_project, entry_date=date(2025, 2, 1), created_by=self.outsider,
+            work_description='Hidden',
+        )
+        self.client.force_login(self.manager)
+
+    def _project(self, name, manager):
+        return Project.objects.create(
+            name=name, client_name='Client', project_manager=manager, location='Site',
+            start_date=date(2025, 1, 1), expected_end_date=date(2025, 12, 31),
+            budget=Decimal('1000.00'), status='active'
+        )
+
+    def _sync(self, cursor=None):
+        response = self.client.get('/diary/api/sync/', {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _rows(self, page, key):
+        table = page['changes'].get(key, {'fields': [], 'rows': []})
+        return [dict(zip(table['fields'], row)) for row in table['rows']]
+
+    def test_snapshot_then_incremental_changes(self):
+        pages = [self._sync()]
+        while pages[-1]['has_more']:
+            pages.append(self._sync(pages[-1]['cursor']))
+        self.assertTrue(all(page['snapshot'] for page in pages))
+        entries = [row for page in pages for row in self._rows(page, 'diary_entries')]
+        self.assertEqual(sorted(row['id'] for row in entries), sorted(e.id for e in self.entries))
+        labor = [row for page in pages for row in self._rows(page, 'labor_entries')]
+        self.assertEqual([row['id'] for row in labor], [self.labor.id])
+
+        cursor = pages[-1]['cursor']
+        page = self._sync(cursor)
+        self.assertEqual((page['changes'], page['deleted'], page['has_more']), ({}, {}, False))
+
+        self.entries[1].work_description = 'Day 2 revised'
+        self.entries[1].save()
+        self.entries[1].save()
+        labor_id = self.labor.id
+        self.labor.delete()
+        pages = [self._sync(page['cursor'])]
+        while pages[-1]['has_more']:
+            pages.append(self._sync(pages[-1]['cursor']))
+        self.assertFalse(any(page['snapshot'] for page in pages))
+        self.assertEqual(
+            [(row['id'], row['work_description']) for page in pages for row in self._rows(page, 'diary_entries')],
+            [(self.entries[1].id, 'Day 2 revised')],
+        )
+        self.assertEqual([page['deleted'] for page in pages if page['deleted']], [{'labor_entries': [labor_id]}])
+        page = pages[-1]
+
+        page = self._sync(page['cursor'])
+        self.assertEqual((page['changes'], page['deleted']), ({}, {}))
+
+    def test_changes_are_scoped_to_accessible_projects(self):
+        cursor = self._sync()['cursor']
+        page = self._sync(cursor)
+        while page['has_more'] or page['snapshot']:
+            page = self._sync(page['cursor'])
+        hidden = DiaryEntry.objects.get(project=self.other_project)
+        hidden.work_description = 'Still hidden'
+        hidden.save()
+        page = self._sync(page['cursor'])
+        self.assertEqual(page['changes'], {})
+
+    def test_response_is_gzipped_and_bad_cursors_are_rejected(self):
+        response = self.client.get('/diary/api/sync/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('diary_entries', json.loads(gzip.decompress(response.content))['changes'])
+
+        response = self.client.get('/diary/api/sync/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['resync'])
+
+        SyncChange.objects.update(changed_at=timezone.now() - timedelta(days=60))
+        from .sync import encode_cursor
+        stale = encode_cursor(1, timezone.now() - timedelta(days=60))
+        self.assertEqual(self.client.get('/diary/api/sync/', {'cursor': stale}).status_code, 410)
+
+        call_command('prune_sync_changes', stdout=StringIO())
+        self.assertFalse(SyncChange.objects.exists())
+
+    def _caught_up(self):
+        page = self._sync()
+        while page['has_more'] or page['snapshot']:
+            page = self._sync(page['cursor'])
+        return page['cursor']
+
+    def test_deleted_project_reaches_its_former_viewers(self):
+        staff = User.objects.create_user(username='staff_sync', password='testpass123', is_staff=True)
+        cursor = self._caught_up()
+        self.client.force_login(staff)
+        staff_cursor = self._caught_up()
+
+        project_id = self.project.id
+        self.project.delete()
+        self.assertEqual(self._sync(staff_cursor)['deleted'], {'projects': [project_id]})
+        self.client.force_login(self.manager)
+        pages = [self._sync(cursor)]
+        while pages[-1]['has_more']:
+            pages.append(self._sync(pages[-1]['cursor']))
+        self.assertEqual([page['deleted'] for page in pages if page['deleted']], [{'projects': [project_id]}])
+        # Nobody else hears about it
+        self.client.force_login(self.outsider)
+        self.assertEqual(self._sync(self._caught_up())['deleted'], {})
+
+    def test_reassigned_project_leaves_and_joins_feeds(self):
+        cursor = self._caught_up()
+        self.client.force_login(self.outsider)
+        outsider_cursor = self._caught_up()
+
+        self.project.project_manager = self.outsider
+        self.project.save()
+        self.client.force_login(self.manager)
+        self.assertEqual(self._sync(cursor)['deleted'], {'projects': [self.project.id]})
+        # The new manager has none of the project's records: take a new snapshot
+        self.client.force_login(self.outsider)
+        response = self.client.get('/diary/api/sync/', {'cursor': outsider_cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['resync'])
+
+        # Other saves log nothing
+        count = SyncChange.objects.count()
+        self.project.name = 'Renamed'
+        self.project.save()
+        self.assertEqual(SyncChange.objects.count(), count)
+
+    def test_limit_must_be_positive(self):
+        for limit in ('-1', '0', 'many'):
+            response = self.client.get('/diary/api/sync/', {'limit': limit})
+            self.assertEqual(response.status_code, 400)
+        page = self.client.get('/diary/api/sync/', {'limit': '1'}).json()
+        self.assertEqual(len(page['changes']['diary_entries']['rows']), 1)
+        from .sync import get_sync_page
+        self.assertTrue(get_sync_page(self.manager, limit=-5)['has_more'])
+
+
+
+@override_settings(DRAFT_CHECKPOINT_EVERY=3)
+class DraftAutosaveTestCase(TestCase):
+    """Test incremental draft autosave for diary entries and blog posts"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pm_drafts', password='testpass123')
+        self.client.force_login(self.user)
+
+    def _patch(self, draft_id, base, ops, kind='diary'):
+        return self.client.post(
+            f'/diary/api/drafts/{kind}/{draft_id}/patch/', json.dumps({'base': base, 'ops': ops}),
+            content_type='application/json',
+        )
+
+    def test_apply_ops(self):
+        state = {'entry': {'notes': 'Poured slab B'}, 'labor': [{'trade_description': 'Mason'}]}
+        new = apply_ops(state, [
+            {'op': 'splice', 'path': '/entry/notes', 'at': 6, 'remove': 4, 'insert': 'the 🧱 wall'},
+            {'op': 'add', 'path': '/labor/-', 'value': {'trade_description': 'Welder'}},
+            {'op': 'remove', 'path': '/labor/0'},
+            {'op': 'replace', 'path': '/entry/notes', 'value': 'Done'},
+            {'op': 'add', 'path': '/entry/a~1b', 'value': 1},
+        ])
+        self.assertEqual(new, {'entry': {'notes': 'Done', 'a/b': 1}, 'labor': [{'trade_description': 'Welder'}]})
+        self.assertEqual(state['entry']['notes'], 'Poured slab B')
+        self.assertEqual(
+            apply_ops(state, [{'op': 'splice', 'path': '/entry/notes', 'at': 6, 'remove': 4, 'insert': '🧱'}]),
+            {**state, 'entry': {'notes': 'Poured🧱b B'}},
+        )
+        for bad in (
+            [], [{'op': 'move', 'path': '/entry'}], [{'op': 'replace', 'path': 'entry'}],
+            [{'op': 'remove', 'path': '/labor/5'}], [{'op': 'splice', 'path': '/entry/notes', 'at': 99}],
+        ):
+            with self.assertRaises(PatchError):
+                apply_ops(state, bad)
+
+    def test_diary_autosave_checkpoint_and_restore(self):
+        response = self.client.post('/diary/api/drafts/diary/', '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        draft_id, seq = response.json()['id'], response.json()['seq']
+
+        saves = [
+            [{'op': 'add', 'path': '/entry/work_description', 'value': 'Formwork for level 2 slab'}],
+            [{'op': 'add', 'path': '/labor/-', 'value': {'trade_description': 'Carpenter', 'workers_count': 4}}],
+            [{'op': 'splice', 'path': '/entry/work_description', 'at': 8, 'remove': 0, 'insert': ' and rebar'}],
+            [{'op': 'add', 'path': '/labor/-', 'value': {'trade_description': 'Steel fixer', 'workers_count': 2}}],
+        ]
+        for ops in saves:
+            response = self._patch(draft_id, seq, ops)
+            self.assertEqual(response.status_code, 200, response.content)
+            seq = response.json()['seq']
+        self.assertEqual(seq, 4)
+
+        # The third save was folded into the draft row; only the fourth is pending
+        draft = DiaryDraft.objects.get(pk=draft_id)
+        self.assertEqual(draft.checkpoint_seq, 3)
+        self.assertEqual(draft.title, 'Formwork and rebar for level 2 slab')
+        self.assertEqual(list(DraftPatch.objects.values_list('seq', flat=True)), [4])
+
+        response = self._patch(draft_id, 2, [{'op': 'remove', 'path': '/labor/0'}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['seq'], 4)
+        self.assertEqual(len(response.json()['state']['labor']), 2)
+        self.assertEqual(self._patch(draft_id, 4, [{'op': 'remove', 'path': '/labor/7'}]).status_code, 400)
+        self.assertEqual(self._patch(draft_id, 4, [{'op': 'add', 'path': '/entry/x', 'value': {}}]).status_code, 400)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(load_draft(draft)[0], 4)
+        state = self.client.get(f'/diary/api/drafts/diary/{draft_id}/').json()['state']
+        self.assertEqual([row['trade_description'] for row in state['labor']], ['Carpenter', 'Steel fixer'])
+
+        response = self.client.get('/diary/diary/', {'draft': draft_id})
+        self.assertEqual(response.context['draft_seq'], 4)
+        self.assertEqual(response.context['diary_form'].initial['work_description'],
+                         'Formwork and rebar for level 2 slab')
+        labor_forms = response.context['labor_formset'].forms
+        self.assertEqual(len(labor_forms), 3)
+        self.assertEqual(labor_forms[1].initial['trade_description'], 'Steel fixer')
+
+        other = User.objects.create_user(username='other_drafts', password='testpass123')
+        self.client.force_login(other)
+        self.assertEqual(self._patch(draft_id, 4, saves[0]).status_code, 404)
+        self.assertEqual(self.client.get('/diary/sitedraft/').context['server_drafts'], [])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/diary/sitedraft/').context['server_drafts'][0]['id'], draft_id)
+        self.assertEqual(self.client.delete(f'/diary/api/drafts/diary/{draft_id}/').status_code, 204)
+        self.assertFalse(DraftPatch.objects.exists())
+
+    def test_blog_drafts(self):
+        from accounts.models import SiteManagerProfile
+        from blog.models import PostDraft
+
+        self.assertEqual(
+            self.client.post('/diary/api/drafts/blog/', '{}', content_type='application/json').status_code, 403
+        )
+        self.assertEqual(
+            self.client.post('/diary/api/drafts/notes/', '{}', content_type='application/json').status_code, 404
+        )
+        SiteManagerProfile.objects.create(user=self.user, approval_status='approved')
+        response = self.client.post(
+            '/diary/api/drafts/blog/', json.dumps({'state': {'title': 'Scaffold', 'category': '', 'tags': '',
+                                                             'body': 'Check ties.'}}),
+            content_type='application/json',
+        )
+        draft_id = response.json()['id']
+        self.assertEqual(self._patch(draft_id, 0, [
+            {'op': 'splice', 'path': '/body', 'at': 10, 'remove': 1, 'insert': ' daily.'},
+            {'op': 'replace', 'path': '/category', 'value': 'expert-advice'},
+        ], kind='blog').json()['seq'], 1)
+        self.assertEqual(self._patch(draft_id, 1, [{'op': 'replace', 'path': '/category', 'value': 'gossip'}],
+                                     kind='blog').status_code, 400)
+
+        response = self.client.get('/diary/createblog/', {'draft': draft_id})
+        self.assertEqual(response.context['form'].initial['blogContent'], 'Check ties daily.')
+        self.assertEqual(response.context['draft_seq'], 1)
+        drafts = self.client.get('/diary/drafts/').context['server_drafts']
+        self.assertEqual(drafts[0]['category'], 'expert-advice')
+
+        # A full "Save Draft" post supersedes the autosaves but keeps the numbering
+        self.client.post('/diary/createblog/', {'action': 'draft', 'draft_id': draft_id, 'blogTitle': 'Scaffold',
+                                                'blogContent': 'Rewritten.'})
+        draft = PostDraft.objects.get(pk=draft_id)
+        self.assertEqual((draft.body, draft.checkpoint_seq), ('Rewritten.', 1))
+        self.assertFalse(DraftPatch.objects.exists())
+        self.assertEqual(self._patch(draft_id, 0, [{'op': 'replace', 'path': '/title', 'value': 'x'}],
+                                     kind='blog').status_code, 409)
+
+
+class DashboardTestCase(TestCase):
+    """Test the cached site diary dashboard data"""
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='pm_dash', password='testpass123')
+        self.other = User.objects.create_user(username='pm_other', password='testpass123')
+        self.staff = User.objects.create_user(username='staff_dash', password='testpass123', is_staff=True)
+        self.projects = [
+            Project.objects.create(
+                name=f'Dash {status}', client_name='Client', project_manager=self.manager, location='Site',
+                start_date=date(2025, 1, 1), expected_end_date=date(2025, 12, 31),
+                budget=Decimal('1000.00'), status=status,
+            )
+            for status in ('active', 'active', 'completed')
+        ]
+        for day in (1, 2):
+            DiaryEntry.objects.create(project=self.projects[0], entry_date=date(2025, 3, day),
+                                      created_by=self.manager, work_description='Work')
+        DiaryEntry.objects.create(project=self.projects[2], entry_date=date(2025, 3, 1),
+                                  created_by=self.manager, work_description='Work')
+
+    def test_stats_from_one_query(self):
+        with self.assertNumQueries(1):
+            stats = project_stats(visible_projects(self.manager))
+        self.assertEqual(stats, {
+            'total_projects': 3, 'active_projects': 2, 'completed_projects': 1, 'total_entries': 3,
+        })
+        self.assertEqual(project_stats(visible_projects(self.other))['total_projects'], 0)
+
+    def test_cached_per_user_until_diary_writes(self):
+        with self.assertNumQueries(4):
+            data = get_dashboard(self.manager)
+        self.assertEqual(len(data['recent_entries']), 3)
+        with self.assertNumQueries(0):
+            get_dashboard(self.manager)
+        get_dashboard(self.other)
+        get_dashboard(self.staff)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = DiaryEntry.objects.create(project=self.projects[1], entry_date=date(2025, 3, 5),
+                                              created_by=self.manager, work_description='More work')
+        self.assertEqual(get_dashboard(self.manager)['stats']['total_entries'], 4)
+        self.assertEqual(get_dashboard(self.staff)['stats']['total_entries'], 4)
+        # Someone else's project: their copy stays cached
+        with self.assertNumQueries(0):
+            get_dashboard(self.other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DelayEntry.objects.create(diary_entry=entry, category='weather', description='Rain',
+                                      duration_hours=Decimal('2'), impact_level='low', affected_activities='All')
+        self.assertEqual(len(get_dashboard(self.manager)['recent_delays']), 1)
+
+    def test_local_cache_bounds_how_long_another_worker_is_stale(self):
+        get_dashboard(self.manager)
+        other_worker = InstrumentedLocMemCache('dashboard-other-worker', {})
+        # The write lands on another worker, which drops only its own copy
+        with mock.patch('site_diary.dashboard.cache', other_worker), self.captureOnCommitCallbacks(execute=True):
+            DiaryEntry.objects.create(project=self.projects[1], entry_date=date(2025, 3, 5),
+                                      created_by=self.manager, work_description='More work')
+        self.assertEqual(get_dashboard(self.manager)['stats']['total_entries'], 3)
+        later = time.time() + settings.LOCAL_CACHE_MAX_SECONDS + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(get_dashboard(self.manager)['stats']['total_entries'], 4)
@@ -9,9 +9,14 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('newproject/', views.newproject, name='newproject'),
     path('history/', views.history, name='history'),
+    path('import/', views.import_diary, name='import_diary'),
+    path('api/sync/', views.sync, name='sync'),
     path('reports/', views.reports, name='reports'),
     path('settings/', views.settings, name='settings'),
     path('sitedraft/', views.sitedraft, name='sitedraft'),
+    path('api/drafts/<str:kind>/', views.draft_create, name='draft_create'),
+    path('api/drafts/<str:kind>/<int:pk>/', views.draft_detail, name='draft_detail'),
+    path('api/drafts/<str:kind>/<int:pk>/patch/', views.draft_patch, name='draft_patch'),
     
     # Admin views
     path('admin/clientproject/', views.adminclientproject, name='adminclientproject'),
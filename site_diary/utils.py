@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from .models import Project, DiaryEntry
+from .models import Project, DiaryEntry, DiaryPhoto
 
 def get_user_projects(user):
     """Get projects accessible by a user"""
@@ -11,6 +11,38 @@ def get_user_projects(user):
             models.Q(project_manager=user) | models.Q(architect=user)
         )
 
+def attach_signed_photo_urls(entries):
+    """
+    Attach signed photo URLs to a page of diary entries.
+
+    Every photo on the page is fetched in one query and signed with a shared
+    expiry, so the browser can load (and cache) the whole gallery without a
+    permission query per image. Only pass entries the user is already allowed
+    to see, e.g. filtered through get_user_projects().
+
+    Sets `entry.photo_urls` to a list of dicts with url, caption and location.
+    """
+    from core.media import build_signed_media_url, get_signed_url_expiry
+
+    entries = list(entries)
+    expires = get_signed_url_expiry()
+    photos_by_entry = {entry.pk: [] for entry in entries}
+
+    photos = DiaryPhoto.objects.filter(
+        diary_entry_id__in=photos_by_entry.keys()
+    ).only('diary_entry_id', 'photo', 'caption', 'location').order_by('uploaded_at')
+
+    for photo in photos:
+        photos_by_entry[photo.diary_entry_id].append({
+            'url': build_signed_media_url(photo.photo.name, expires),
+            'caption': photo.caption,
+            'location': photo.location,
+        })
+
+    for entry in entries:
+        entry.photo_urls = photos_by_entry[entry.pk]
+    return entries
+
 def get_project_statistics(project):
     """Get comprehensive statistics for a project"""
     diary_entries = project.diary_entries.all()
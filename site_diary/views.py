@@ -1,19 +1,47 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.db.models import Q, Sum, Avg, Count, Max, Min
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.conf import settings as django_settings
+from django.urls import reverse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
 from datetime import timedelta
 import csv
 import json
 from accounts.decorators import require_site_manager_role, require_admin_role
+from accounts.utils import is_site_manager
+from blog.forms import BlogSubmissionForm
+from blog.models import PostDraft
+from blog.rendering import sanitize
+from core.instrumentation import query_budget
+from .models import (
+    Project, DiaryEntry, LaborEntry, MaterialEntry,
+    EquipmentEntry, DelayEntry, VisitorEntry, DiaryDraft
+)
+from . import autosave
+from .forms import (
+    ProjectForm, DiaryEntryForm, LaborEntryFormSet, MaterialEntryFormSet,
+    EquipmentEntryFormSet, DelayEntryFormSet, VisitorEntryFormSet,
+    DiaryPhotoFormSet, DiarySearchForm, ProjectSearchForm
+)
+from .autosave import PatchConflict, PatchError
+from .dashboard import get_dashboard
+from .importer import ImportReport, detect_format, import_diary_file
+from .sync import CursorError, get_sync_page
 
 # Create your views here.
 @login_required
 def diary(request):
     """Create new diary entry with all related data"""
+    draft, draft_seq = None, 0
+    draft_id = request.GET.get('draft') or request.POST.get('draft_id')
+    if draft_id and str(draft_id).isdigit():
+        draft = DiaryDraft.objects.filter(pk=draft_id, user=request.user).first()
+
     if request.method == 'POST':
         diary_form = DiaryEntryForm(request.POST)
         labor_formset = LaborEntryFormSet(request.POST, prefix='labor')
@@ -69,19 +97,26 @@ def diary(request):
                     photo_entry = form.save(commit=False)
                     photo_entry.diary_entry = diary_entry
                     photo_entry.save()
+
+            if draft:
+                draft.delete()
             
             messages.success(request, 'Diary entry created successfully!')
             return redirect('diary')
     else:
-        diary_form = DiaryEntryForm()
-        labor_formset = LaborEntryFormSet(prefix='labor')
-        material_formset = MaterialEntryFormSet(prefix='material')
-        equipment_formset = EquipmentEntryFormSet(prefix='equipment')
-        delay_formset = DelayEntryFormSet(prefix='delay')
-        visitor_formset = VisitorEntryFormSet(prefix='visitor')
+        # Restore an autosaved draft into the form and its formsets
+        draft_seq, state = autosave.load_draft(draft)[:2] if draft else (0, autosave.blank_state('diary'))
+        diary_form = DiaryEntryForm(initial=state['entry'])
+        labor_formset = LaborEntryFormSet(prefix='labor', initial=state['labor'])
+        material_formset = MaterialEntryFormSet(prefix='material', initial=state['material'])
+        equipment_formset = EquipmentEntryFormSet(prefix='equipment', initial=state['equipment'])
+        delay_formset = DelayEntryFormSet(prefix='delay', initial=state['delay'])
+        visitor_formset = VisitorEntryFormSet(prefix='visitor', initial=state['visitor'])
         photo_formset = DiaryPhotoFormSet(prefix='photo')
     
     context = {
+        'draft': draft,
+        'draft_seq': draft_seq,
         'diary_form': diary_form,
         'labor_formset': labor_formset,
         'material_formset': material_formset,
@@ -95,41 +130,8 @@ def diary(request):
 @login_required
 def dashboard(request):
     """Dashboard with project overview and statistics"""
-    # Get user's projects
-    if request.user.is_staff:
-        projects = Project.objects.all()
-    else:
-        projects = Project.objects.filter(
-            Q(project_manager=request.user) | Q(architect=request.user)
-        )
-    
-    # Recent diary entries
-    recent_entries = DiaryEntry.objects.filter(
-        project__in=projects
-    ).select_related('project', 'created_by').order_by('-created_at')[:5]
-    
-    # Statistics
-    total_projects = projects.count()
-    active_projects = projects.filter(status='active').count()
-    completed_projects = projects.filter(status='completed').count()
-    total_entries = DiaryEntry.objects.filter(project__in=projects).count()
-    
-    # Recent delays
-    recent_delays = DelayEntry.objects.filter(
-        diary_entry__project__in=projects
-    ).select_related('diary_entry__project').order_by('-diary_entry__entry_date')[:5]
-    
-    context = {
-        'projects': projects[:5],  # Show only 5 recent projects
-        'recent_entries': recent_entries,
-        'recent_delays': recent_delays,
-        'stats': {
-            'total_projects': total_projects,
-            'active_projects': active_projects,
-            'completed_projects': completed_projects,
-            'total_entries': total_entries,
-        }
-    }
+    # Projects, recent entries/delays and counters (cached, see dashboard.py)
+    context = get_dashboard(request.user)
     return render(request, 'site_diary/dashboard.html', context)
 
 @require_site_manager_role
@@ -153,13 +155,63 @@ def newproject(request):
 
 @require_site_manager_role
 def createblog(request):
-    return render(request, 'blogcreation/createblog.html')
+    """Write a blog post: save it as a draft, or submit it for admin approval"""
+    draft, draft_seq = None, 0
+    draft_id = request.GET.get('draft') or request.POST.get('draft_id')
+    if draft_id and str(draft_id).isdigit():
+        draft = PostDraft.objects.filter(pk=draft_id, author=request.user).first()
+
+    if request.method == 'POST':
+        form = BlogSubmissionForm(request.POST, request.FILES)
+        if request.POST.get('action') == 'draft':
+            draft = form.save_draft(request.user, draft)
+            autosave.retire_patches(draft)
+            messages.success(request, 'Draft saved.')
+            return redirect(f"{reverse('site:createblog')}?draft={draft.pk}")
+        if form.is_valid():
+            post = form.save_post(request.user)
+            if draft:
+                draft.delete()
+            messages.success(request, f'"{post.title}" has been submitted for admin approval.')
+            return redirect('site:createblog')
+    else:
+        initial = None
+        if draft:
+            # Include autosaves made since the draft's last checkpoint
+            draft_seq, state, _ = autosave.load_draft(draft)
+            initial = {
+                'blogTitle': state['title'], 'blogCategory': state['category'], 'blogTags': state['tags'],
+                'blogContent': state['body'],
+            }
+        form = BlogSubmissionForm(initial=initial)
+
+    # The editor shows the body as HTML, so only ever hand it sanitized markup
+    editor_html = sanitize(form['blogContent'].value() or '')
+    return render(request, 'blogcreation/createblog.html', {
+        'form': form, 'draft': draft, 'draft_seq': draft_seq, 'editor_html': editor_html,
+    })
 
 @require_site_manager_role
 def drafts(request):
-    return render(request, 'blogcreation/drafts.html')
+    """The user's saved blog drafts, newest first"""
+    user_drafts = list(PostDraft.objects.filter(author=request.user).order_by('-updated_at')[:200])
+    states = autosave.load_drafts(user_drafts)
+    server_drafts = []
+    for draft in user_drafts:
+        _, state, modified = states[draft.pk]
+        server_drafts.append({
+            'id': draft.id,
+            'title': state['title'] or 'Untitled draft',
+            'category': state['category'],
+            'tags': state['tags'],
+            'content': state['body'],
+            'lastModified': modified.isoformat(),
+            'url': f"{reverse('site:createblog')}?draft={draft.id}",
+        })
+    return render(request, 'blogcreation/drafts.html', {'server_drafts': server_drafts})
 
 @login_required
+@query_budget(10)
 def history(request):
     """View diary entry history with search and filtering"""
     # Get user's projects
@@ -466,4 +518,156 @@ def adminreports(request):
 
 @login_required
 def sitedraft(request):
-    return render(request, 'site_diary/sitedraft.html')
\ No newline at end of file
+    """The user's autosaved diary entry drafts, newest first"""
+    user_drafts = list(DiaryDraft.objects.filter(user=request.user).select_related('project')[:200])
+    states = autosave.load_drafts(user_drafts)
+    server_drafts = []
+    for draft in user_drafts:
+        _, state, modified = states[draft.pk]
+        server_drafts.append({
+            'id': draft.id,
+            'title': autosave.diary_title(state) or 'Untitled diary draft',
+            'category': draft.project.name if draft.project else '',
+            'content': state['entry'].get('work_description', ''),
+            'tags': [],
+            'lastModified': modified.isoformat(),
+            'url': f"{reverse('site:diary')}?draft={draft.id}",
+            'apiUrl': reverse('site:draft_detail', args=['diary', draft.id]),
+        })
+    return render(request, 'site_diary/sitedraft.html', {'server_drafts': server_drafts})
+
+def draft_access_error(request, kind):
+    """A JSON error response if the user may not autosave this kind of draft"""
+    if kind not in autosave.DRAFT_MODELS:
+        return JsonResponse({'error': 'Unknown draft type.'}, status=404)
+    if kind == 'blog' and not is_site_manager(request.user):
+        return JsonResponse({'error': 'Blog drafts are for site managers.'}, status=403)
+    return None
+
+def read_draft_payload(request):
+    """The request's JSON object, or raise PatchError"""
+    if len(request.body) > django_settings.DRAFT_PATCH_MAX_BYTES:
+        raise PatchError('Autosave is too large; send smaller changes.')
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        raise PatchError('Body must be JSON.')
+    if not isinstance(payload, dict):
+        raise PatchError('Body must be a JSON object.')
+    return payload
+
+@login_required
+@require_POST
+def draft_create(request, kind):
+    """
+    Start an autosaved draft. Optional JSON body {"state": {...}}; returns
+    the draft id and save number 0 to send patches against.
+    """
+    error = draft_access_error(request, kind)
+    if error:
+        return error
+    try:
+        draft = autosave.create_draft(kind, request.user, read_draft_payload(request).get('state'))
+    except PatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'id': draft.pk, 'seq': 0,
+        'url': reverse('site:draft_detail', args=[kind, draft.pk]),
+        'patch_url': reverse('site:draft_patch', args=[kind, draft.pk]),
+    }, status=201)
+
+@login_required
+@require_http_methods(['GET', 'DELETE'])
+def draft_detail(request, kind, pk):
+    """GET the draft's current state and save number, or DELETE the draft"""
+    error = draft_access_error(request, kind)
+    if error:
+        return error
+    draft = autosave.get_draft(kind, request.user, pk)
+    if draft is None:
+        raise Http404('Draft not found')
+    if request.method == 'DELETE':
+        draft.delete()
+        return HttpResponse(status=204)
+    seq, state, modified = autosave.load_draft(draft)
+    response = JsonResponse({'id': draft.pk, 'seq': seq, 'state': state, 'modified': modified.isoformat()})
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+@login_required
+@require_POST
+def draft_patch(request, kind, pk):
+    """
+    Autosave: JSON body {"base": <save number>, "ops": [...]} (see
+    site_diary.autosave). Returns the new save number, or 409 with the
+    current state when `base` is stale.
+    """
+    error = draft_access_error(request, kind)
+    if error:
+        return error
+    draft = autosave.get_draft(kind, request.user, pk)
+    if draft is None:
+        raise Http404('Draft not found')
+    try:
+        payload = read_draft_payload(request)
+        base = payload.get('base')
+        if not isinstance(base, int) or isinstance(base, bool):
+            raise PatchError('base must be the save number the changes were made on.')
+        seq, _ = autosave.save_patch(draft, base, payload.get('ops'))
+    except PatchConflict as e:
+        return JsonResponse({'error': 'Draft changed elsewhere.', 'seq': e.seq, 'state': e.state}, status=409)
+    except PatchError as e:
+        status = 413 if len(request.body) > django_settings.DRAFT_PATCH_MAX_BYTES else 400
+        return JsonResponse({'error': str(e)}, status=status)
+    return JsonResponse({'seq': seq})
+
+@login_required
+@require_POST
+def import_diary(request):
+    """
+    Bulk import diary entries from an uploaded CSV or JSON Lines file.
+
+    Expects multipart `file`; optional `format` (csv/jsonl) overrides the
+    extension. Returns totals and the first rejected rows as JSON.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Upload a CSV or JSON Lines file as "file".'}, status=400)
+
+    file_format = request.POST.get('format') or detect_format(upload.name)
+    report = ImportReport(max_errors=django_settings.DIARY_IMPORT_MAX_ERRORS)
+    try:
+        import_diary_file(
+            request.user, upload.file, file_format,
+            batch_size=django_settings.DIARY_IMPORT_BATCH_SIZE, report=report,
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': str(e), **report.as_dict()}, status=400)
+    return JsonResponse(report.as_dict())
+
+@login_required
+@require_GET
+@gzip_page
+def sync(request):
+    """
+    Delta-sync feed for offline clients (see site_diary.sync).
+
+    ?cursor= is the cursor from the previous response (omit for a full
+    snapshot); ?limit= caps the records per page (1 to SYNC_PAGE_SIZE).
+    """
+    limit = request.GET.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return JsonResponse({'error': 'limit must be a positive integer'}, status=400)
+    try:
+        payload = get_sync_page(request.user, request.GET.get('cursor'), limit)
+    except CursorError as e:
+        return JsonResponse({'error': str(e), 'resync': True}, status=410)
+    response = JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
@@ -0,0 +1,26 @@
+// Admin Dashboard JS - keeps the stat cards current
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('dashboard-metrics');
+    if (!container) return;
+
+    // The server caches the counters this long, so polling faster gains nothing
+    const seconds = Math.max(parseInt(container.dataset.refreshSeconds, 10) || 30, 5);
+    setInterval(() => refreshMetrics(container), seconds * 1000);
+});
+
+async function refreshMetrics(container) {
+    // Skip while the tab is in the background
+    if (document.visibilityState === 'hidden') return;
+    try {
+        const response = await fetch(container.dataset.url, {credentials: 'same-origin'});
+        if (!response.ok) return;
+        const data = await response.json();
+        container.querySelectorAll('[data-metric]').forEach(el => {
+            const value = data.metrics[el.dataset.metric];
+            if (value !== undefined) el.textContent = value;
+        });
+    } catch (e) {
+        console.warn('Could not refresh dashboard metrics:', e);
+    }
+}
@@ -0,0 +1,182 @@
+/**
+ * Triple G BuildHub - Draft autosave
+ * Sends only what changed since the last save (see site_diary/autosave.py):
+ * - JSON Patch style add/replace/remove operations
+ * - "splice" operations for edits inside long text, so typing into a long
+ *   field costs a few bytes per save
+ * - Rebases onto the server's copy when another tab saved first
+ *
+ * Usage:
+ *   new DraftAutosave({
+ *       createUrl: '/diary/api/drafts/blog/',   // used when there is no draft yet
+ *       patchUrl: '/diary/api/drafts/blog/3/patch/',  // or null
+ *       seq: 0,                                  // save number the page was rendered at
+ *       collect: () => ({...}),                  // current state of the form
+ *       saved: {...},                            // optional: state the server has (default: collect())
+ *       onCreated: (draft) => {...},             // optional
+ *   }).start();
+ */
+
+// Strings shorter than this are simply replaced
+const SPLICE_MIN_LENGTH = 64;
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+function escapePointer(key) {
+    return String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+}
+
+function textSplice(path, before, after) {
+    // Offsets count code points, as the server does
+    const a = Array.from(before);
+    const b = Array.from(after);
+    let start = 0;
+    const maxStart = Math.min(a.length, b.length);
+    while (start < maxStart && a[start] === b[start]) start++;
+    let end = 0;
+    const maxEnd = maxStart - start;
+    while (end < maxEnd && a[a.length - 1 - end] === b[b.length - 1 - end]) end++;
+    return {
+        op: 'splice',
+        path: path,
+        at: start,
+        remove: a.length - start - end,
+        insert: b.slice(start, b.length - end).join(''),
+    };
+}
+
+/**
+ * Operations that turn `before` into `after`
+ */
+function diffState(before, after, path = '', ops = []) {
+    if (isPlainObject(before) && isPlainObject(after)) {
+        Object.keys(before).forEach(key => {
+            if (!(key in after)) ops.push({op: 'remove', path: `${path}/${escapePointer(key)}`});
+        });
+        Object.keys(after).forEach(key => {
+            const childPath = `${path}/${escapePointer(key)}`;
+            if (key in before) {
+                diffState(before[key], after[key], childPath, ops);
+            } else {
+                ops.push({op: 'add', path: childPath, value: after[key]});
+            }
+        });
+    } else if (Array.isArray(before) && Array.isArray(after)) {
+        const common = Math.min(before.length, after.length);
+        for (let i = 0; i < common; i++) diffState(before[i], after[i], `${path}/${i}`, ops);
+        for (let i = common; i < after.length; i++) ops.push({op: 'add', path: `${path}/-`, value: after[i]});
+        for (let i = before.length - 1; i >= after.length; i--) ops.push({op: 'remove', path: `${path}/${i}`});
+    } else if (typeof before === 'string' && typeof after === 'string' && before.length >= SPLICE_MIN_LENGTH) {
+        if (before !== after) ops.push(textSplice(path, before, after));
+    } else if (JSON.stringify(before) !== JSON.stringify(after)) {
+        ops.push({op: 'replace', path: path, value: after});
+    }
+    return ops;
+}
+
+/**
+ * Form state keyed like the diary view: {"entry": {...}, "labor": [{...}], ...}
+ * Fields named "<prefix>-<n>-<field>" go to formset rows; management form
+ * fields are skipped.
+ */
+function collectFormsetState(form, prefixes) {
+    const state = {entry: {}};
+    prefixes.forEach(prefix => { state[prefix] = []; });
+    Array.from(form.elements).forEach(el => {
+        if (!el.name || el.type === 'file' || el.name === 'csrfmiddlewaretoken' || el.name === 'draft_id') return;
+        if (el.type === 'radio' && !el.checked) return;
+        const value = el.type === 'checkbox' ? el.checked : el.value;
+        const match = el.name.match(/^([a-z]+)-(\d+)-(\w+)$/);
+        if (match && state[match[1]]) {
+            const rows = state[match[1]];
+            const index = parseInt(match[2], 10);
+            while (rows.length <= index) rows.push({});
+            rows[index][match[3]] = value;
+        } else if (!el.name.includes('-')) {
+            state.entry[el.name] = value;
+        }
+    });
+    return state;
+}
+
+function csrfToken() {
+    const field = document.querySelector('[name=csrfmiddlewaretoken]');
+    return field ? field.value : '';
+}
+
+class DraftAutosave {
+    constructor(options) {
+        this.createUrl = options.createUrl;
+        this.patchUrl = options.patchUrl || null;
+        this.seq = options.seq || 0;
+        this.collect = options.collect;
+        this.onCreated = options.onCreated || (() => {});
+        this.interval = options.interval || 5000;
+        this.saved = options.saved || this.collect();
+        this.inFlight = false;
+    }
+
+    start() {
+        this.timer = setInterval(() => this.save(), this.interval);
+        // Last chance to save when the page is hidden or closed
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') this.save();
+        });
+        return this;
+    }
+
+    stop() {
+        clearInterval(this.timer);
+    }
+
+    async post(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken()},
+            credentials: 'same-origin',
+            keepalive: true,
+            body: JSON.stringify(body),
+        });
+    }
+
+    async save() {
+        if (this.inFlight) return;
+        const current = this.collect();
+        const ops = diffState(this.saved, current);
+        if (!ops.length) return;
+
+        this.inFlight = true;
+        try {
+            if (!this.patchUrl) {
+                const response = await this.post(this.createUrl, {state: current});
+                if (response.ok) {
+                    const draft = await response.json();
+                    this.patchUrl = draft.patch_url;
+                    this.seq = draft.seq;
+                    this.saved = current;
+                    this.onCreated(draft);
+                }
+                return;
+            }
+            const response = await this.post(this.patchUrl, {base: this.seq, ops: ops});
+            if (response.ok) {
+                this.seq = (await response.json()).seq;
+                this.saved = current;
+            } else if (response.status === 409) {
+                // Saved elsewhere first: diff against the server's copy next time
+                const data = await response.json();
+                this.seq = data.seq;
+                this.saved = data.state;
+            } else {
+                console.error('Draft autosave rejected:', response.status);
+            }
+        } catch (e) {
+            // Offline or flaky connection: the same changes go out on the next tick
+            console.warn('Draft autosave failed, will retry:', e);
+        } finally {
+            this.inFlight = false;
+        }
+    }
+}
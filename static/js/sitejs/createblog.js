@@ -5,7 +5,7 @@
  * - Image upload and preview
  * - Live content preview
  * - Form submission and validation
- * - Draft saving (localStorage)
+ * - Draft saving (localStorage, and autosave to the server)
  */
 
 document.addEventListener('DOMContentLoaded', function() {
@@ -16,8 +16,38 @@ document.addEventListener('DOMContentLoaded', function() {
     initFormPreview();
     initFormActions();
     loadSavedDraft(); // Check for existing draft
+    initAutosave();
 });
 
+let draftAutosave = null;
+
+/**
+ * Autosave the post to the server every few seconds (see autosave.js)
+ */
+function initAutosave() {
+    const blogForm = document.getElementById('blogForm');
+    if (!blogForm || typeof DraftAutosave === 'undefined') return;
+
+    const collect = () => ({
+        title: document.getElementById('blogTitle').value,
+        category: document.getElementById('blogCategory').value || '',
+        tags: document.getElementById('blogTags').value,
+        body: document.getElementById('blogContentEditor').innerHTML,
+    });
+    const patchUrl = blogForm.dataset.draftPatchUrl;
+    draftAutosave = new DraftAutosave({
+        createUrl: blogForm.dataset.draftCreateUrl,
+        patchUrl: patchUrl,
+        seq: parseInt(blogForm.dataset.draftSeq, 10) || 0,
+        collect: collect,
+        // Without a server draft, anything restored locally still needs uploading
+        saved: patchUrl ? null : {title: '', category: '', tags: '', body: ''},
+        onCreated: draft => {
+            document.getElementById('draftId').value = draft.id;
+        },
+    }).start();
+}
+
 /**
  * Initialize mobile menu toggle
  */
@@ -50,6 +80,12 @@ function initRichTextEditor() {
     const hiddenField = document.getElementById('blogContent');
     
     if (!toolbarButtons.length || !editor || !hiddenField) return;
+
+    // A server-side draft (or a rejected submission) comes back in the hidden field
+    if (hiddenField.value.trim() && !editor.innerHTML.trim()) {
+        editor.innerHTML = hiddenField.value;
+        document.getElementById('previewContent').innerHTML = hiddenField.value;
+    }
     
     // Editor content change event
     editor.addEventListener('input', function() {
@@ -220,8 +256,12 @@ function initFormActions() {
     if (saveDraftBtn) {
         saveDraftBtn.addEventListener('click', function(e) {
             e.preventDefault();
+            // Keep a local copy too, in case the upload fails
             saveDraft();
-            showNotification('Blog post saved as draft', 'success');
+            if (draftAutosave) draftAutosave.stop();
+            document.getElementById('blogContent').value = document.getElementById('blogContentEditor').innerHTML;
+            document.getElementById('blogAction').value = 'draft';
+            blogForm.submit();
         });
     }
     
@@ -246,16 +286,13 @@ function initFormActions() {
                 return;
             }
             
-            // Simulate form submission
-            showNotification('Your blog post has been submitted for admin approval', 'success');
-            
-            // Clear saved draft after successful submission
+            document.getElementById('blogContent').value = document.getElementById('blogContentEditor').innerHTML;
+            document.getElementById('blogAction').value = 'submit';
+            if (draftAutosave) draftAutosave.stop();
+
+            // Clear the local draft; the server now has the post
             localStorage.removeItem('blogDraft');
-            
-            // Reset form after successful submission
-            setTimeout(() => {
-                clearForm();
-            }, 2000);
+            blogForm.submit();
         });
     }
     
@@ -345,6 +382,10 @@ function saveDraft() {
  */
 function loadSavedDraft() {
     try {
+        // Content from the server takes precedence over the local copy
+        const serverContent = document.getElementById('blogContent');
+        if (serverContent && serverContent.value.trim()) return;
+
         const savedDraft = localStorage.getItem('blogDraft');
         
         if (!savedDraft) return;
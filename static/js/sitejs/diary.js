@@ -20,6 +20,27 @@ document.addEventListener('DOMContentLoaded', function() {
     initDynamicLists();
     setupTimeCalculation();
     setupFormValidation();
+    initAutosave();
+
+    // ===== DRAFT AUTOSAVE (see autosave.js) =====
+    function initAutosave() {
+        const form = document.getElementById('siteEntryForm');
+        if (!form || !form.dataset.draftCreateUrl || typeof DraftAutosave === 'undefined') return;
+
+        const prefixes = ['labor', 'material', 'equipment', 'delay', 'visitor'];
+        const patchUrl = form.dataset.draftPatchUrl;
+        new DraftAutosave({
+            createUrl: form.dataset.draftCreateUrl,
+            patchUrl: patchUrl,
+            seq: parseInt(form.dataset.draftSeq, 10) || 0,
+            // A fresh page stores nothing until the first change
+            collect: () => collectFormsetState(form, prefixes),
+            onCreated: draft => {
+                const draftId = document.getElementById('draftId');
+                if (draftId) draftId.value = draft.id;
+            },
+        }).start();
+    }
 
     function initTabs() {
         const tabButtons = Array.from(document.querySelectorAll('.tab-button'));
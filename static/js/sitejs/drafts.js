@@ -101,7 +101,9 @@ function initDrafts() {
  * Load drafts from localStorage
  */
 function loadDrafts() {
-    let drafts = [];
+    // Drafts saved to the server come first, then any kept only in this browser
+    const serverData = document.getElementById('server-drafts');
+    let drafts = serverData ? JSON.parse(serverData.textContent) : [];
     
     // Get all keys from localStorage
     for (let i = 0; i < localStorage.length; i++) {
@@ -272,7 +274,7 @@ function setupCardActions(card, draft) {
     const editBtn = card.querySelector('.edit-btn');
     if (editBtn) {
         editBtn.addEventListener('click', () => {
-            window.location.href = `createblog.html?edit=${draft.id}`;
+            window.location.href = draft.url || `createblog.html?edit=${draft.id}`;
         });
     }
     
@@ -303,7 +305,7 @@ function setupTableRowActions(row, draft) {
     const editBtn = row.querySelector('.edit-btn');
     if (editBtn) {
         editBtn.addEventListener('click', () => {
-            window.location.href = `createblog.html?edit=${draft.id}`;
+            window.location.href = draft.url || `createblog.html?edit=${draft.id}`;
         });
     }
     
@@ -365,7 +367,7 @@ function showPreviewModal(draft) {
     const editBtn = document.getElementById('preview-edit-btn');
     if (editBtn) {
         editBtn.onclick = () => {
-            window.location.href = `createblog.html?edit=${draft.id}`;
+            window.location.href = draft.url || `createblog.html?edit=${draft.id}`;
         };
     }
     
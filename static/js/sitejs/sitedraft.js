@@ -97,11 +97,19 @@ function initDrafts() {
     displayDrafts(drafts);
 }
 
+// Drafts autosaved to the server, read once from the page
+let serverDrafts = null;
+
 /**
- * Load drafts from localStorage
+ * Load drafts from the server and localStorage
  */
 function loadDrafts() {
-    let drafts = [];
+    if (serverDrafts === null) {
+        const serverData = document.getElementById('server-drafts');
+        serverDrafts = serverData ? JSON.parse(serverData.textContent) : [];
+    }
+    // Drafts saved to the server come first, then any kept only in this browser
+    let drafts = serverDrafts.slice();
     
     // Get all keys from localStorage
     for (let i = 0; i < localStorage.length; i++) {
@@ -272,7 +280,7 @@ function setupCardActions(card, draft) {
     const editBtn = card.querySelector('.edit-btn');
     if (editBtn) {
         editBtn.addEventListener('click', () => {
-            window.location.href = `diary.html?edit=${draft.id}`;
+            window.location.href = draft.url || `diary.html?edit=${draft.id}`;
         });
     }
     
@@ -303,7 +311,7 @@ function setupTableRowActions(row, draft) {
     const editBtn = row.querySelector('.edit-btn');
     if (editBtn) {
         editBtn.addEventListener('click', () => {
-            window.location.href = `diary.html?edit=${draft.id}`;
+            window.location.href = draft.url || `diary.html?edit=${draft.id}`;
         });
     }
     
@@ -366,7 +374,7 @@ function showPreviewModal(draft) {
     const editBtn = document.getElementById('preview-edit-btn');
     if (editBtn) {
         editBtn.onclick = () => {
-            window.location.href = `diary.html?edit=${draft.id}`;
+            window.location.href = draft.url || `diary.html?edit=${draft.id}`;
         };
     }
     
@@ -453,6 +461,17 @@ function showNotificationModal() {
  * Delete a draft
  */
 function deleteDraft(draftId) {
+    const serverDraft = serverDrafts.find(draft => draft.id === draftId);
+    if (serverDraft) {
+        const csrf = document.querySelector('[name=csrfmiddlewaretoken]');
+        fetch(serverDraft.apiUrl, {
+            method: 'DELETE',
+            headers: {'X-CSRFToken': csrf ? csrf.value : ''},
+            credentials: 'same-origin',
+        });
+        serverDrafts = serverDrafts.filter(draft => draft !== serverDraft);
+    }
+
     // Remove from localStorage
     localStorage.removeItem(`diaryDraft_${draftId}`);
     